@@ -0,0 +1,2 @@
+set BEHAVIOR_STUDIO_ROOT=%~dp0
+python %BEHAVIOR_STUDIO_ROOT%/source/export_diagrams.py %*
@@ -0,0 +1,7 @@
+#!/bin/sh
+export BEHAVIOR_STUDIO_ROOT=`dirname "$0"`
+# Qt 4 needs X server even for export, so run under virtual X server if there is no display
+if [ -z "$DISPLAY" ] && command -v xvfb-run >/dev/null 2>&1; then
+    exec xvfb-run -a python $BEHAVIOR_STUDIO_ROOT/source/export_diagrams.py "$@"
+fi
+python $BEHAVIOR_STUDIO_ROOT/source/export_diagrams.py "$@"
@@ -0,0 +1,342 @@
+# coding=utf-8
+#!/usr/bin/env python
+# -----------------
+# file      : export_diagrams.py
+# date      : 2026/10/18
+# author    : Victor Zarubkin
+# contact   : victor.zarubkin@gmail.com
+# copyright : Copyright (C) 2026  Victor Zarubkin
+# license   : This file is part of BehaviorStudio.
+#           :
+#           : BehaviorStudio is free software: you can redistribute it and/or modify
+#           : it under the terms of the GNU General Public License as published by
+#           : the Free Software Foundation, either version 3 of the License, or
+#           : (at your option) any later version.
+#           :
+#           : BehaviorStudio is distributed in the hope that it will be useful,
+#           : but WITHOUT ANY WARRANTY; without even the implied warranty of
+#           : MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#           : GNU General Public License for more details.
+#           :
+#           : You should have received a copy of the GNU General Public License
+#           : along with BehaviorStudio. If not, see <http://www.gnu.org/licenses/>.
+#           :
+#           : A copy of the GNU General Public License can be found in file COPYING.
+############################################################################
+
+""" Batch export of behavior trees diagrams without launching the editor.
+
+Opens a project, builds diagram of every tree (the same way as editor's tab does) and saves it into svg and/or png
+files. Diagrams are built in parallel worker processes.
+
+Qt 4 needs a display to start QApplication on Linux even if no windows are shown. On a machine without display
+(e.g. CI server) run export under virtual X server: export_diagrams.sh does it with xvfb-run when DISPLAY is not set,
+otherwise export exits with an error.
+
+Usage:
+    python export_diagrams.py [options] project.btproj
+
+Each tree is saved into file '<output dir>/<tree file name>/<tree name>.<format>'.
+Exit code is 0 if all diagrams have been exported successfully and 1 otherwise.
+"""
+
+__author__ = 'Victor Zarubkin'
+__copyright__ = 'Copyright (C) 2026  Victor Zarubkin'
+__credits__ = ['Victor Zarubkin']
+__license__ = ['GPLv3']
+__version__ = '1.3.0'  # this is last application version when this script file was changed
+__email__ = 'victor.zarubkin@gmail.com'
+############################################################################
+
+import os
+import re
+import sys
+import getopt
+import multiprocessing
+
+from auxtypes import toUnixPath, joinPath
+
+import globals
+
+#######################################################################################################################
+
+_formats = ('svg', 'png')
+_margin = 20.0  # margin around diagram, pixels
+
+_usage = '''usage: export_diagrams.py [options] project.btproj
+
+options:
+    -h, --help              - see this hint
+    -o, --output <dir>      - output directory (default: current directory)
+    -f, --format <formats>  - comma separated list of formats: svg, png (default: svg)
+    -j, --jobs <number>     - number of worker processes (default: 0 - number of CPUs)
+    -s, --scale <value>     - scale of png images (default: 1.0)
+    -t, --tree <name>       - export only trees which names contain <name> (may be used several times)
+    -v, --vertical          - vertical diagrams (default: horizontal)
+    -d, --debug             - print debug messages
+
+example:
+    export_diagrams.py -o diagrams -f svg,png -j 8 projects/example.btproj'''
+
+
+class ExportOptions(object):
+    def __init__(self):
+        self.projectFile = ''
+        self.outputDir = '.'
+        self.formats = ['svg']
+        self.processes = 0
+        self.scale = 1.0
+        self.filters = []
+        self.horizontal = True
+        self.debug = False
+        # resolved paths of application data are passed to worker processes, because with 'spawn' start method
+        # (Windows) they import fresh globals module
+        self.rootDirectory = u'.'
+        self.shapesPath = []
+        self.alphabetPath = []
+
+#######################################################################################################################
+
+_app = None
+_options = None
+_parser = None
+
+
+def _fileName(text):
+    return re.sub(r'[^\w\-. ]', '_', text, flags=re.UNICODE).strip() or '_'
+
+
+def outputFiles(branchname, options):
+    """ Returns list of output files for tree with full name *branchname* (see TreeNode.fullRefName). """
+    treeFile, _, refname = branchname.rpartition('/')
+    folder = joinPath(options.outputDir, _fileName(os.path.splitext(os.path.basename(treeFile))[0]))
+    return [joinPath(folder, u'{0}.{1}'.format(_fileName(refname), fmt)) for fmt in options.formats]
+
+
+def _openProject(filename):
+    from project import parser
+
+    global _parser
+    if _parser is None:
+        _parser = parser.ProjParser()
+    project = _parser.open(filename)
+    globals.project = project
+    return project
+
+
+def _resolvePaths(options):
+    """ Fill paths of application data in *options* from BEHAVIOR_STUDIO_ROOT environment variable. """
+    start_path = os.environ.get('BEHAVIOR_STUDIO_ROOT', None)
+    if start_path is None:
+        start_path = os.getcwd()
+    globals.rootDirectory = toUnixPath(os.path.normpath(start_path))
+    options.rootDirectory = globals.rootDirectory
+    options.shapesPath = globals.processVars(globals.applicationShapesPath)
+    options.alphabetPath = globals.processVars(globals.applicationAlphabetPath)
+
+
+def _initGlobals(options):
+    globals.rootDirectory = options.rootDirectory
+    globals.applicationShapesPath = options.shapesPath
+    globals.applicationAlphabetPath = options.alphabetPath
+    globals.debugMode = options.debug
+    globals.itemsAnimation = False
+    globals.itemsShadow = False
+
+
+def _displayAvailable():
+    """ Qt 4 has no 'offscreen' platform, so on X11 systems QApplication can't be started without display. """
+    if sys.platform.startswith('win') or sys.platform == 'darwin':
+        return True
+    return bool(os.environ.get('DISPLAY'))
+
+
+def _initWorker(options):
+    """ Initialize export process: start Qt and open project (if it has not been inherited from parent process). """
+    global _app, _options
+    _options = options
+    _initGlobals(options)
+
+    from PySide.QtGui import QApplication
+    _app = QApplication.instance()
+    if _app is None:
+        _app = QApplication([sys.argv[0]])
+
+    if globals.project is None or globals.project.path != options.projectFile:
+        _openProject(options.projectFile)
+
+
+def _render(scene, rect, filename, scale):
+    from PySide.QtCore import QRectF, QSize, Qt
+    from PySide.QtGui import QImage, QPainter, QColor
+
+    if filename.endswith('.svg'):
+        from PySide.QtSvg import QSvgGenerator
+        device = QSvgGenerator()
+        device.setFileName(filename)
+        device.setSize(QSize(int(rect.width()), int(rect.height())))
+        device.setViewBox(QRectF(0.0, 0.0, rect.width(), rect.height()))
+        device.setTitle(os.path.splitext(os.path.basename(filename))[0])
+        target = QRectF(0.0, 0.0, rect.width(), rect.height())
+    else:
+        device = QImage(int(rect.width() * scale), int(rect.height() * scale), QImage.Format_ARGB32_Premultiplied)
+        device.fill(QColor(Qt.white).rgba())
+        target = QRectF(0.0, 0.0, device.width(), device.height())
+
+    painter = QPainter(device)
+    painter.setRenderHint(QPainter.Antialiasing)
+    painter.setRenderHint(QPainter.TextAntialiasing)
+    scene.render(painter, target, rect)
+    painter.end()
+
+    if isinstance(device, QImage):
+        return device.save(filename)
+    return True
+
+
+def exportTree(branchname):
+    """ Build diagram of tree with full name *branchname* and save it into output files.
+    Must be called in process initialized by _initWorker.
+    Returns tuple (branchname, list of saved files, error message or None). """
+    from treeview.diagram import TreeGraphicsScene
+
+    if globals.project is None:
+        return branchname, [], 'project has not been loaded'
+
+    files = outputFiles(branchname, _options)
+    scene = TreeGraphicsScene(globals.project, branchname, _options.horizontal, False)
+    try:
+        if scene.rootItem is None:
+            return branchname, [], 'tree has no root node'
+        rect = scene.itemsBoundingRect().adjusted(-_margin, -_margin, _margin, _margin)
+        saved = []
+        for filename in files:
+            folder = os.path.dirname(filename)
+            if folder and not os.path.exists(folder):
+                try:
+                    os.makedirs(folder)
+                except OSError:
+                    pass  # folder may be created by another process at the same time
+            if not _render(scene, rect, filename, _options.scale):
+                return branchname, saved, u'can\'t save file \"{0}\"'.format(filename)
+            saved.append(filename)
+        return branchname, saved, None
+    finally:
+        scene.flush()
+
+#######################################################################################################################
+
+
+def _readArgs(argv):
+    try:
+        opts, args = getopt.getopt(argv[1:], 'ho:f:j:s:t:vd', ['help', 'output=', 'format=', 'jobs=', 'scale=',
+                                                               'tree=', 'vertical', 'debug'])
+    except getopt.GetoptError as e:
+        print(u'error: {0}'.format(e))
+        print(_usage)
+        return None
+
+    options = ExportOptions()
+    for opt, arg in opts:
+        if opt in ('-h', '--help'):
+            print(_usage)
+            sys.exit(0)
+        elif opt in ('-o', '--output'):
+            options.outputDir = arg
+        elif opt in ('-f', '--format'):
+            options.formats = [fmt.strip().lower() for fmt in arg.split(',') if fmt.strip()]
+            for fmt in options.formats:
+                if fmt not in _formats:
+                    print(u'error: unknown format \"{0}\"! Available formats are: {1}.'.format(fmt, ', '.join(_formats)))
+                    return None
+        elif opt in ('-j', '--jobs'):
+            try:
+                options.processes = max(int(arg), 0)
+            except ValueError:
+                print(u'error: wrong number of jobs \"{0}\"!'.format(arg))
+                return None
+        elif opt in ('-s', '--scale'):
+            try:
+                options.scale = max(float(arg), 0.01)
+            except ValueError:
+                print(u'error: wrong scale \"{0}\"!'.format(arg))
+                return None
+        elif opt in ('-t', '--tree'):
+            options.filters.append(arg)
+        elif opt in ('-v', '--vertical'):
+            options.horizontal = False
+        elif opt in ('-d', '--debug'):
+            options.debug = True
+
+    if len(args) != 1 or not options.formats:
+        print(_usage)
+        return None
+
+    options.projectFile = toUnixPath(os.path.abspath(args[0]))
+    options.outputDir = toUnixPath(os.path.abspath(options.outputDir))
+    return options
+
+
+def main(argv):
+    options = _readArgs(argv)
+    if options is None:
+        return 1
+
+    if not _displayAvailable():
+        print('error: there is no display (DISPLAY environment variable is not set)! Qt needs X server to draw '
+              'diagrams, run export under virtual X server, e.g. "xvfb-run -a export_diagrams.sh ...".')
+        return 1
+
+    _resolvePaths(options)
+    _initGlobals(options)
+
+    # Project is opened before starting worker processes, so on systems with 'fork' workers get it for free
+    # (Qt is not started in main process for the same reason).
+    project = _openProject(options.projectFile)
+    if project is None:
+        print(u'error: can\'t open project \"{0}\"!'.format(options.projectFile))
+        return 1
+
+    branches = sorted(name for name in project.trees
+                      if not options.filters or any(f in name for f in options.filters))
+    if not branches:
+        print('warning: there are no trees to export.')
+        return 0
+
+    processes = options.processes if options.processes > 0 else multiprocessing.cpu_count()
+    processes = min(processes, len(branches))
+
+    print(u'info: Exporting {0} trees into \"{1}\" in {2} processes ...'.format(len(branches), options.outputDir,
+                                                                              processes))
+    if processes < 2:
+        _initWorker(options)
+        pool = None
+        results = (exportTree(name) for name in branches)
+    else:
+        pool = multiprocessing.Pool(processes, _initWorker, (options,))
+        results = pool.imap_unordered(exportTree, branches, max(1, len(branches) // (processes * 8)))
+
+    failed = 0
+    try:
+        for branchname, files, error in results:
+            if error is not None:
+                failed += 1
+                print(u'error: tree \"{0}\": {1}'.format(branchname, error))
+            elif globals.debugMode:
+                for filename in files:
+                    print(u'debug: \"{0}\" saved'.format(filename))
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    if failed:
+        print(u'error: {0} of {1} trees have not been exported!'.format(failed, len(branches)))
+        return 1
+
+    print(u'ok: {0} trees have been exported successfully.'.format(len(branches)))
+    return 0
+
+if __name__ == '__main__':
+    multiprocessing.freeze_support()
+    sys.exit(main(sys.argv))
@@ -124,6 +124,8 @@ intPreviousVersions = [versionToInt(ver) for ver in _previousVersions]
 
 scaleMax = 450.0  # Maximum scaling factor for graphics scene (Initial value is 100.0)
 scaleMin = 3.0  # Minimum scaling factor for graphics scene (Initial value is 100.0)
+lodSimplifiedScale = 35.0  # Below this scale diagrams are drawn without text and effects and with simplified shapes
+lodRectsScale = 12.0  # Below this scale diagram items are drawn as rectangles
 
 pressedKeys = []  # Current global pressed keys (Example: [Qt.Key_Ctrl, Qt.Key_C])
 
@@ -158,16 +160,22 @@ maxRecentProjects = int(10)
 
 historyEnabled = True
 maxBehaviorTreeHistory = int(20)
+maxHistoryMemory = int(256)  # Approximate memory limit for undo/redo history in megabytes (0 - no limit)
+
+loadingProcesses = int(1)  # Number of processes for reading tree files on project loading (0 - number of CPUs)
+projectCache = True  # Store parsed tree files in cache file next to project file ('.btcache')
 
 explicitConfig = False
 showLogo = True
 
 itemsAnimation = True
 itemsShadow = True
+cachedShadows = False  # Draw items shadows by cached pixmaps instead of graphics effect for each item (faster)
 connectorsHighlight = False
 connectorsBold = True
 
 linksEditable = False
+releaseCollapsedLinks = False  # Remove diagram items of collapsed link subtree (they are created again on expand)
 
 displayConstantaCopyright = False
 
@@ -0,0 +1,149 @@
+# coding=utf-8
+# -----------------
+# file      : indexedlist.py
+# date      : 2026/10/18
+# author    : Victor Zarubkin
+# contact   : victor.zarubkin@gmail.com
+# copyright : Copyright (C) 2026  Victor Zarubkin
+# license   : This file is part of BehaviorStudio.
+#           :
+#           : BehaviorStudio is free software: you can redistribute it and/or modify
+#           : it under the terms of the GNU General Public License as published by
+#           : the Free Software Foundation, either version 3 of the License, or
+#           : (at your option) any later version.
+#           :
+#           : BehaviorStudio is distributed in the hope that it will be useful,
+#           : but WITHOUT ANY WARRANTY; without even the implied warranty of
+#           : MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#           : GNU General Public License for more details.
+#           :
+#           : You should have received a copy of the GNU General Public License
+#           : along with BehaviorStudio. If not, see <http://www.gnu.org/licenses/>.
+#           :
+#           : A copy of the GNU General Public License can be found in file COPYING.
+############################################################################
+
+""" Ordered collection with O(1) membership test and index lookup.
+
+It is used for children of TreeNode (keyed by node uid) and for children and groups of diagram items
+(keyed by identity), so adding hundreds of children to one node does not scan the list on every addition.
+"""
+
+from __future__ import unicode_literals
+
+__author__ = 'Victor Zarubkin'
+__copyright__ = 'Copyright (C) 2026  Victor Zarubkin'
+__credits__ = ['Victor Zarubkin']
+__license__ = ['GPLv3']
+__version__ = '1.3.0'  # this is last application version when this script file was changed
+__email__ = 'victor.zarubkin@gmail.com'
+############################################################################
+
+#######################################################################################################################
+#######################################################################################################################
+
+
+class IndexedList(object):
+    """ List of items with unique keys and {key(item): position} map maintained alongside.
+
+    Membership test is always O(1). Appending and removing the last item keep positions up to date, other
+    insertions and removals shift positions like list does, so positions are just dropped and rebuilt on next lookup.
+    Reading is the same as for list: len(), iteration, indexing and slicing (slice returns list).
+    """
+
+    __slots__ = ('__items', '__keys', '__positions', '__key')
+
+    def __init__(self, items=None, key=id):
+        self.__key = key
+        self.__items = []
+        self.__keys = dict()  # {key(item): item}
+        self.__positions = dict()  # {key(item): index of item} or None if positions must be rebuilt
+        if items:
+            for item in items:
+                self.append(item)
+
+    def __len__(self):
+        return len(self.__items)
+
+    def __iter__(self):
+        return iter(self.__items)
+
+    def __reversed__(self):
+        return reversed(self.__items)
+
+    def __getitem__(self, index):
+        return self.__items[index]
+
+    def __contains__(self, item):
+        return self.__keys.get(self.__key(item)) is item
+
+    def __repr__(self):
+        return 'IndexedList({0!r})'.format(self.__items)
+
+    def find(self, item):
+        """ Returns index of item or -1 if there is no such item. """
+        k = self.__key(item)
+        if self.__keys.get(k) is not item:
+            return -1
+        if self.__positions is None:
+            key = self.__key
+            self.__positions = dict([(key(x), i) for i, x in enumerate(self.__items)])
+        return self.__positions[k]
+
+    def index(self, item):
+        i = self.find(item)
+        if i < 0:
+            raise ValueError('IndexedList.index(item): item is not in list')
+        return i
+
+    def hasKey(self, key):
+        return key in self.__keys
+
+    def append(self, item):
+        k = self.__key(item)
+        if k in self.__keys:
+            raise ValueError('IndexedList.append(item): item with the same key is already in list')
+        self.__keys[k] = item
+        if self.__positions is not None:
+            self.__positions[k] = len(self.__items)
+        self.__items.append(item)
+
+    def insert(self, index, item):
+        if index >= len(self.__items):
+            self.append(item)
+            return
+        k = self.__key(item)
+        if k in self.__keys:
+            raise ValueError('IndexedList.insert(index, item): item with the same key is already in list')
+        self.__keys[k] = item
+        self.__items.insert(index, item)
+        self.__positions = None
+
+    def remove(self, item):
+        k = self.__key(item)
+        if self.__keys.get(k) is not item:
+            raise ValueError('IndexedList.remove(item): item is not in list')
+        del self.__keys[k]
+        if self.__positions is not None:
+            i = self.__positions.pop(k)
+        else:
+            i = self.__items.index(item)
+        del self.__items[i]
+        if i != len(self.__items):
+            self.__positions = None
+
+    def swap(self, i, j):
+        items = self.__items
+        items[i], items[j] = items[j], items[i]
+        if self.__positions is not None:
+            key = self.__key
+            self.__positions[key(items[i])] = i if i >= 0 else i + len(items)
+            self.__positions[key(items[j])] = j if j >= 0 else j + len(items)
+
+    def clear(self):
+        del self.__items[:]
+        self.__keys.clear()
+        self.__positions = dict()
+
+#######################################################################################################################
+#######################################################################################################################
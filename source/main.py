@@ -41,6 +41,7 @@ import os
 import sys
 import getopt
 import socket
+import multiprocessing
 # import inspect
 import re
 
@@ -318,4 +319,5 @@ def main(argv):
     sys.exit()
 
 if __name__ == '__main__':
+    multiprocessing.freeze_support()  # required for parallel project loading in frozen executables
     main(sys.argv)
@@ -62,6 +62,12 @@ from auxtypes import toUnixPath, absPath, joinPath
 from language import Language, globalLanguage, trStr
 from remote_debugger.debugger_server import DebugServer
 from remote_debugger.debugger_widget import StateDebugDock
+from remote_debugger import debugger_globals
+
+try:
+    from remote_debugger.debugger_async_server import AsyncDebugServer
+except ImportError:
+    AsyncDebugServer = None  # asyncio is not available
 
 import globals
 
@@ -690,7 +696,10 @@ class MainWindow(QMainWindow):
         # generator.test()
 
         self._debugServer = None
-        self._debugServer = DebugServer()
+        if debugger_globals.asyncServer and AsyncDebugServer is not None:
+            self._debugServer = AsyncDebugServer()
+        else:
+            self._debugServer = DebugServer()
 
         self.readSettings()
 
@@ -1122,10 +1131,50 @@ class MainWindow(QMainWindow):
             except ValueError:
                 pass
 
+        if data[0].hasAttribute('maxHistoryMemory'):
+            try:
+                globals.maxHistoryMemory = max(int(data[0].getAttribute('maxHistoryMemory')), 0)
+            except ValueError:
+                pass
+
+        if data[0].hasAttribute('loadingProcesses'):
+            try:
+                globals.loadingProcesses = max(int(data[0].getAttribute('loadingProcesses')), 0)
+            except ValueError:
+                pass
+
+        if data[0].hasAttribute('projectCache'):
+            a = data[0].getAttribute('projectCache').lower()
+            globals.projectCache = a not in ('no', 'false', '0')
+
+        if data[0].hasAttribute('asyncDebugServer'):
+            a = data[0].getAttribute('asyncDebugServer').lower()
+            debugger_globals.asyncServer = a not in ('no', 'false', '0')
+
         if data[0].hasAttribute('editableLinks'):
             a = data[0].getAttribute('editableLinks').lower()
             globals.linksEditable = a not in ('no', 'false', '0')
 
+        if data[0].hasAttribute('releaseCollapsedLinks'):
+            a = data[0].getAttribute('releaseCollapsedLinks').lower()
+            globals.releaseCollapsedLinks = a not in ('no', 'false', '0')
+
+        if data[0].hasAttribute('cachedShadows'):
+            a = data[0].getAttribute('cachedShadows').lower()
+            globals.cachedShadows = a not in ('no', 'false', '0')
+
+        if data[0].hasAttribute('lodSimplifiedScale'):
+            try:
+                globals.lodSimplifiedScale = max(float(data[0].getAttribute('lodSimplifiedScale')), 0.0)
+            except ValueError:
+                pass
+
+        if data[0].hasAttribute('lodRectsScale'):
+            try:
+                globals.lodRectsScale = max(float(data[0].getAttribute('lodRectsScale')), 0.0)
+            except ValueError:
+                pass
+
         if data[0].hasAttribute('animation'):
             a = data[0].getAttribute('animation').lower()
             globals.itemsAnimation = a not in ('no', 'false', '0')
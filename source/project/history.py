@@ -38,30 +38,112 @@ __email__ = 'victor.zarubkin@gmail.com'
 ############################################################################
 
 import copy
+import sys
 
 from inspect import currentframe, getframeinfo
 
 from PySide.QtCore import QObject, Slot as QtSlot, Signal as QtSignal
 from PySide.QtGui import QAction
 
+from treenode import TreeNode, NodeAttr, librariesChanged
+from treeview.dispregime import DisplayRegime
+from compat_2to3 import *
 import globals
 
 #######################################################################################################################
 #######################################################################################################################
 
+# Each tree node is stored in history as an immutable record (tuple).
+# Records of unchanged nodes are shared between all history states, so each new state
+# costs only the nodes that were modified since the previous one.
+# Record fields order:
+_XML, _CLASS, _TYPE, _DEBUG, _SINGLEBLOCK, _LIBNAME, _NODENAME, _PATH, _REFNAME, _TARGET, _INVERSE, _DIAGRAM, \
+    _ATTRIBUTES, _CHILDREN, _PARENT = range(15)
+
+
+def _diagramRecord(diagramInfo):
+    horizontal = diagramInfo.autopositioning[DisplayRegime.Horizontal]
+    vertical = diagramInfo.autopositioning[DisplayRegime.Vertical]
+    return (bool(diagramInfo.expanded),
+            bool(horizontal.autopos), horizontal.shift.x(), horizontal.shift.y(),
+            bool(vertical.autopos), vertical.shift.x(), vertical.shift.y(),
+            diagramInfo.scenePos.x(), diagramInfo.scenePos.y())
+
+
+def _restoreDiagram(diagramInfo, record):
+    expanded, hAuto, hx, hy, vAuto, vx, vy, sceneX, sceneY = record
+    diagramInfo.expanded = expanded
+    horizontal = diagramInfo.autopositioning[DisplayRegime.Horizontal]
+    horizontal.autopos = hAuto
+    horizontal.shift.setX(hx)
+    horizontal.shift.setY(hy)
+    vertical = diagramInfo.autopositioning[DisplayRegime.Vertical]
+    vertical.autopos = vAuto
+    vertical.shift.setX(vx)
+    vertical.shift.setY(vy)
+    diagramInfo.scenePos.setX(sceneX)
+    diagramInfo.scenePos.setY(sceneY)
+
+
+def _attributesRecord(attributes):
+    record = []
+    for name in sorted(attributes):
+        attr = attributes[name]
+        value = attr.value()
+        if isinstance(value, list):
+            value = tuple(value)  # arrays are stored as tuples to keep record immutable
+        record.append((name, attr.dynamicKey(), value))
+    return tuple(record)
+
+
+def _nodeRecord(node):
+    parent = node.parent()
+    if parent is not None:
+        parent = parent.uid()
+    children = node.allChildren()
+    childrenRecord = tuple([(c, tuple([child.uid() for child in children[c]])) for c in sorted(children)])
+    return (node.xml, node.nodeClass, node.nodeType, bool(node.debug), bool(node.singleblock),
+            node.libname, node.nodeName, node.path(), node.refname(), node.target, node.isInverse(),
+            _diagramRecord(node.diagramInfo), _attributesRecord(node.attributes()), childrenRecord, parent)
+
+
+def _recordSize(record):
+    """ Returns approximate memory size of the record in bytes. """
+    size = sys.getsizeof(record) + sys.getsizeof(record[_DIAGRAM]) + sys.getsizeof(record[_ATTRIBUTES]) + \
+        sys.getsizeof(record[_CHILDREN])
+    for attr in record[_ATTRIBUTES]:
+        size += sys.getsizeof(attr) + sys.getsizeof(attr[2])
+    for child in record[_CHILDREN]:
+        size += sys.getsizeof(child) + sys.getsizeof(child[1])
+    return size
+
+
+def _librarySize(library):
+    """ Returns approximate memory size of the library copy in bytes. """
+    size = sys.getsizeof(library.list)
+    for nodename in library.list:
+        desc = library.list[nodename]
+        size += sys.getsizeof(desc.__dict__)
+        attributes = desc.attributes()
+        size += sys.getsizeof(attributes)
+        for a in attributes:
+            size += sys.getsizeof(attributes[a].__dict__)
+    return size
+
+#######################################################################################################################
+
 
 class _State(object):
-    def __init__(self, message, project, index):
+    def __init__(self, message, index, modified, trees, nodes, libraries, tree_paths, lib_paths, size):
         self.index = index
         self.message = message
-        self.modified = project.modified
-        self.trees = project.trees.deepcopy()
-        self.nodes = project.nodes.deepcopy(True)
-        self.libraries = dict()
-        for libname in project.libraries:
-            self.libraries[libname] = project.libraries[libname].deepcopy()
-        self.tree_paths = copy.copy(project.tree_paths)
-        self.lib_paths = copy.copy(project.lib_paths)
+        self.modified = modified
+        self.trees = trees  # copy of BehaviorTree (it is just a couple of dicts)
+        self.nodes = nodes  # dict {uid: record}, records are shared with other states
+        self.libraries = libraries  # dict {libname: NodeLibrary copy}, copies are shared with other states
+        self.tree_paths = tree_paths
+        self.lib_paths = lib_paths
+        self.size = size  # approximate memory size of data created for this state (not shared with previous one)
 
 
 class _StateRole(object):
@@ -93,6 +175,8 @@ class History(QObject):
         self._project = project
         self._undoList = []
         self._redoList = []
+        self._records = dict()  # records of the last saved state (used to share unchanged records)
+        self._libraries = dict()  # library copies of the last saved state (used to share unchanged libraries)
 
     def getUndoActions(self):
         return self._undoList
@@ -113,6 +197,8 @@ class History(QObject):
         globals.historySignals.redo.disconnect(self.redo)
         self._undoList = []
         self._redoList = []
+        self._records = dict()
+        self._libraries = dict()
 
     def hasUndoRecords(self):
         return bool(self._undoList)
@@ -133,33 +219,188 @@ class History(QObject):
         action.pressed.disconnect(self._onActionTriggered)
         return action
 
+    def _makeState(self, message, index):
+        """ Create new state from current project state.
+        Only nodes and libraries changed since previous saved state are copied,
+        all other data is shared with previous state.
+        """
+        project = self._project
+        size = 0
+
+        previousRecords = self._records
+        records = dict()
+        for uid in project.nodes:
+            record = _nodeRecord(project.nodes[uid])
+            previous = previousRecords.get(uid)
+            if previous is not None and previous == record:
+                record = previous
+            else:
+                size += _recordSize(record)
+            records[uid] = record
+        size += sys.getsizeof(records)
+
+        libraries = dict()
+        for libname in project.libraries:
+            lib = project.libraries[libname]
+            previous = self._libraries.get(libname)
+            if previous is not None and previous.revision == lib.revision:
+                libraries[libname] = previous
+            else:
+                libraries[libname] = lib.deepcopy()
+                size += _librarySize(lib)
+
+        self._records = records
+        self._libraries = libraries
+
+        return _State(message, index, project.modified, project.trees.deepcopy(), records, libraries,
+                      copy.copy(project.tree_paths), copy.copy(project.lib_paths), size)
+
+    def _memorySize(self):
+        size = 0
+        for action in self._undoList:
+            size += action.state.size
+        for action in self._redoList:
+            size += action.state.size
+        return size
+
+    def _fitMemoryBudget(self):
+        """ Remove oldest states while history exceeds memory limit (globals.maxHistoryMemory, in megabytes).
+        The newest undo state is never removed.
+        """
+        if globals.maxHistoryMemory <= 0:
+            return
+        limit = globals.maxHistoryMemory * 1024 * 1024
+        size = self._memorySize()
+        while size > limit:
+            if len(self._undoList) > 1:
+                size -= self._popUndo(0).state.size
+            elif self._redoList:
+                size -= self._popRedo(0).state.size
+            else:
+                break
+
     def _pushUndo(self, message):
         """ Save current state into undo list. """
-        action = _StateAction(_State(message, self._project, len(self._undoList)), _StateRole.Undo)
+        action = _StateAction(self._makeState(message, len(self._undoList)), _StateRole.Undo)
         action.pressed.connect(self._onActionTriggered)
         self._undoList.append(action)
         if len(self._undoList) > globals.maxBehaviorTreeHistory:
             self._popUndo(0)
+        self._fitMemoryBudget()
 
     def _pushRedo(self, message):
         """ Save current state into redo list. """
-        action = _StateAction(_State(message, self._project, len(self._redoList)), _StateRole.Redo)
+        action = _StateAction(self._makeState(message, len(self._redoList)), _StateRole.Redo)
         action.pressed.connect(self._onActionTriggered)
         self._redoList.append(action)
         if len(self._redoList) > globals.maxBehaviorTreeHistory:
             self._popRedo(0)
+        self._fitMemoryBudget()
 
     def _restore(self, state):
-        self._project.trees = state.trees
-        self._project.nodes = state.nodes
-        self._project.libraries = state.libraries
-        self._project.modified = state.modified
-        self._project.tree_paths = state.tree_paths
-        self._project.lib_paths = state.lib_paths
+        """ Restore project state.
+        Must be called right after saving current state (self._records must describe current project state).
+        Existing tree nodes are modified only if they differ from saved records; libraries are copied only
+        if they differ from current libraries.
+        """
+        project = self._project
+        nodes = project.nodes
+        currentRecords = self._records
+        records = state.nodes
+
+        for uid in list(nodes):
+            if uid not in records:
+                nodes.remove(nodes[uid])
+
+        changed = []
+        created = set()
+        for uid in records:
+            record = records[uid]
+            current = currentRecords.get(uid)
+            if current is record or current == record:
+                if uid in nodes:
+                    continue
+            node = nodes[uid]
+            if node is None:
+                node = TreeNode(project, record[_XML], record[_CLASS], record[_TYPE], record[_DEBUG], uid)
+                nodes.add(node)
+                created.add(uid)
+            self.__restoreNode(node, record, current)
+            changed.append(uid)
+
+        # re-link children and parents:
+        if created:
+            relink = [uid for uid in records if uid not in created and self.__hasChildIn(records[uid], created)]
+            changed.extend(relink)
+        for uid in changed:
+            node = nodes[uid]
+            children = dict()
+            for c, uids in records[uid][_CHILDREN]:
+                children[c] = [nodes[child] for child in uids if child in nodes]
+            node._setChildren(children)
+            node.setParent(nodes.get(records[uid][_PARENT]))
+        if created:
+            for uid in records:
+                parent = records[uid][_PARENT]
+                if parent in created:
+                    nodes[uid].setParent(nodes[parent])
+
+        libraries = dict()
+        for libname in state.libraries:
+            lib = state.libraries[libname]
+            current = project.libraries.get(libname)
+            if current is not None and current.revision == lib.revision:
+                libraries[libname] = current
+            else:
+                libraries[libname] = lib.deepcopy()  # saved copy may be shared with other states
+        project.libraries = libraries
+        librariesChanged()
+        self._libraries = dict(state.libraries)
+
+        project.trees = state.trees
+        project.modified = state.modified
+        project.tree_paths = state.tree_paths
+        project.lib_paths = state.lib_paths
+
+        self._records = records
+
+    @staticmethod
+    def __hasChildIn(record, uids):
+        for _, children in record[_CHILDREN]:
+            for child in children:
+                if child in uids:
+                    return True
+        return False
+
+    def __restoreNode(self, node, record, current):
+        node.setXmlSource(record[_XML])
+        node.setNodeClass(record[_CLASS])
+        node.nodeType = record[_TYPE]
+        node.setDebugMode(record[_DEBUG])
+        node.setSingleblock(record[_SINGLEBLOCK])
+        node.setLibName(record[_LIBNAME])
+        node.setNodeName(record[_NODENAME])
+        node.setPath(record[_PATH])
+        node.setRefName(record[_REFNAME])
+        node.target = record[_TARGET]
+        node.setInverse(record[_INVERSE])
+        _restoreDiagram(node.diagramInfo, record[_DIAGRAM])
+        if current is None or current[_ATTRIBUTES] != record[_ATTRIBUTES] or \
+                current[_LIBNAME] != record[_LIBNAME] or current[_NODENAME] != record[_NODENAME]:
+            attributes = dict()
+            for name, key, value in record[_ATTRIBUTES]:
+                attr = NodeAttr(name, node.nodeName, node.libname, self._project, key)
+                if isinstance(value, tuple):
+                    value = list(value)
+                attr.setActualValueNoCheck(value)
+                attributes[name] = attr
+            node._setAttributes(attributes)
 
     def clear(self):
         self._undoList = []
         self._redoList = []
+        self._records = dict()
+        self._libraries = dict()
         if not self._silent:
             globals.historySignals.undoRedoChange.emit()
 
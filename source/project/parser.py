@@ -46,8 +46,10 @@ from . import alphabet
 from . import shapelib
 from . import liparser
 from . import treeparser
+from . import treecache
 
 from auxtypes import processString, absPath, toUnixPath, relativePath
+from treenode import librariesChanged
 import globals
 
 
@@ -155,6 +157,7 @@ class ProjParser(object):
         if not the_proj.trees or not the_proj.tree_paths:
             print('WARNING: the project have no trees.')
 
+        the_proj.dirtyTreeFiles.reset()
         the_proj.modified = False
 
         return the_proj
@@ -299,6 +302,7 @@ class ProjParser(object):
             # add loaded libraries to the project's library list:
             for l in ll:
                 the_proj.libraries[l] = ll[l]
+            librariesChanged()
 
             # saving library path
             the_proj.lib_paths.append(libpath)
@@ -307,6 +311,7 @@ class ProjParser(object):
     # the_proj - reference to project
     # trees - reference to list of xml dom-nodes with trees paths
     def __openTrees(self, the_proj, trees):
+        paths = []
         for tree in trees:
             # reading path to a tree from xml:
             plist = self.__getPath(tree, the_proj.path)
@@ -321,10 +326,20 @@ class ProjParser(object):
             # if treepath in the_proj.tree_paths:
             #     continue # that tree have already been loaded
 
-            temp = plist[1]  # target file (full path)
+            paths.append(plist[1])  # target file (full path)
+
+        cache = None
+        if globals.projectCache:
+            cache = treecache.TreeCache(the_proj.path)
+
+        # Xml-files are read from cache or in parallel processes (if enabled), but tree nodes are created here
+        # one file after another, so uids and branches are registered in the same order every time:
+        reader = self.__tree_parser.read(paths, the_proj.alphabet, globals.loadingProcesses, cache)
+        for i, data in enumerate(reader):
+            temp = paths[i]
 
             # parsing specified tree (tr - tree list loaded from this file; tr is treenode.BehaviorTree):
-            bt, nodes, treesFiles = self.__tree_parser.load([temp], the_proj)
+            bt, nodes, treesFiles = self.__tree_parser.load([temp], the_proj, data)
             if treesFiles[0] in the_proj.tree_paths:  # trees.empty():
                 print('warning: can not load tree from \"{0}\"'.format(temp))
                 continue
@@ -339,6 +354,9 @@ class ProjParser(object):
             # saving tree path
             the_proj.tree_paths.append(treesFiles[0])  # treepath)
 
+        if cache is not None:
+            cache.save()
+
     def __getPathWithCommonChecking(self, xml_node, the_proj):
         is_common_lib = False
         if xml_node.hasAttribute('common'):
@@ -387,8 +405,9 @@ class ProjParser(object):
 
         globals.generalSignals.preSave.emit()
 
-        # saving trees
-        self.__tree_parser.save(project.alphabet, project.trees, project.nodes, project.tree_paths)
+        # saving trees (only modified files will be saved)
+        self.__tree_parser.save(project.alphabet, project.trees, project.nodes, project.tree_paths,
+                                project.dirtyTreeFiles)
 
         # saving libraries
         if globals.saveLibraries:
@@ -45,7 +45,7 @@ from time import sleep
 
 from PySide.QtGui import *
 
-from treenode import BehaviorTree, TreeNodeDesc, TreeNodes
+from treenode import BehaviorTree, TreeNodeDesc, TreeNodes, librariesChanged
 from .history import History
 
 from . import liparser
@@ -71,10 +71,12 @@ class Project(object):
         self.libraries = {}
         self.trees = BehaviorTree()
         self.nodes = TreeNodes()
+        self.renamedNodes = dict()  # {(libname, oldname): newname} for copies of attributes, see NodeAttr.nodeDesc
         self.top_level_trees = []
         self.__lib_parser = liparser.LibParser()
         self.__tree_parser = treeparser.TreeParser()
         self.__history = History(self)
+        self.dirtyTreeFiles = treeparser.DirtyTreeFiles(self)  # tree files modified since last save
 
         globals.librarySignals.excludeLibrary.connect(self.excludeLibrary)
 
@@ -133,11 +135,13 @@ class Project(object):
 
                 for libname in loaded_libs:
                     self.libraries[libname] = loaded_libs[libname]
+                librariesChanged()
 
-                for uid in self.nodes:
-                    node = self.nodes[uid]
-                    if not node.isEmpty():
-                        node.reparseAttributes()
+                for libname in loaded_libs:
+                    for uid in self.nodes.uidsOfLibrary(libname):
+                        node = self.nodes[uid]
+                        if not node.isEmpty():
+                            node.reparseAttributes()
 
                 for libname in loaded_libs:
                     globals.librarySignals.libraryAdded.emit(libname)
@@ -171,6 +175,7 @@ class Project(object):
                 globals.historySignals.pushState.emit('Exclude library \'{0}\' from project'.format(libname))
                 self.modified = True
                 del self.libraries[libname]
+                librariesChanged()
                 globals.librarySignals.libraryExcluded.emit(libname)
 
     def gotTree(self, fullname):
@@ -190,6 +195,7 @@ class Project(object):
                 bt = nodes[uid]
                 if self.trees.add(bt, silent=True):
                     self.nodes.add(bt, recursive=True)
+            self.dirtyTreeFiles.setLoaded(path)
             self.modified = True
             return True
         return False
@@ -214,12 +220,20 @@ class Project(object):
             node.name = newname
             library.list[newname] = node
             print('OK: Node \'{0}\' of library \'{1}\' has been renamed to \'{2}\'.'.format(oldname, libname, newname))
+            self.libraries[libname].updateRevision()
             self.modified = True
 
-            for uid in self.nodes:
+            for uid in self.nodes.uidsOf(libname, oldname):
                 treeNode = self.nodes[uid]
                 treeNode.rename(libname, oldname, newname, recursive=False)
 
+            # older names of this node are now names of newname
+            for key in self.renamedNodes:
+                if key[0] == libname and self.renamedNodes[key] == oldname:
+                    self.renamedNodes[key] = newname
+            self.renamedNodes.pop((libname, newname), None)
+            self.renamedNodes[(libname, oldname)] = newname
+
             globals.librarySignals.nodeRenamed.emit(libname, oldname, newname)
 
     def __onRemoveNode(self, libname, nodename):
@@ -251,6 +265,7 @@ class Project(object):
                       .format(library.list[nodename].nodeType, library.list[nodename].nodeClass, nodename, libname))
                 nodeClass = library.list[nodename].nodeClass
                 del library.list[nodename]
+                self.libraries[libname].updateRevision()
                 self.modified = True
                 globals.librarySignals.nodeRemoved.emit(libname, nodename, nodeClass)
 
@@ -266,6 +281,7 @@ class Project(object):
             library = self.libraries[libname]
             creatorOld = library.list[nodename].creator
             library.list[nodename].setCreator(creator)
+            self.libraries[libname].updateRevision()
             self.modified = True
             globals.librarySignals.creatorChanged.emit(libname, nodename, creatorOld, creator)
 
@@ -275,9 +291,10 @@ class Project(object):
                 'Rename attribute for node \'{0}\' in library \'{1}\''.format(nodename, libname))
             success, attrname = self.libraries[libname].list[nodename].renameAttribute(oldname, newname, full)
             if success:
+                self.libraries[libname].updateRevision()
                 self.modified = True
 
-                for uid in self.nodes:
+                for uid in self.nodes.uidsOf(libname, nodename):
                     treeNode = self.nodes[uid]
                     treeNode.renameAttribute(libname, nodename, oldname, attrname, recursive=False)
 
@@ -292,9 +309,10 @@ class Project(object):
             globals.historySignals.pushState.emit(
                 'Modify attribute for node \'{0}\' in library \'{1}\''.format(nodename, libname))
             if old_attr is not None and node.replaceAttribute(attributeName, attributeDesc):
+                self.libraries[libname].updateRevision()
                 self.modified = True
 
-                for uid in self.nodes:
+                for uid in self.nodes.uidsOf(libname, nodename):
                     treeNode = self.nodes[uid]
                     treeNode.validateAttribute(libname, nodename, attributeName, old_attr, recursive=False)
 
@@ -308,9 +326,10 @@ class Project(object):
             globals.historySignals.pushState.emit(
                 'Add new attribute for node \'{0}\' in library \'{1}\''.format(nodename, libname))
             if node.addAttribute(attributeDesc):
+                self.libraries[libname].updateRevision()
                 self.modified = True
 
-                for uid in self.nodes:
+                for uid in self.nodes.uidsOf(libname, nodename):
                     treeNode = self.nodes[uid]
                     treeNode.addAttribute(libname, nodename, attributeName, recursive=False)
 
@@ -324,9 +343,10 @@ class Project(object):
             globals.historySignals.pushState.emit(
                 'Delete attribute for node \'{0}\' in library \'{1}\''.format(nodename, libname))
             if node.deleteAttribute(attributeName):
+                self.libraries[libname].updateRevision()
                 self.modified = True
 
-                for uid in self.nodes:
+                for uid in self.nodes.uidsOf(libname, nodename):
                     treeNode = self.nodes[uid]
                     treeNode.deleteAttribute(libname, nodename, attributeName, recursive=False)
 
@@ -370,6 +390,7 @@ class Project(object):
 
             library.list[nodename] = newNode
             print('ok: added new {0} {1} node \'{2}\' into {3} library'.format(nodeType, nodeClass, nodename, libname))
+            self.libraries[libname].updateRevision()
             self.modified = True
 
             globals.librarySignals.nodeAdded.emit(libname, nodename)
@@ -412,6 +433,7 @@ class Project(object):
             library.list[nodename] = node
             print('ok: added {0} {1} node \'{2}\' into {3} library'
                   .format(node.nodeType, node.nodeClass, nodename, libname))
+            self.libraries[libname].updateRevision()
             self.modified = True
 
             globals.librarySignals.nodeAdded.emit(libname, nodename)
@@ -428,16 +450,17 @@ class Project(object):
 
             lib = self.libraries[oldName]
             lib.libname = newName
+            lib.updateRevision()
 
             for nodeName in lib.list:
                 lib.list[nodeName].setLibrary(newName)
 
-            for node in self.nodes:
-                if node.libname == oldName:
-                    node.setLibName(newName)
+            for uid in self.nodes.uidsOfLibrary(oldName):
+                self.nodes[uid].setLibName(newName)
 
             self.libraries[newName] = lib
             del self.libraries[oldName]
+            librariesChanged()
 
             print('ok: Library \'{0}\' renamed to \'{1}\''.format(oldName, newName))
             print('')
@@ -484,9 +507,10 @@ class Project(object):
             print('ok: type of {0}::{1} node was changed from \'{2}\' to \'{3}\''
                   .format(libname, nodename, typeOld, typeName))
 
+            self.libraries[libname].updateRevision()
             self.modified = True
 
-            for uid in self.nodes:
+            for uid in self.nodes.uidsOf(libname, nodename):
                 treeNode = self.nodes[uid]
                 treeNode.changeType(libname, nodename, typeName, recursive=False)
 
@@ -513,6 +537,7 @@ class Project(object):
                 'Change possible child types for node \'{0}\' in library \'{1}\''.format(nodename, libname))
 
             node.childClasses = accepted_children
+            self.libraries[libname].updateRevision()
             self.modified = True
 
             globals.librarySignals.nodeChildrenChanged.emit(libname, nodename)
@@ -522,6 +547,7 @@ class Project(object):
             globals.historySignals.pushState.emit(
                 'Change description for node \'{0}\' in library \'{1}\''.format(nodename, libname))
             self.libraries[libname].list[nodename].description = description
+            self.libraries[libname].updateRevision()
             self.modified = True
             globals.librarySignals.nodeDescriptionChanged.emit(libname, nodename, description)
 
@@ -534,6 +560,7 @@ class Project(object):
                 node.shape = self.shapelib[shapename]
                 color = globals.project.alphabet[node.nodeClass].defaultState().colorEnabled
                 node.icon = node.shape.icon(color)
+                self.libraries[libname].updateRevision()
                 self.modified = True
                 globals.librarySignals.nodeShapeChanged.emit(libname, nodename, shapename)
 
@@ -546,6 +573,7 @@ class Project(object):
                     globals.historySignals.pushState.emit('Change incoming event name for \
                         node \'{0}\' in library \'{1}\''.format(nodename, libname))
                     node.incomingEvents[index] = newname
+                    self.libraries[libname].updateRevision()
                     self.modified = True
 
     def __onOutgoingEventRenameNode(self, libname, nodename, oldname, newname):
@@ -557,6 +585,7 @@ class Project(object):
                     globals.historySignals.pushState.emit('Change outgoing event name for \
                         node \'{0}\' in library \'{1}\''.format(nodename, libname))
                     node.outgoingEvents[index] = newname
+                    self.libraries[libname].updateRevision()
                     self.modified = True
 
     def __onIncomingEventAddNode(self, libname, nodename, eventName):
@@ -566,6 +595,7 @@ class Project(object):
                 globals.historySignals.pushState.emit(
                     'Add new incoming event for node \'{0}\' in library \'{1}\''.format(nodename, libname))
                 node.incomingEvents.append(eventName)
+                self.libraries[libname].updateRevision()
                 self.modified = True
                 globals.librarySignals.nodeEventsCountChanged.emit(libname, nodename)
 
@@ -576,6 +606,7 @@ class Project(object):
                 globals.historySignals.pushState.emit(
                     'Add new outgoing event for node \'{0}\' in library \'{1}\''.format(nodename, libname))
                 node.outgoingEvents.append(eventName)
+                self.libraries[libname].updateRevision()
                 self.modified = True
                 globals.librarySignals.nodeEventsCountChanged.emit(libname, nodename)
 
@@ -588,6 +619,7 @@ class Project(object):
                     globals.historySignals.pushState.emit(
                         'Remove incoming event for node \'{0}\' in library \'{1}\''.format(nodename, libname))
                     node.incomingEvents.pop(index)
+                    self.libraries[libname].updateRevision()
                     self.modified = True
                     globals.librarySignals.nodeEventsCountChanged.emit(libname, nodename)
 
@@ -600,6 +632,7 @@ class Project(object):
                     globals.historySignals.pushState.emit(
                         'Remove outgoing event for node \'{0}\' in library \'{1}\''.format(nodename, libname))
                     node.outgoingEvents.pop(index)
+                    self.libraries[libname].updateRevision()
                     self.modified = True
                     globals.librarySignals.nodeEventsCountChanged.emit(libname, nodename)
 
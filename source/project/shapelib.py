@@ -73,6 +73,9 @@ class PPRenderer(object):
     def viewBoxF(self):
         return self.__viewboxF
 
+    def path(self):
+        return self.__path
+
     def render(self, painter, vbox=None):
         if self.__isInit:
             painter.drawPath(self.__path)
@@ -180,6 +183,7 @@ class VecShape(object):
         self.verticalBoundPoints = []
         self.horizontalBoundPoints = []
         self.__textPoint = QPointF()
+        self.__simplifiedPaths = dict()  # {scale: QPainterPath} - cache for VecShape.simplifiedPath
 
     def name(self):
         return self.__name
@@ -227,6 +231,29 @@ class VecShape(object):
         #                  QSizeF(self.__sign.viewBoxF().width(), self.__sign.viewBoxF().height()))
         self.__sign.render(painter, QRectF(self.__sign.viewBoxF()))
 
+    def simplifiedPath(self, scale):
+        """ Returns outline of shape for drawing with small *scale* (1.0 is 100%). Curves are replaced with
+        polylines which are precise enough for this scale and parts which are smaller than one pixel are skipped.
+        If *scale* is 0 then bounding rectangle of shape is returned. Paths are created once for each scale. """
+        if scale in self.__simplifiedPaths:
+            return self.__simplifiedPaths[scale]
+
+        path = QPainterPath()
+        if scale > 0.0 and isinstance(self.__sign, PPRenderer) and self.__sign.isInit():
+            path.setFillRule(Qt.WindingFill)
+            minSize = 1.0 / scale
+            toScale = QTransform.fromScale(scale, scale)
+            fromScale = QTransform.fromScale(minSize, minSize)
+            for polygon in self.__sign.path().toSubpathPolygons(toScale):
+                rect = polygon.boundingRect()
+                if rect.width() >= 1.0 or rect.height() >= 1.0:
+                    path.addPolygon(fromScale.map(polygon))
+        if path.isEmpty():
+            path.addRect(QRectF(self.__sign.viewBoxF()))
+
+        self.__simplifiedPaths[scale] = path
+        return path
+
     def paintBackground(self, painter):
         if isinstance(self.__sign, PPRenderer):
             self.__sign.render(painter)
@@ -0,0 +1,191 @@
+# coding=utf-8
+# -----------------
+# file      : treecache.py
+# date      : 2026/10/18
+# author    : Victor Zarubkin
+# contact   : victor.zarubkin@gmail.com
+# copyright : Copyright (C) 2026  Victor Zarubkin
+# license   : This file is part of BehaviorStudio.
+#           :
+#           : BehaviorStudio is free software: you can redistribute it and/or modify
+#           : it under the terms of the GNU General Public License as published by
+#           : the Free Software Foundation, either version 3 of the License, or
+#           : (at your option) any later version.
+#           :
+#           : BehaviorStudio is distributed in the hope that it will be useful,
+#           : but WITHOUT ANY WARRANTY; without even the implied warranty of
+#           : MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#           : GNU General Public License for more details.
+#           :
+#           : You should have received a copy of the GNU General Public License
+#           : along with BehaviorStudio. If not, see <http://www.gnu.org/licenses/>.
+#           :
+#           : A copy of the GNU General Public License can be found in file COPYING.
+############################################################################
+
+""" On-disk cache of parsed tree files.
+
+Cache file is placed next to the project file and has extension '.btcache'.
+It stores data read from each tree file and it's diagram file (see treeparser._readTreeFile),
+so unchanged files are not parsed again on next project opening.
+"""
+
+from __future__ import unicode_literals
+
+__author__ = 'Victor Zarubkin'
+__copyright__ = 'Copyright (C) 2026  Victor Zarubkin'
+__credits__ = ['Victor Zarubkin']
+__license__ = ['GPLv3']
+__version__ = '1.3.0'  # this is last application version when this script file was changed
+__email__ = 'victor.zarubkin@gmail.com'
+############################################################################
+
+import os
+import gc
+import sys
+import marshal
+import hashlib
+
+#######################################################################################################################
+#######################################################################################################################
+
+_cacheVersion = 1  # must be increased on every change of cached data format
+
+
+def _fileStat(filename):
+    """ Returns tuple (modification time, size) for specified file or None if there is no such file. """
+    try:
+        st = os.stat(filename)
+    except OSError:
+        return None
+    return st.st_mtime, st.st_size
+
+
+def _diagramFile(filename):
+    fname, _ = os.path.splitext(filename)
+    return fname + '.dgm'
+
+
+def _filesDigest(filenames):
+    digest = hashlib.sha1()
+    for filename in filenames:
+        if os.path.exists(filename):
+            with open(filename, 'rb') as f:
+                digest.update(f.read())
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+#######################################################################################################################
+#######################################################################################################################
+
+
+class TreeCache(object):
+    """ Cache of tree files data for project loading.
+
+    Each entry is checked by modification time and size of tree file and it's diagram file.
+    If they have changed, then hash of files contents is compared, so touched but unchanged files
+    are still loaded from cache.
+    """
+
+    def __init__(self, projectPath):
+        self.__path = os.path.splitext(projectPath)[0] + '.btcache'
+        self.__scheme = None
+        self.__entries = dict()  # {file name: (tree file stat, diagram file stat, digest, data)}
+        self.__pending = dict()  # {file name: (tree file stat, diagram file stat, digest)} for files to be read
+        self.__used = set()
+        self.__modified = False
+        self.__load()
+
+    def path(self):
+        return self.__path
+
+    def setScheme(self, scheme):
+        """ Set part of alphabet used to read tree files. All entries are dropped if it differs from cached one. """
+        if scheme != self.__scheme:
+            if self.__entries:
+                print('info: Alphabet has been changed. Project cache will be rebuilt.')
+            self.__scheme = scheme
+            self.__entries.clear()
+            self.__modified = True
+
+    def get(self, filename):
+        """ Returns cached data for specified tree file or None if file has been changed since it was cached. """
+        files = (filename, _diagramFile(filename))
+        stats = (_fileStat(files[0]), _fileStat(files[1]))
+        entry = self.__entries.get(filename)
+        if entry is not None:
+            if entry[:2] == stats:
+                self.__used.add(filename)
+                return entry[3]
+            digest = _filesDigest(files)
+            if entry[2] == digest:
+                self.__entries[filename] = (stats[0], stats[1], digest, entry[3])
+                self.__used.add(filename)
+                self.__modified = True
+                return entry[3]
+            del self.__entries[filename]
+            self.__modified = True
+        else:
+            digest = _filesDigest(files)
+        self.__pending[filename] = (stats[0], stats[1], digest)
+        return None
+
+    def put(self, filename, data):
+        """ Store data for specified tree file. TreeCache.get must be called for this file before reading it. """
+        key = self.__pending.pop(filename, None)
+        if key is None or data is None:
+            return
+        self.__entries[filename] = (key[0], key[1], key[2], data)
+        self.__used.add(filename)
+        self.__modified = True
+
+    def save(self):
+        """ Write cache file. Entries for files which were not requested since cache loading are dropped. """
+        for filename in list(self.__entries.keys()):
+            if filename not in self.__used:
+                del self.__entries[filename]
+                self.__modified = True
+
+        self.__pending.clear()
+        if not self.__modified:
+            return True
+
+        tempPath = self.__path + '.tmp'
+        try:
+            with open(tempPath, 'wb') as f:
+                f.write(marshal.dumps((_cacheVersion, tuple(sys.version_info[:2]), self.__scheme, self.__entries)))
+            if os.path.exists(self.__path):
+                os.remove(self.__path)
+            os.rename(tempPath, self.__path)
+        except (IOError, OSError, ValueError) as e:
+            print('warning: Can\'t write project cache \"{0}\": {1}'.format(self.__path, e))
+            return False
+
+        self.__modified = False
+        return True
+
+    def __load(self):
+        if not os.path.exists(self.__path):
+            return
+        # cache contains millions of small objects, so garbage collector is disabled while loading it
+        # (otherwise it would be triggered a lot of times without any result):
+        gcEnabled = gc.isenabled()
+        gc.disable()
+        try:
+            with open(self.__path, 'rb') as f:
+                version, pythonVersion, scheme, entries = marshal.loads(f.read())
+        except (IOError, OSError, EOFError, ValueError, TypeError) as e:
+            print('warning: Can\'t read project cache \"{0}\": {1}'.format(self.__path, e))
+            return
+        finally:
+            if gcEnabled:
+                gc.enable()
+        if version != _cacheVersion or pythonVersion != tuple(sys.version_info[:2]):
+            print('info: Project cache \"{0}\" is out of date and will be rebuilt.'.format(self.__path))
+            return
+        self.__scheme = scheme
+        self.__entries = entries
+        print('info: Project cache \"{0}\" has been loaded.'.format(self.__path))
+
+#######################################################################################################################
+#######################################################################################################################
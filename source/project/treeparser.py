@@ -38,9 +38,16 @@ __email__ = 'victor.zarubkin@gmail.com'
 ############################################################################
 
 import os
+import multiprocessing
 from xml.dom.minidom import parse, Document
 
+try:
+    from xml.etree.cElementTree import iterparse, Element
+except ImportError:
+    from xml.etree.ElementTree import iterparse, Element
+
 from auxtypes import processString, toUnixPath
+from compat_2to3 import dict_items
 
 import treenode
 from treeview.dispregime import DisplayRegime
@@ -55,6 +62,213 @@ def fullTreeName(path, name):
 
 _versionWithUids = (1, 2)  # first Behavior Studio version with nodes' uids
 
+
+def _fileVersion(versionText):
+    """ Returns tuple (version, info message) for version attribute value of tree file. """
+    global _versionWithUids
+    if not versionText or '.' not in versionText:
+        version = tuple(_versionWithUids)
+        return version, 'info: File has no version. Default it to {0}'.format(globals.versionToStr(version))
+    return globals.versionFromStr(versionText), 'info: File version is {0}'.format(versionText)
+
+
+def _domAttributes(node):
+    """ Returns dict with attributes of xml.dom.minidom node or None if node is None. """
+    if node is None:
+        return None
+    return dict(node.attributes.items())
+
+
+def _topClasses(alphabet):
+    """ Returns dict {tag: class} for main classes of alphabet. """
+    topClasses = dict()
+    for t in alphabet.getClasses(True):
+        cls = alphabet.getClass(t)
+        if cls.tag not in topClasses:
+            topClasses[cls.tag] = cls
+    return topClasses
+
+
+def _loadingResult(filename, empty, num_loaded):
+    if empty:
+        print('warning: Tree \"{0}\" is empty!'.format(filename))
+        return 0, [filename]
+
+    if num_loaded < 1:
+        print('warning: no trees were loaded!')
+
+    print('ok: Parsing complete.')
+    print('')
+
+    return num_loaded, [filename]
+
+
+def _readDiagrams(filename, headerTag):
+    """ Read diagram file for specified tree file.
+    Returns dict {uid: attributes} where uid is a string and attributes is a dict of diagram xml-element.
+    """
+    diagrams = dict()
+    fname, _ = os.path.splitext(filename)
+    diagram_file = fname + '.dgm'
+    if not os.path.exists(diagram_file):
+        return diagrams
+
+    header = None
+    for event, elem in iterparse(diagram_file, events=('start', 'end')):
+        if header is None:
+            header = elem
+            if elem.tag != headerTag:
+                return diagrams
+        elif event == 'end':
+            if elem is not header and 'uid' in elem.attrib:
+                diagrams[elem.get('uid')] = dict(elem.attrib)
+            elem.clear()
+
+    return diagrams
+
+
+def _elementData(elem):
+    """ Converts xml-element into tuple (tag, attributes, children) which can be passed between processes. """
+    return elem.tag, dict(elem.attrib), tuple([_elementData(child) for child in elem])
+
+
+def _dataElement(data):
+    """ Converts tuple returned by _elementData back into xml-element. """
+    tag, attrib, children = data
+    elem = Element(tag, attrib)
+    for child in children:
+        elem.append(_dataElement(child))
+    return elem
+
+
+def _treeScheme(alphabet):
+    """ Returns part of alphabet required to read tree files by worker processes (alphabet itself
+    can not be passed between processes because it contains Qt objects).
+
+    Returns tuple (header tag, {top class tag: class name}, {class name: (attributes tag, types)})
+    where types is dict {type name: (is link, {child class tag: child class name})}.
+    """
+    topTags = dict()
+    for tag, cls in dict_items(_topClasses(alphabet).items()):
+        topTags[tag] = cls.name
+
+    classes = dict()
+    for classname in alphabet.getClasses():
+        cls = alphabet.getClass(classname)
+        types = dict()
+        for typename in cls:
+            subType = cls.get(typename)
+            childTags = dict()
+            for chldCls in subType.children:
+                childClass = alphabet.getClass(chldCls)
+                if childClass is not None and subType.children[chldCls].max > 0:
+                    childTags[childClass.tag] = childClass.name
+            types[typename] = (subType.isLink(), childTags)
+        classes[cls.name] = (cls.attributes.tag, types)
+
+    return alphabet.headerTree, topTags, classes
+
+
+def _readTreeFile(task):
+    """ Read tree file and it's diagram file into plain data which can be passed between processes.
+
+    This function is executed by worker processes of parallel project loading (see TreeParser.read).
+    task is tuple (file name, tree scheme returned by _treeScheme).
+
+    Returns tuple (version info message, list of top-level node records) where each record is
+    tuple (tag, attributes, attributes tag data, diagram attributes, list of child records).
+    Returns None if file must be loaded by TreeParser itself (old file versions or errors in file).
+    """
+    global _versionWithUids
+
+    filename, (headerTag, topTags, classes) = task
+    try:
+        context = iterparse(filename, events=('start', 'end'))
+        _, mainNode = next(context)
+        if mainNode.tag != headerTag:
+            return None
+
+        version, versionText = _fileVersion(mainNode.get('Version', mainNode.get('version', '')))
+        if version < _versionWithUids:
+            return None
+
+        diagrams = _readDiagrams(filename, headerTag)
+
+        records = []
+        stack = []  # frames are lists [record, child tags, attributes tag] or _SKIP/_KEEP/_SETTINGS
+        for event, elem in context:
+            if event == 'start':
+                top = stack[-1] if stack else None
+                if top is None:
+                    classname = topTags.get(elem.tag)
+                elif not isinstance(top, list):
+                    stack.append(_SKIP if top == _SKIP else _KEEP)
+                    continue
+                elif elem.tag == top[2] and top[0][2] is None:
+                    stack.append(_SETTINGS)
+                    continue
+                else:
+                    classname = top[1].get(elem.tag)
+
+                if classname is None:
+                    stack.append(_SKIP)
+                    continue
+
+                attributesTag, types = classes[classname]
+                typeInfo = types.get(elem.get('Type', '').split(' ')[-1])
+                if typeInfo is None or typeInfo[0]:
+                    childTags, attributesTag = dict(), None
+                else:
+                    childTags = typeInfo[1]
+                record = [elem.tag, dict(elem.attrib), None, diagrams.get(elem.get('uid')), []]
+                stack.append([record, childTags, attributesTag])
+            elif stack:
+                frame = stack.pop()
+                if frame == _SETTINGS:
+                    stack[-1][0][2] = _elementData(elem)
+                elif isinstance(frame, list):
+                    record = tuple(frame[0])
+                    if stack:
+                        stack[-1][0][4].append(record)
+                    else:
+                        records.append(record)
+                if frame != _KEEP:
+                    elem.clear()
+                if not stack:
+                    mainNode.clear()
+    except Exception:
+        return None  # TreeParser will load this file again and report an error
+
+    return versionText, records
+
+
+_noDiagram = (None, -1)  # no diagram info for node
+
+# Kinds of xml-elements for streaming tree parser:
+_SKIP = 0  # element which is not a part of any node; it is released immediately
+_KEEP = 1  # element inside node's attributes tag
+_SETTINGS = 2  # node's attributes tag
+
+
+class _StreamFrame(object):
+    """ Xml-element of tree node which is currently read by streaming tree parser. """
+
+    __slots__ = ('cls', 'node', 'subType', 'settingsTag', 'childClasses', 'loaded')
+
+    def __init__(self, cls, node, subType, childClasses):
+        self.cls = cls
+        self.node = node
+        self.subType = subType
+        if childClasses is None:
+            self.settingsTag = None
+            self.childClasses = dict()
+        else:
+            self.settingsTag = cls.attributes.tag
+            self.childClasses = childClasses
+        self.loaded = dict()  # number of loaded children for each child class
+        for tag in self.childClasses:
+            self.loaded[self.childClasses[tag].name] = 0
+
 #######################################################################################################################
 #######################################################################################################################
 
@@ -65,14 +279,20 @@ class TreeParser(object):
     def __init__(self):
         pass
 
-    def load(self, files, project):
+    def load(self, files, project, data=None):
+        """ Load trees from xml-files.
+        data - data for single file returned by TreeParser.read; if specified, then file will not be parsed again
+        """
         bt = treenode.BehaviorTree()
         nodes = treenode.TreeNodes()
 
         if project is None or project.alphabet is None:
             return bt, nodes, []
 
-        if isinstance(files, list):
+        if data is not None:
+            filename = files[0] if isinstance(files, list) else files
+            n, treesFiles = self.__loadTree(project, bt, nodes, filename, data)
+        elif isinstance(files, list):
             n, treesFiles = self.__loadTrees(project, bt, nodes, files, '../')
         elif isinstance(files, str) or isinstance(files, str):
             n, treesFiles = self.__loadTree(project, bt, nodes, files)
@@ -81,10 +301,74 @@ class TreeParser(object):
 
         return bt, nodes, treesFiles
 
-    def save(self, alphabet, trees, nodes, files):
+    def read(self, files, alphabet, processes, cache=None):
+        """ Read tree files in parallel processes and/or from project cache.
+
+        Generator which yields data for each file in the same order as files are given.
+        This data must be passed to TreeParser.load to create tree nodes.
+        None is yielded for files which must be loaded by TreeParser.load itself (if processes < 2
+        and there is no cache, for example).
+
+        files - list of absolute paths to tree files
+        processes - number of worker processes (0 - number of CPUs)
+        cache - treecache.TreeCache object; data for unchanged files is taken from it and data for other files
+                is stored into it
+        """
+        if alphabet is None:
+            for _ in files:
+                yield None
+            return
+
+        scheme = _treeScheme(alphabet)
+        if cache is not None:
+            cache.setScheme(scheme)
+            cached = [cache.get(filename) for filename in files]
+        else:
+            cached = [None] * len(files)
+
+        tasks = [(filename, scheme) for filename, data in zip(files, cached) if data is None]
+
+        if processes < 1:
+            processes = multiprocessing.cpu_count()
+        processes = min(processes, len(tasks))
+
+        if processes < 2:
+            if cache is None:
+                for _ in files:
+                    yield None
+                return
+            pool = None
+            results = (_readTreeFile(task) for task in tasks)
+        else:
+            print('info: Reading {0} tree files in {1} processes ...'.format(len(tasks), processes))
+            print('')
+            pool = multiprocessing.Pool(processes)
+            results = pool.imap(_readTreeFile, tasks)
+
+        try:
+            for filename, data in zip(files, cached):
+                if data is None:
+                    data = next(results)
+                    if cache is not None:
+                        cache.put(filename, data)
+                yield data
+        finally:
+            if pool is not None:
+                pool.terminate()
+                pool.join()
+
+    def save(self, alphabet, trees, nodes, files, dirtyFiles=None):
+        """ Save trees into xml-files.
+        dirtyFiles - DirtyTreeFiles object; if specified, then only modified files will be saved
+        """
+        if dirtyFiles is not None:
+            files = dirtyFiles.modifiedFiles(files)
         res = False
         for filename in files:
-            res = self.__saveFile(alphabet, trees, nodes, filename) or res
+            saved = self.__saveFile(alphabet, trees, nodes, filename)
+            if saved and dirtyFiles is not None:
+                dirtyFiles.setSaved(filename)
+            res = saved or res
         return res
 
     # Check if specified tree exists in specified file
@@ -147,15 +431,190 @@ class TreeParser(object):
         return num_loaded, goodFiles
 
     # Load tree from xml-file
-    def __loadTree(self, project, bt, nodes, filename):
-        global _versionWithUids
-
+    def __loadTree(self, project, bt, nodes, filename, data=None):
         if not filename:
             return 0, []
 
         filename = toUnixPath(os.path.normpath(filename))
 
         print('info: Parsing \"{0}\" ...'.format(filename))
+        if data is not None:
+            return self.__mergeTree(project, bt, nodes, filename, data)
+
+        result = self.__streamTree(project, bt, nodes, filename)
+        if result is None:
+            result = self.__parseTree(project, bt, nodes, filename)
+        return result
+
+    # Load tree from xml-file using streaming parser
+    def __streamTree(self, project, bt, nodes, filename):
+        """ Load tree from xml-file reading it element by element.
+
+        Tree nodes are created while reading file and each xml-element is released as soon as it's node
+        is complete, so whole document is never kept in memory. TreeNode.xml is a small element
+        holding only node's attributes tag (it is required to reparse attributes after library changes).
+
+        Returns None if file must be loaded with DOM-parser (files without nodes' uids).
+        """
+        global _versionWithUids
+
+        alphabet = project.alphabet
+        topClasses = _topClasses(alphabet)
+
+        context = iterparse(filename, events=('start', 'end'))
+        _, mainNode = next(context)
+
+        if mainNode.tag != alphabet.headerTree:
+            return None  # let DOM-parser search for header tag and report an error
+
+        version, versionText = _fileVersion(mainNode.get('Version', mainNode.get('version', '')))
+        if version < _versionWithUids:
+            return None  # old files are matched with diagram file by position which requires DOM
+
+        print(versionText)
+
+        # trying to read diagram file with saved diagram items positions:
+        diagrams = _readDiagrams(filename, alphabet.headerTree)
+
+        num_loaded = 0
+        empty = True
+        stack = []
+        for event, elem in context:
+            if event == 'start':
+                top = stack[-1] if stack else None
+                if top is None:
+                    cls = topClasses.get(elem.tag)
+                    if cls is None:
+                        stack.append(_SKIP)
+                    else:
+                        empty = False
+                        stack.append(self.__startNode(project, bt, nodes, filename, cls, elem.attrib, None,
+                                                      diagrams.get(elem.get('uid'))))
+                elif not isinstance(top, _StreamFrame):
+                    stack.append(_SKIP if top == _SKIP else _KEEP)  # everything inside attributes tag is kept
+                elif top.node is None:
+                    stack.append(_SKIP)
+                elif elem.tag == top.settingsTag and not len(top.node.xml):
+                    stack.append(_SETTINGS)
+                else:
+                    childClass = top.childClasses.get(elem.tag)
+                    if childClass is None or top.loaded[childClass.name] >= top.subType.children[childClass.name].max:
+                        stack.append(_SKIP)
+                    else:
+                        stack.append(self.__startNode(project, bt, nodes, filename, childClass, elem.attrib,
+                                                      top.node, diagrams.get(elem.get('uid'))))
+            elif stack:
+                frame = stack.pop()
+                if frame == _SETTINGS:
+                    stack[-1].node.xml.append(elem)
+                elif frame == _SKIP:
+                    elem.clear()
+                elif isinstance(frame, _StreamFrame):
+                    newNode = self.__finishNode(bt, nodes, frame)
+                    elem.clear()
+                    if stack:
+                        if newNode is not None:
+                            parentFrame = stack[-1]
+                            parentFrame.loaded[frame.cls.name] += 1
+                            parentFrame.node.addChild(newNode, silent=True)
+                    elif newNode is not None:
+                        num_loaded += 1
+                if not stack:
+                    mainNode.clear()  # release top-level elements which are already processed
+
+        return _loadingResult(filename, empty, num_loaded)
+
+    # Load tree from data which was read by worker process
+    def __mergeTree(self, project, bt, nodes, filename, data):
+        """ Create tree nodes from data returned by _readTreeFile.
+        This is a single-threaded step of parallel project loading, so all uids and branches
+        are registered in the same order as with sequential loading.
+        """
+        versionText, records = data
+        print(versionText)
+
+        topClasses = _topClasses(project.alphabet)
+        num_loaded = 0
+        for record in records:
+            cls = topClasses.get(record[0])
+            if cls is not None and self.__mergeNode(project, bt, nodes, filename, cls, record, None) is not None:
+                num_loaded += 1
+
+        return _loadingResult(filename, not records, num_loaded)
+
+    def __mergeNode(self, project, bt, nodes, currFile, cls, record, parent):
+        _, attrs, settings, diagram, children = record
+
+        frame = self.__startNode(project, bt, nodes, currFile, cls, attrs, parent, diagram)
+        if frame.node is None:
+            return None
+
+        if settings is not None and frame.settingsTag:
+            frame.node.xml.append(_dataElement(settings))
+
+        for child in children:
+            childClass = frame.childClasses.get(child[0])
+            if childClass is None or frame.loaded[childClass.name] >= frame.subType.children[childClass.name].max:
+                continue
+            childNode = self.__mergeNode(project, bt, nodes, currFile, childClass, child, frame.node)
+            if childNode is not None:
+                frame.loaded[childClass.name] += 1
+                frame.node.addChild(childNode, silent=True)
+
+        return self.__finishNode(bt, nodes, frame)
+
+    def __startNode(self, project, bt, nodes, currFile, cls, attrs, parent, diagramAttrs):
+        """ Create node for xml-element which start has been read by streaming parser.
+        attrs - dict with node's xml-element attributes
+        diagramAttrs - dict with attributes of diagram xml-element for this node or None
+        Returns _StreamFrame for this element.
+        """
+        if diagramAttrs is None:
+            diagram = _noDiagram
+        else:
+            diagram = self.__readDiagramInfo(diagramAttrs)
+        newNode, subType = self.__createNode(_versionWithUids, project, bt, nodes, currFile, cls, attrs,
+                                             Element(cls.tag), parent, diagram)
+        if newNode is None or subType.isLink():
+            return _StreamFrame(cls, newNode, subType, None)
+
+        newNode.setParent(parent)
+
+        childClasses = dict()
+        for chldCls in subType.children:
+            if subType.children[chldCls].max < 1:
+                continue  # no children of this class must be provided
+            childClass = project.alphabet.getClass(chldCls)
+            if childClass is not None:
+                childClasses[childClass.tag] = childClass
+
+        return _StreamFrame(cls, newNode, subType, childClasses)
+
+    def __finishNode(self, bt, nodes, frame):
+        """ Complete node which end has been read by streaming parser: load node settings and save branch.
+        Returns created node or None if there was an error.
+        """
+        newNode = frame.node
+        if newNode is None or frame.subType.isLink():
+            return newNode
+
+        newNode.reparseAttributes(True)
+
+        for classname in frame.loaded:
+            loaded = frame.loaded[classname]
+            if loaded < frame.subType.children[classname].min:
+                print('warning: Node \"{0}\" with uid=\"{1}\" doesn\'t have enough \"{2}\"-children. \
+                        Real count=\"{3}\", but must be \"{4}\".'
+                      .format(newNode.nodeName, newNode.uid(), classname, loaded,
+                              frame.subType.children[classname].min))
+
+        if not self.__addBranch(bt, nodes, frame.cls, newNode):
+            return None
+
+        return newNode
+
+    # Load tree from xml-file using DOM-parser
+    def __parseTree(self, project, bt, nodes, filename):
         dom = parse(filename)
         data = dom.getElementsByTagName(project.alphabet.headerTree)
 
@@ -173,13 +632,8 @@ class TreeParser(object):
         else:
             versionText = ''
 
-        if not versionText or '.' not in versionText:
-            version = tuple(_versionWithUids)
-            versionText = globals.versionToStr(version)
-            print('info: File has no version. Default it to {0}'.format(versionText))
-        else:
-            version = globals.versionFromStr(versionText)
-            print('info: File version is {0}'.format(versionText))
+        version, versionText = _fileVersion(versionText)
+        print(versionText)
 
         # trying to read diagram file with saved diagram items positions:
         fname, _ = os.path.splitext(filename)
@@ -239,35 +693,87 @@ class TreeParser(object):
 
     # Loading node
     def __parseNode(self, version, project, bt, nodes, currFile, cls, node, parent, diagramNode):
-        global _versionWithUids
+        # read diagram info:
+        diagram = self.__readDiagramInfo(_domAttributes(diagramNode))
 
-        if node.hasAttribute('Name'):
-            name = node.getAttribute('Name')
-        else:
-            name = ''
+        newNode, subType = self.__createNode(version, project, bt, nodes, currFile, cls, _domAttributes(node),
+                                             node, parent, diagram)
+        if newNode is None or subType.isLink():
+            return newNode
 
-        if not name:
-            print('ERROR: Each node requires tag \"Name\"!')
+        # Loading node settings:----------------------------------------------------
+        newNode.setParent(parent)
+        newNode.reparseAttributes(True)
+
+        # Load child nodes:---------------------------------------------------------
+        for chldCls in subType.children:
+            childParams = subType.children[chldCls]
+            childClass = project.alphabet.getClass(chldCls)
+            if childClass is None:
+                continue
+            if childParams.max < 1:
+                continue  # no children of this class must be provided
+            children = node.getElementsByTagName(childClass.tag)
+            if diagramNode is not None:
+                diagramChildren = diagramNode.getElementsByTagName(childClass.tag)
+            else:
+                diagramChildren = None
+            loaded = 0
+            j = 0
+            for child in children:
+                if child.parentNode is node:
+                    if diagramChildren is not None and j < len(diagramChildren) \
+                            and diagramChildren[j].parentNode is diagramNode:
+                        childDiagramNode = diagramChildren[j]
+                    else:
+                        childDiagramNode = None
+                    childNode = self.__parseNode(version, project, bt, nodes, currFile, childClass, child, newNode, childDiagramNode)
+                    if childNode is not None:
+                        loaded += 1
+                        newNode.addChild(childNode, silent=True)
+                        if loaded >= childParams.max:
+                            break
+                j += 1
+            if loaded < childParams.min:
+                print('warning: Node \"{0}\" with uid=\"{1}\" doesn\'t have enough \"{2}\"-children. \
+                        Real count=\"{3}\", but must be \"{4}\".'
+                      .format(newNode.nodeName, newNode.uid(), childClass.name, loaded, childParams.min))
+
+        # Save branch:--------------------------------------------------------------
+        if not self.__addBranch(bt, nodes, cls, newNode):
             return None
 
-        if node.hasAttribute('Type'):
-            nodeType = node.getAttribute('Type')
-        else:
-            nodeType = ''
+        return newNode
+
+    def __createNode(self, version, project, bt, nodes, currFile, cls, attrs, xmlNode, parent, diagram):
+        """ Create new node using xml-node attributes.
+
+        attrs - dict with xml-node attributes
+        xmlNode - xml-node which will be stored in TreeNode.xml
+        diagram - tuple (DiagramInfo, uid) read from diagram file
 
+        Returns tuple (node, node type) or (None, None) if there was an error.
+        """
+        global _versionWithUids
+
+        name = attrs.get('Name', '')
+        if not name:
+            print('ERROR: Each node requires tag \"Name\"!')
+            return None, None
+
+        nodeType = attrs.get('Type', '')
         if not nodeType:
             print('ERROR: Each node requires tag \"Type\"!')
-            return None
+            return None, None
 
         strings = nodeType.split(' ')
         nodeType = strings[-1]
 
         if nodeType not in cls:
             print('error: Type \"{0}\" is not specified for class \"{1}\".'.format(nodeType, cls.name))
-            return None
+            return None, None
 
-        # read diagram info:
-        diagramInfo, diagramUid = self.__readDiagramInfo(diagramNode)
+        diagramInfo, diagramUid = diagram
 
         isInverse = False
         if '!' in name or '~' in name:
@@ -283,18 +789,15 @@ class TreeParser(object):
 
         # Checking for single-block:
         isSingleBlock = False
-        if node.hasAttribute('singleBlock'):
-            sb = node.getAttribute('singleBlock').lower()
+        if 'singleBlock' in attrs:
+            sb = attrs['singleBlock'].lower()
             if sb not in ('0', 'no', 'false'):
                 isSingleBlock = True
 
         # Getting uid for node:
-        if node.hasAttribute('uid'):
-            u = node.getAttribute('uid')
-            if u:
-                uid = int(u)
-            else:
-                uid = None
+        u = attrs.get('uid', '')
+        if u:
+            uid = int(u)
         else:
             uid = None
 
@@ -302,16 +805,13 @@ class TreeParser(object):
 
         if subType.isLink():
             isSingleBlock = False
-            target = ''
-            if node.hasAttribute(subType.targetTag()):
-                target = node.getAttribute(subType.targetTag())
+            target = attrs.get(subType.targetTag(), '')
             if not target:
                 print('error: All links must have target! (tag <{0}> is missing)'.format(subType.targetTag()))
-                return None
+                return None, None
 
-            filename = ''
-            if node.hasAttribute('File'):
-                filename = node.getAttribute('File')
+            filename = attrs.get('File', '')
+            if filename:
                 if not os.path.isabs(filename):
                     realpath = '/'.join([os.path.dirname(currFile), filename])
                     filename = os.path.normpath(os.path.abspath(realpath))
@@ -323,7 +823,7 @@ class TreeParser(object):
 
             branchRef = fullTreeName(filename, target)
             if branchRef in bt or branchRef in project.trees:
-                newNode = treenode.TreeNode(project, node, cls.name, nodeType, isDebug, uid)
+                newNode = treenode.TreeNode(project, xmlNode, cls.name, nodeType, isDebug, uid)
                 newNode.target = branchRef
                 newNode.setPath(currFile)
                 if diagramUid == newNode.uid() or version < _versionWithUids:
@@ -331,40 +831,36 @@ class TreeParser(object):
 
                 if newNode.uid() in nodes:
                     print('error: Node with uid \"{0}\" already exist in current file!'.format(newNode.uid()))
-                    return None
+                    return None, None
 
                 if newNode.uid() in project.nodes:
                     print('error: Node with uid \"{0}\" already exist in current project!'.format(newNode.uid()))
-                    return None
+                    return None, None
 
                 nodes.add(newNode, False)
-                return newNode
+                return newNode, subType
 
             print('error: Link to \"{0}\" is not found neither in file \"{1}\" nor in current project!'
                   .format(target, filename))
-            return None
+            return None, None
 
         elif not subType.singleblockEnabled:
             isSingleBlock = False
 
-        if node.hasAttribute(cls.lib):
-            libname = node.getAttribute(cls.lib)
-        else:
-            libname = ''
-
+        libname = attrs.get(cls.lib, '')
         if not libname:
             print('error: Each \"{0}\" node requires tag \"{1}\"!'.format(cls.name, cls.lib))
-            return None
+            return None, None
 
-        newNode = treenode.TreeNode(project, node, cls.name, nodeType, isDebug, uid)
+        newNode = treenode.TreeNode(project, xmlNode, cls.name, nodeType, isDebug, uid)
 
         if newNode.uid() in nodes:
             print('error: Node with uid \"{0}\" already exist in current file!'.format(newNode.uid()))
-            return None
+            return None, None
 
         if newNode.uid() in project.nodes:
             print('error: Node with uid \"{0}\" already exist in current project!'.format(newNode.uid()))
-            return None
+            return None, None
 
         nodes.add(newNode, False)
 
@@ -379,128 +875,90 @@ class TreeParser(object):
 
         # Read branch name:--------------------------------------------------------------
         if cls.top:
-            if node.hasAttribute(cls.linkTag):
-                ref = node.getAttribute(cls.linkTag)
-            else:
-                ref = ''
-
+            ref = attrs.get(cls.linkTag, '')
             if ref:
                 branchRef = fullTreeName(currFile, ref)
                 if branchRef in bt:
                     print('error: Branch with name \"{0}\" already exist in current file! See node with uid=\"{1}\"'
                           .format(ref, newNode.uid()))
                     nodes.remove(newNode, False)
-                    return None
+                    return None, None
                 if branchRef in project.trees:
                     print('error: Branch with name \"{0}\" already exist in current project! See node with uid=\"{1}\"'
                           .format(ref, newNode.uid()))
                     nodes.remove(newNode, False)
-                    return None
+                    return None, None
                 newNode.setRefName(ref)
             elif parent is None:
                 print('error: Root nodes requires link tag \"{0}\"! Wrong node is \"{1}\" with uid=\"{2}\".'
                       .format(cls.linkTag, name, newNode.uid()))
                 nodes.remove(newNode, False)
-                return None
-
-        # Loading node settings:----------------------------------------------------
-        newNode.setParent(parent)
-        newNode.reparseAttributes(True)
+                return None, None
 
-        # Load child nodes:---------------------------------------------------------
-        for chldCls in subType.children:
-            childParams = subType.children[chldCls]
-            childClass = project.alphabet.getClass(chldCls)
-            if childClass is None:
-                continue
-            if childParams.max < 1:
-                continue  # no children of this class must be provided
-            children = node.getElementsByTagName(childClass.tag)
-            if diagramNode is not None:
-                diagramChildren = diagramNode.getElementsByTagName(childClass.tag)
-            else:
-                diagramChildren = None
-            loaded = 0
-            j = 0
-            for child in children:
-                if child.parentNode is node:
-                    if diagramChildren is not None and j < len(diagramChildren) \
-                            and diagramChildren[j].parentNode is diagramNode:
-                        childDiagramNode = diagramChildren[j]
-                    else:
-                        childDiagramNode = None
-                    childNode = self.__parseNode(version, project, bt, nodes, currFile, childClass, child, newNode, childDiagramNode)
-                    if childNode is not None:
-                        loaded += 1
-                        newNode.addChild(childNode, silent=True)
-                        if loaded >= childParams.max:
-                            break
-                j += 1
-            if loaded < childParams.min:
-                print('warning: Node \"{0}\" with uid=\"{1}\" doesn\'t have enough \"{2}\"-children. \
-                        Real count=\"{3}\", but must be \"{4}\".'
-                      .format(name, newNode.uid(), childClass.name, loaded, childParams.min))
+        return newNode, subType
 
-        # Save branch:--------------------------------------------------------------
+    def __addBranch(self, bt, nodes, cls, newNode):
         if cls.top and newNode.refname():
             if not bt.add(branch=newNode, silent=True):
                 print('error: can\'t add node \"{0}\" with uid=\"{1}\" into trees list with branch name \"{2}\"'
-                      .format(name, newNode.uid(), newNode.refname()))
+                      .format(newNode.nodeName, newNode.uid(), newNode.refname()))
                 nodes.remove(newNode, False)
-                return None
-
-        return newNode
+                return False
+        return True
 
-    def __readDiagramInfo(self, diagramNode):
+    def __readDiagramInfo(self, attrs):
+        """ Read diagram info from diagram xml-node attributes (attrs is dict or None).
+        Returns tuple (DiagramInfo, uid).
+        """
         dinfo = treenode.DiagramInfo()
         # read diagram info:
-        if diagramNode is None:
+        if attrs is None:
             return dinfo, -1
 
-        if diagramNode.hasAttribute('uid'):
-            uid = int(diagramNode.getAttribute('uid'))
+        if 'uid' in attrs:
+            uid = int(attrs['uid'])
         else:
             uid = -1
 
-        if diagramNode.hasAttribute('expanded'):
-            val = diagramNode.getAttribute('expanded').lower()
+        if 'expanded' in attrs:
+            val = attrs['expanded'].lower()
             if val in ('yes', '1', 'true'):
                 dinfo.expanded = True
             else:
                 dinfo.expanded = False
 
-        if diagramNode.hasAttribute('hAuto'):
-            val = diagramNode.getAttribute('hAuto').lower()
+        if 'hAuto' in attrs:
+            val = attrs['hAuto'].lower()
             if val in ('yes', '1', 'true'):
                 dinfo.autopositioning[DisplayRegime.Horizontal].autopos = True
             else:
                 dinfo.autopositioning[DisplayRegime.Horizontal].autopos = False
 
-        if diagramNode.hasAttribute('vAuto'):
-            val = diagramNode.getAttribute('vAuto').lower()
+        if 'vAuto' in attrs:
+            val = attrs['vAuto'].lower()
             if val in ('yes', '1', 'true'):
                 dinfo.autopositioning[DisplayRegime.Vertical].autopos = True
             else:
                 dinfo.autopositioning[DisplayRegime.Vertical].autopos = False
 
         hShift = QPointF()
-        if diagramNode.hasAttribute('hx'):
-            hShift.setX(float(diagramNode.getAttribute('hx')))
-        if diagramNode.hasAttribute('hy'):
-            hShift.setY(float(diagramNode.getAttribute('hy')))
+        if 'hx' in attrs:
+            hShift.setX(float(attrs['hx']))
+        if 'hy' in attrs:
+            hShift.setY(float(attrs['hy']))
         dinfo.autopositioning[DisplayRegime.Horizontal].shift = hShift
 
         vShift = QPointF()
-        if diagramNode.hasAttribute('vx'):
-            vShift.setX(float(diagramNode.getAttribute('vx')))
-        if diagramNode.hasAttribute('vy'):
-            vShift.setY(float(diagramNode.getAttribute('vy')))
+        if 'vx' in attrs:
+            vShift.setX(float(attrs['vx']))
+        if 'vy' in attrs:
+            vShift.setY(float(attrs['vy']))
         dinfo.autopositioning[DisplayRegime.Vertical].shift = vShift
 
-        if diagramNode.hasAttribute('sceneX'):
-            dinfo.scenePos.setX(float(diagramNode.getAttribute('sceneX')))
-        if diagramNode.hasAttribute('sceneY'):
-            dinfo.scenePos.setY(float(diagramNode.getAttribute('sceneY')))
+        if 'sceneX' in attrs:
+            dinfo.scenePos.setX(float(attrs['sceneX']))
+        if 'sceneY' in attrs:
+            dinfo.scenePos.setY(float(attrs['sceneY']))
 
         return dinfo, uid
 
@@ -523,9 +981,9 @@ class TreeParser(object):
 
         treelist = projectTrees.getBranchesByFile(filename, projectNodes)
         external_files = []
-        sorted_names = []
+        branch_names = []
         for t in treelist:
-            sorted_names.append(t)
+            branch_names.append(t)
             external_files.extend(self.__getExternals(treelist[t], filename))
 
         # save external files
@@ -559,26 +1017,9 @@ class TreeParser(object):
                     events.appendChild(eventElem)
                     eventElem.setAttribute('name', ev)
 
-        sorted_names.sort()
-        done_list = {}
-        num = 0
-        num_trees = len(treelist)
-        while len(done_list) < num_trees and num < num_trees:
-            for t in sorted_names:
-                if t in done_list:
-                    continue
-                dependsOn = projectTrees.getDependantsOf(t, projectNodes)
-                dependsOnCurrent = []
-                for d in dependsOn:
-                    uid = projectTrees.get(d)
-                    br = projectNodes[uid]
-                    if br is not None and br.path() == filename and d not in done_list:
-                        dependsOnCurrent.append(d)
-                if dependsOnCurrent:
-                    # this branch depends on some other branch that have not been added to xml yet
-                    continue
-                done_list[t] = self.__saveNode(filename, doc, main, treelist[t], diagramDoc, diagramMain)
-            num += 1
+        # each branch is saved after branches of this file it depends on:
+        for t in projectTrees.sortByDependencies(branch_names, projectNodes):
+            self.__saveNode(filename, doc, main, treelist[t], diagramDoc, diagramMain)
 
         # saving xml document to file
         tree_file = open(filename, 'wb')
@@ -806,3 +1247,181 @@ class TreeParser(object):
 #######################################################################################################################
 #######################################################################################################################
 
+
+def _fileOf(fullname):
+    """ Returns tree file path from full branch name ('path/refname'). """
+    return fullname.rsplit('/', 1)[0]
+
+
+def _nodeFingerprint(node):
+    """ Returns hashable data of the tree node that is written into tree file and diagram file. """
+    attributes = node.attributes()
+    attributesData = []
+    for name in sorted(attributes):
+        value = attributes[name].value()
+        if isinstance(value, list):
+            value = tuple(value)
+        attributesData.append((name, attributes[name].dynamicKey(), value))
+
+    desc = node.nodeDesc()
+    if desc is not None:
+        descData = (desc.creator, tuple(desc.incomingEvents), tuple(desc.outgoingEvents))
+    else:
+        descData = None
+
+    diagram = node.diagramInfo
+    horizontal = diagram.autopositioning[DisplayRegime.Horizontal]
+    vertical = diagram.autopositioning[DisplayRegime.Vertical]
+    diagramData = (diagram.expanded, horizontal.autopos, horizontal.shift.x(), horizontal.shift.y(),
+                   vertical.autopos, vertical.shift.x(), vertical.shift.y(),
+                   diagram.scenePos.x(), diagram.scenePos.y())
+
+    children = node.allChildren()
+    childrenData = tuple([(c, tuple([child.uid() for child in children[c]])) for c in sorted(children)])
+
+    return (node.uid(), node.nodeClass, node.nodeType, node.debug, node.singleblock, node.libname, node.nodeName,
+            node.refname(), node.target, node.isInverse(), tuple(attributesData), descData, diagramData, childrenData)
+
+#######################################################################################################################
+
+
+class DirtyTreeFiles(object):
+    """ Keeps track of modified tree files to make it possible to save only really changed files.
+
+    Files are marked as modified by behavior tree signals and library signals.
+    Modifications that are not announced by any signal (attribute values, diagram positions and so on)
+    are detected by comparing file's fingerprint with the one remembered when the file was loaded or saved.
+    """
+
+    def __init__(self, project):
+        self.__project = project
+        self.__dirty = set()
+        self.__allDirty = False
+        self.__fingerprints = dict()  # last saved (or loaded) fingerprint for each file
+        self.__current = dict()  # fingerprints calculated by last modifiedFiles() call
+
+        globals.behaviorTreeSignals.treeDeleted.connect(self.__onTreeDeleted)
+        globals.behaviorTreeSignals.treeRenamed.connect(self.__onTreeRenamed)
+        globals.behaviorTreeSignals.treeRootChanged.connect(self.__onTreeRootChanged)
+        globals.behaviorTreeSignals.nodeConnected.connect(self.__onNodeConnectionChanged)
+        globals.behaviorTreeSignals.nodeDisconnected.connect(self.__onNodeConnectionChanged)
+
+        globals.librarySignals.nodeRenamed.connect(self.__onNodeRenamed)
+        globals.librarySignals.nodeRemoved.connect(self.__onLibraryNodeChanged)
+        globals.librarySignals.nodeTypeChanged.connect(self.__onLibraryNodeChanged)
+        globals.librarySignals.creatorChanged.connect(self.__onLibraryNodeChanged)
+        globals.librarySignals.attribueRenamed.connect(self.__onLibraryNodeChanged)
+        globals.librarySignals.attribueChanged.connect(self.__onLibraryNodeChanged)
+        globals.librarySignals.attribueAdded.connect(self.__onLibraryNodeChanged)
+        globals.librarySignals.attribueDeleted.connect(self.__onLibraryNodeChanged)
+        globals.librarySignals.nodeEventsCountChanged.connect(self.__onLibraryNodeChanged)
+        globals.librarySignals.libraryRenamed.connect(self.__onLibraryRenamed)
+        globals.librarySignals.libraryExcluded.connect(self.__onLibraryExcluded)
+
+        globals.historySignals.undoMade.connect(self.markAll)
+        globals.historySignals.redoMade.connect(self.markAll)
+
+    def mark(self, filename):
+        """ Mark file as modified. """
+        if filename:
+            self.__dirty.add(filename)
+
+    def markAll(self):
+        """ Mark all files as modified. """
+        self.__allDirty = True
+
+    def reset(self):
+        """ Mark all project files as not modified (must be called right after project loading). """
+        self.__dirty.clear()
+        self.__allDirty = False
+        self.__fingerprints = self.__calculateFingerprints()
+        self.__current = dict()
+
+    def setLoaded(self, filename):
+        """ Mark file as not modified (must be called right after file loading). """
+        self.__dirty.discard(filename)
+        self.__fingerprints[filename] = self.__calculateFingerprints().get(filename)
+
+    def setSaved(self, filename):
+        """ Mark file as not modified (must be called right after file saving). """
+        self.__dirty.discard(filename)
+        self.__fingerprints[filename] = self.__current.get(filename)
+
+    def modifiedFiles(self, files):
+        """ Returns list of files from 'files' which have to be saved. """
+        if self.__allDirty:
+            self.__dirty.update(files)
+            self.__allDirty = False
+        self.__current = self.__calculateFingerprints()
+        modified = []
+        for filename in files:
+            if filename in self.__dirty or not os.path.exists(filename) \
+                    or self.__fingerprints.get(filename) != self.__current.get(filename):
+                modified.append(filename)
+        return modified
+
+    def __calculateFingerprints(self):
+        project = self.__project
+        data = dict()
+        for fullname in sorted(project.trees):
+            branch = project.nodes.get(project.trees.get(fullname))
+            if branch is None:
+                continue
+            filename = branch.path()
+            if filename not in data:
+                data[filename] = []
+            fileData = data[filename]
+            fileData.append(fullname)
+            stack = [branch]
+            while stack:
+                node = stack.pop()
+                fileData.append(_nodeFingerprint(node))
+                children = node.allChildren()
+                for c in sorted(children):
+                    stack.extend(children[c])
+        fingerprints = dict()
+        for filename in data:
+            fingerprints[filename] = hash(tuple(data[filename]))
+        return fingerprints
+
+    def __markBranches(self, branches):
+        for fullname in branches:
+            self.mark(branches[fullname].path())
+
+    def __onTreeDeleted(self, fullname):
+        self.mark(_fileOf(fullname))
+
+    def __onTreeRenamed(self, oldname, newname):
+        self.mark(_fileOf(oldname))
+        self.mark(_fileOf(newname))
+        project = self.__project
+        for fullname in project.trees.whoDependsOn(newname, project.nodes):
+            self.mark(_fileOf(fullname))
+
+    def __onTreeRootChanged(self, path, treename, oldRoot, newRoot):
+        self.mark(path)
+
+    def __onNodeConnectionChanged(self, uid, parentUid):
+        node = self.__project.nodes.get(parentUid.value)
+        if node is not None:
+            self.mark(node.root().path())
+
+    def __onNodeRenamed(self, libname, oldname, newname):
+        project = self.__project
+        self.__markBranches(project.trees.getBranchesByNode(libname, newname, project.nodes))
+
+    def __onLibraryNodeChanged(self, libname, nodename, *args):
+        project = self.__project
+        self.__markBranches(project.trees.getBranchesByNode(libname, nodename, project.nodes))
+
+    def __onLibraryRenamed(self, oldname, newname):
+        project = self.__project
+        self.__markBranches(project.trees.getBranchesByLibrary(newname, project.nodes))
+
+    def __onLibraryExcluded(self, libname):
+        project = self.__project
+        self.__markBranches(project.trees.getBranchesByLibrary(libname, project.nodes))
+
+#######################################################################################################################
+#######################################################################################################################
+
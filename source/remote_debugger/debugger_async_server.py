@@ -0,0 +1,328 @@
+# coding=utf-8
+# -----------------
+# file      : debugger_async_server.py
+# date      : 2026/10/18
+# author    : Victor Zarubkin
+# contact   : victor.zarubkin@gmail.com
+# copyright : Copyright (C) 2026  Victor Zarubkin
+# license   : This file is part of BehaviorStudio.
+#           :
+#           : BehaviorStudio is free software: you can redistribute it and/or modify
+#           : it under the terms of the GNU General Public License as published by
+#           : the Free Software Foundation, either version 3 of the License, or
+#           : (at your option) any later version.
+#           :
+#           : BehaviorStudio is distributed in the hope that it will be useful,
+#           : but WITHOUT ANY WARRANTY; without even the implied warranty of
+#           : MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#           : GNU General Public License for more details.
+#           :
+#           : You should have received a copy of the GNU General Public License
+#           : along with BehaviorStudio. If not, see <http://www.gnu.org/licenses/>.
+#           :
+#           : A copy of the GNU General Public License can be found in file COPYING.
+############################################################################
+
+""" Debug server handling many clients at once.
+
+All client connections are handled by one asyncio event loop working in separate thread.
+Received data is parsed in the same thread (see debugger_server.PacketsReader) and delivered to the main (Qt) thread
+through one queue.
+
+asyncio is available in Python 3.4 and later only. Use debugger_server.DebugServer with older versions.
+"""
+
+from __future__ import unicode_literals
+
+__author__ = 'Victor Zarubkin'
+__copyright__ = 'Copyright (C) 2026  Victor Zarubkin'
+__credits__ = ['Victor Zarubkin']
+__license__ = ['GPLv3']
+__version__ = '1.3.0'  # this is last application version when this script file was changed
+__email__ = 'victor.zarubkin@gmail.com'
+############################################################################
+
+import asyncio
+import queue
+import selectors
+import socket
+import threading
+import time
+
+from PySide import QtCore
+from PySide.QtCore import *
+
+from remote_debugger import debugger_globals
+from remote_debugger.debugger_server import PacketsReader, handleReceivedData
+
+#######################################################################################################################
+
+_refreshRate = 40  # how often received data is handled in main thread, milliseconds
+_listenBacklog = 128  # max number of pending connections
+_maxBacklog = 64  # max number of received batches waiting for main thread; client reading is paused after that
+
+# types of events sent from event loop thread to main thread
+_Connected = 0
+_Data = 1
+_Disconnected = 2
+
+#######################################################################################################################
+
+
+class ClientStatistics(object):
+    """ Counters of one client connection.
+
+    Counters are changed in event loop thread (except batchesDelivered, which is changed in main thread),
+    so they must be only read from other threads.
+    """
+
+    def __init__(self, address):
+        self.address = address
+        self.connectionTime = time.time()
+        self.disconnectionTime = None
+        self.bytesReceived = 0
+        self.packetsReceived = 0
+        self.batchesQueued = 0  # number of batches of packets put into queue for main thread
+        self.batchesDelivered = 0  # number of batches of packets handled by main thread
+        self.paused = False  # if True, then reading from client is paused because main thread is too slow
+
+    def connected(self):
+        return self.disconnectionTime is None
+
+    def backlog(self):
+        """ Returns number of batches of packets received from client but not handled by main thread yet. """
+        return self.batchesQueued - self.batchesDelivered
+
+    def throughput(self):
+        """ Returns average number of bytes received per second. """
+        endTime = self.disconnectionTime if self.disconnectionTime is not None else time.time()
+        duration = endTime - self.connectionTime
+        if duration <= 0.0:
+            return float(self.bytesReceived)
+        return self.bytesReceived / duration
+
+#######################################################################################################################
+
+
+class _ClientProtocol(asyncio.Protocol):
+    def __init__(self, server):
+        asyncio.Protocol.__init__(self)
+        self.__server = server
+        self.__reader = PacketsReader()
+        self.__transport = None
+        self.__closing = False  # transport.is_closing() is not available in early Python 3.4 releases
+        self.__pendingBytes = 0  # number of bytes received since last batch has been queued
+        self.statistics = None
+
+    def connection_made(self, transport):
+        self.__transport = transport
+        self.statistics = ClientStatistics(transport.get_extra_info('peername'))
+        self.__server._clientConnected(self)
+
+    def data_received(self, data):
+        statistics = self.statistics
+        statistics.bytesReceived += len(data)
+        self.__pendingBytes += len(data)
+        packets_by_object = self.__reader.feed(data)
+        if packets_by_object:
+            self.__server._dataReceived(self, packets_by_object, self.__pendingBytes)
+            self.__pendingBytes = 0
+            if statistics.backlog() >= _maxBacklog and not statistics.paused:
+                statistics.paused = True
+                self.__transport.pause_reading()
+
+    def connection_lost(self, exc):
+        self.__closing = True
+        packets_by_object = self.__reader.finish()
+        if packets_by_object:
+            self.__server._dataReceived(self, packets_by_object, self.__pendingBytes)
+            self.__pendingBytes = 0
+        self.statistics.disconnectionTime = time.time()
+        self.__server._clientDisconnected(self, exc)
+
+    def resume(self):
+        """ Resume reading from client. Must be called in event loop thread. """
+        if self.statistics.paused and self.__transport is not None and not self.__closing:
+            self.statistics.paused = False
+            self.__transport.resume_reading()
+
+    def close(self):
+        if self.__transport is not None:
+            self.__closing = True
+            self.__transport.close()
+
+#######################################################################################################################
+
+
+class AsyncDebugServer(QObject):
+    """ Debug server with the same interface as debugger_server.DebugServer. """
+
+    def __init__(self, port=4447):
+        QObject.__init__(self, None)
+        self.__address = (socket.gethostname(), port)
+        self.__launched = False
+        self.__loop = None
+        self.__server = None
+        self.__thread = None
+        self.__clients = []  # list of _ClientProtocol (changed in event loop thread only)
+        self.__events = queue.Queue()  # events from event loop thread
+        self.__statistics = []  # statistics of all clients connected since server start
+        self.__timer = QTimer()  # timer for handling received data
+        self.__timer.timeout.connect(self.__onTimeout)
+        debugger_globals.debuggerSignals.debuggerOnOff.connect(self._onDebuggerOnOff)
+
+    @QtCore.Slot(bool)
+    def _onDebuggerOnOff(self, on):
+        if on:
+            self.start()
+        else:
+            self.stop(False)
+
+    def launched(self):
+        return self.__launched
+
+    def statistics(self):
+        """ Returns list of ClientStatistics for all clients connected since server start. """
+        return list(self.__statistics)
+
+    def start(self, port=None):
+        self.stop(True)
+        if port is not None and port != self.__address[1]:
+            self.__address = (socket.gethostname(), port)
+
+        debugger_globals.timelines.clear()
+
+        print('info: Starting debug server on \'%s\' port %s...' % self.__address)
+        started = queue.Queue()
+        self.__thread = threading.Thread(target=self.__run, args=(started,))
+        self.__thread.start()
+        error = started.get(True)
+        if error is not None:
+            self.__thread.join()
+            self.__thread = None
+            print('error: Debug server: can\'t open socket:')
+            for line in str(error).split('\n'):
+                print('error: Debug server: {0}'.format(line))
+            print('')
+            return
+
+        self.__launched = True
+        self.__timer.start(_refreshRate)
+        print('ok: Debug server started successfully.')
+        print('ok: Debug server: use next address for client connection: \'%s\' port %s' % self.__address)
+        print('')
+
+    def stop(self, wait):
+        """ Stop server and close all client connections.
+        Event loop thread finishes quickly, so it is joined even if *wait* is False. """
+        if not self.__launched:
+            return
+        self.__timer.stop()
+        print('info: Stopping debug server on \'%s\' port %s...' % self.__address)
+        self.__launched = False
+        self.__loop.call_soon_threadsafe(self.__shutdown)
+        self.__thread.join()
+        self.__thread = None
+        self.__loop = None
+        self.__server = None
+        self.__onTimeout(True)
+        self.__statistics = []
+        print('ok: debug server stopped')
+        print('')
+
+    def __run(self, started):
+        """ Event loop thread. """
+        loop = asyncio.SelectorEventLoop(selectors.DefaultSelector())
+        asyncio.set_event_loop(loop)
+        try:
+            server = loop.run_until_complete(loop.create_server(lambda: _ClientProtocol(self), self.__address[0],
+                                                                self.__address[1], backlog=_listenBacklog))
+        except (OSError, socket.error) as e:
+            loop.close()
+            started.put(e)
+            return
+
+        self.__loop = loop
+        self.__server = server
+        started.put(None)
+        try:
+            loop.run_forever()
+        finally:
+            loop.run_until_complete(server.wait_closed())
+            loop.close()
+
+    def __shutdown(self):
+        """ Close server and all client connections. Called in event loop thread. """
+        self.__server.close()
+        for client in list(self.__clients):
+            client.close()
+        # let transports call connection_lost before stopping the loop:
+        self.__loop.call_soon(self.__loop.stop)
+
+    def _clientConnected(self, client):
+        self.__clients.append(client)
+        self.__events.put((_Connected, client, None, 0))
+
+    def _clientDisconnected(self, client, exc):
+        if client in self.__clients:
+            self.__clients.remove(client)
+        self.__events.put((_Disconnected, client, exc, 0))
+
+    def _dataReceived(self, client, packets_by_object, bytes_count):
+        statistics = client.statistics
+        statistics.packetsReceived += sum([len(packets) for packets in packets_by_object.values()])
+        statistics.batchesQueued += 1
+        self.__events.put((_Data, client, packets_by_object, bytes_count))
+
+    @QtCore.Slot()
+    def __onTimeout(self, final=False):
+        if not self.__launched and not final:
+            return
+
+        # Merge all received data by clients
+        received = []  # list of (client, packets_by_object, bytes_count)
+        receivedByClient = dict()
+        resume = []
+        while True:
+            try:
+                event, client, data, bytes_count = self.__events.get_nowait()
+            except queue.Empty:
+                break
+            statistics = client.statistics
+            if event == _Data:
+                statistics.batchesDelivered += 1
+                if client not in receivedByClient:
+                    receivedByClient[client] = len(received)
+                    received.append((client, data, bytes_count))
+                else:
+                    i = receivedByClient[client]
+                    packets_by_object = received[i][1]
+                    for object_uid in data:
+                        if object_uid not in packets_by_object:
+                            packets_by_object[object_uid] = data[object_uid]
+                        else:
+                            packets_by_object[object_uid].extend(data[object_uid])
+                    received[i] = (client, packets_by_object, received[i][2] + bytes_count)
+                if statistics.paused and client not in resume:
+                    resume.append(client)
+            elif event == _Connected:
+                self.__statistics.append(statistics)
+                print('info: Debug server: new connection from \'%s\' port %s' % statistics.address[:2])
+            elif event == _Disconnected:
+                print('info: Debug server: connection from \'%s\' port %s closed ' % statistics.address[:2] +
+                      '({0} bytes, {1} packets received, {2:.1f} Kb/s)'.format(statistics.bytesReceived,
+                                                                            statistics.packetsReceived,
+                                                                            statistics.throughput() / 1024.0))
+                if data is not None:
+                    print('warning: Debug server: {0}'.format(data))
+
+        for client, packets_by_object, bytes_count in received:
+            handleReceivedData(packets_by_object, bytes_count, client.statistics.address)
+
+        # Resume reading from clients which have been paused because of big backlog
+        if resume and self.__loop is not None:
+            for client in resume:
+                self.__loop.call_soon_threadsafe(client.resume)
+
+#######################################################################################################################
+#######################################################################################################################
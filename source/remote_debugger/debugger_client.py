@@ -0,0 +1,172 @@
+# coding=utf-8
+# -----------------
+# file      : debugger_client.py
+# date      : 2026/10/18
+# author    : Victor Zarubkin
+# contact   : victor.zarubkin@gmail.com
+# copyright : Copyright (C) 2026  Victor Zarubkin
+# license   : This file is part of BehaviorStudio.
+#           :
+#           : BehaviorStudio is free software: you can redistribute it and/or modify
+#           : it under the terms of the GNU General Public License as published by
+#           : the Free Software Foundation, either version 3 of the License, or
+#           : (at your option) any later version.
+#           :
+#           : BehaviorStudio is distributed in the hope that it will be useful,
+#           : but WITHOUT ANY WARRANTY; without even the implied warranty of
+#           : MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#           : GNU General Public License for more details.
+#           :
+#           : You should have received a copy of the GNU General Public License
+#           : along with BehaviorStudio. If not, see <http://www.gnu.org/licenses/>.
+#           :
+#           : A copy of the GNU General Public License can be found in file COPYING.
+############################################################################
+
+""" Reference client of remote debugger.
+
+It shows how game should send debug information to BehaviorStudio and it can be used for testing debug server.
+It does not depend on Qt, so it can be used from any python script.
+
+Usage example:
+    client = DebugClient()
+    client.beginPacket(objectUid, time)
+    client.addState(nodeUid, state)
+    client.addMessage('some text')
+    client.send(('localhost', 4447))
+
+Streaming usage example (debug server shows received states while connection is open):
+    client = DebugClient()
+    client.connect(('localhost', 4447))
+    for each frame:
+        client.beginPacket(objectUid, time)
+        client.addState(nodeUid, state)
+        client.flush()
+    client.disconnect()
+"""
+
+from __future__ import unicode_literals
+
+__author__ = 'Victor Zarubkin'
+__copyright__ = 'Copyright (C) 2026  Victor Zarubkin'
+__credits__ = ['Victor Zarubkin']
+__license__ = ['GPLv3']
+__version__ = '1.3.0'  # this is last application version when this script file was changed
+__email__ = 'victor.zarubkin@gmail.com'
+############################################################################
+
+import socket
+import zlib
+
+from remote_debugger import debugger_protocol
+
+#######################################################################################################################
+#######################################################################################################################
+
+
+class DebugClient(object):
+    def __init__(self, binary=True):
+        """
+        *binary* - if True, then binary protocol is used (see debugger_protocol), otherwise text protocol is used
+        """
+        self.__binary = binary
+        self.__chunks = []
+        self.__states = []  # node states of current packet that have not been written yet (binary protocol only)
+        self.__connection = None  # persistent connection (see DebugClient.connect)
+        self.__compressor = None
+        if binary:
+            self.__chunks.append(debugger_protocol.header())
+
+    def binary(self):
+        return self.__binary
+
+    def beginPacket(self, objectUid, time):
+        """ Start new packet for object with id *objectUid* at *time* (in seconds). """
+        if self.__binary:
+            self.__flushStates()
+            self.__chunks.append(debugger_protocol.packet(objectUid, time))
+        else:
+            self.__chunks.append('[pkt][id]{0}[t]{1!r}'.format(objectUid, float(time)).encode('utf-8'))
+
+    def addState(self, nodeUid, state, message=''):
+        """ Add state of tree node with uid *nodeUid* into current packet. """
+        if self.__binary:
+            if message:
+                self.__flushStates()
+                self.__chunks.append(debugger_protocol.stateMessage(nodeUid, state, message))
+            else:
+                self.__states.append((nodeUid, state))
+        elif message:
+            self.__chunks.append('[m][ts]{0},{1},{2}'.format(nodeUid, state, message).encode('utf-8'))
+        else:
+            self.__chunks.append('[m][ts]{0},{1}'.format(nodeUid, state).encode('utf-8'))
+
+    def addMessage(self, text):
+        """ Add text message into current packet. """
+        if self.__binary:
+            self.__flushStates()
+            self.__chunks.append(debugger_protocol.message(text))
+        else:
+            self.__chunks.append('[m]{0}'.format(text).encode('utf-8'))
+
+    def data(self):
+        """ Returns compressed data of all packets. """
+        self.__flushStates()
+        return zlib.compress(b''.join(self.__chunks))
+
+    def send(self, address):
+        """ Send all packets to debug server with *address* (tuple (host, port)) and clear packets list. """
+        data = self.data()
+        connection = socket.create_connection(address)
+        try:
+            connection.sendall(data)
+        finally:
+            connection.close()
+        self.clear()
+
+    def connect(self, address):
+        """ Open persistent connection with debug server with *address* (tuple (host, port)).
+        Packets are sent by DebugClient.flush then. """
+        self.disconnect()
+        self.__connection = socket.create_connection(address)
+        self.__compressor = zlib.compressobj()
+
+    def connected(self):
+        return self.__connection is not None
+
+    def flush(self):
+        """ Send all packets added since previous flush through persistent connection. """
+        if self.__connection is None:
+            return
+        self.__flushStates()
+        data = self.__compressor.compress(b''.join(self.__chunks)) + self.__compressor.flush(zlib.Z_SYNC_FLUSH)
+        del self.__chunks[:]
+        self.__connection.sendall(data)
+
+    def disconnect(self):
+        """ Send the rest of packets and close persistent connection. """
+        if self.__connection is None:
+            return
+        connection = self.__connection
+        try:
+            self.flush()
+            connection.sendall(self.__compressor.flush())
+        finally:
+            self.__connection = None
+            self.__compressor = None
+            connection.close()
+            self.clear()
+
+    def clear(self):
+        del self.__chunks[:]
+        del self.__states[:]
+        if self.__binary:
+            self.__chunks.append(debugger_protocol.header())
+
+    def __flushStates(self):
+        if self.__states:
+            self.__chunks.append(debugger_protocol.states(self.__states))
+            del self.__states[:]
+
+#######################################################################################################################
+#######################################################################################################################
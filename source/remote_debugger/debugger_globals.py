@@ -31,7 +31,7 @@ __author__ = 'Victor Zarubkin'
 __copyright__ = 'Copyright (C) 2014  Victor Zarubkin'
 __credits__ = ['Victor Zarubkin']
 __license__ = ['GPLv3']
-__version__ = '1.2.2'  # this is last application version when this script file was changed
+__version__ = '1.3.0'  # this is last application version when this script file was changed
 __email__ = 'victor.zarubkin@gmail.com'
 ############################################################################
 
@@ -43,14 +43,19 @@ from remote_debugger.debugger_node_information import *
 #######################################################################################################################
 
 maxRecords = int(1000)  # how much debug records debugger will hold for each object
+asyncServer = True  # use debugger_async_server.AsyncDebugServer if asyncio is available
 mode = DebuggerMode.CurrentState
 timeMark = -1.0
+debugObject = None  # uid of object which states are shown on diagrams (if None, the last updated object is shown)
+
+timelines = DebugTimelines(maxRecords)  # all received debug information
 
 
 class _RemoteDebuggerSignals(QObject):
     debuggerOnOff = QtSignal(bool)  # debugger has been turned on or off
     modeChanged = QtSignal(int)  # debugger mode has been changed (see DebuggerMode)
     timeSliceChanged = QtSignal(float)  # (time mark in seconds)
+    timelinesUpdated = QtSignal(list)  # new debug information has been received (list of objects uids)
 
     def __init__(self):
         QObject.__init__(self)
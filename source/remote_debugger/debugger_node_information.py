@@ -37,8 +37,14 @@ __version__ = '1.3.0'  # this is last application version when this script file
 __email__ = 'victor.zarubkin@gmail.com'
 ############################################################################
 
+from array import array
+from bisect import bisect_right
+from collections import deque
+
 from sortedcontainers import SortedDict as sorted_dict
 
+from compat_2to3 import *
+
 #######################################################################################################################
 #######################################################################################################################
 
@@ -73,20 +79,309 @@ class EntityDebugInformation(object):
     def __init__(self):
         self._timeline = sorted_dict()
 
+    def __len__(self):
+        return len(self._timeline)
+
     def insert(self, message, time):
         self._timeline[time] = message
 
+    def peekitem(self, index=-1):
+        """ Returns tuple (time, message) of record with *index* in order of time. O(log n). """
+        return self._timeline.peekitem(index)
+
     def get(self, time=None):
+        """ Returns the latest message at the moment *time* (the latest one if time is None). O(log n). """
         if not self._timeline:
             return None
         if time is None:
-            return self._timeline[list(self._timeline.keys())[-1]]
-        if time in self._timeline:
-            return self._timeline[time]
-        key_index = self._timeline.bisect_left(time) - 1
+            return self._timeline.peekitem(-1)[1]
+        key_index = self._timeline.bisect_right(time) - 1
         if key_index < 0:
             return None
-        return self._timeline[list(self._timeline.keys())[key_index]]
+        return self._timeline.peekitem(key_index)[1]
+
+#######################################################################################################################
+
+
+class NodeTimeline(object):
+    """ Bounded timeline of one tree node states.
+
+    Records are stored in a ring buffer of parallel arrays (times, states and optional messages), so when timeline
+    is full, the oldest record is overwritten by new one. Records are expected to come in order of time
+    (appending costs O(1) then); a record older than the last one is inserted in O(n).
+    """
+
+    __slots__ = ('_times', '_states', '_messages', '_start', '_size')
+
+    def __init__(self, capacity):
+        capacity = max(int(capacity), 1)
+        self._times = array('d', [0.0]) * capacity
+        self._states = array('i', [0]) * capacity
+        self._messages = None  # list of messages is created on first non-empty message
+        self._start = 0  # index of the oldest record
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def capacity(self):
+        return len(self._times)
+
+    def clear(self):
+        self._messages = None
+        self._start = 0
+        self._size = 0
+
+    def _index(self, i):
+        """ Returns index in arrays for i-th record (negative i is counted from the end). """
+        if i < 0:
+            i += self._size
+        if i < 0 or i >= self._size:
+            raise IndexError('timeline index out of range')
+        return (self._start + i) % len(self._times)
+
+    def time(self, i):
+        return self._times[self._index(i)]
+
+    def state(self, i):
+        return self._states[self._index(i)]
+
+    def message(self, i):
+        if self._messages is None:
+            return ''
+        return self._messages[self._index(i)]
+
+    def item(self, i):
+        """ Returns i-th record as tuple (time, state, message). """
+        k = self._index(i)
+        return self._times[k], self._states[k], self._messages[k] if self._messages is not None else ''
+
+    def current(self):
+        """ Returns the latest record (time, state, message) or None if timeline is empty. O(1). """
+        if not self._size:
+            return None
+        return self.item(-1)
+
+    def bisect(self, time):
+        """ Returns number of records with time less or equal to *time*. O(log n). """
+        times = self._times
+        capacity = len(times)
+        start = self._start
+        end = start + self._size
+        if end <= capacity:
+            return bisect_right(times, time, start, end) - start
+        # records are wrapped around the end of arrays: [start, capacity) are older than [0, end - capacity)
+        if time < times[0]:
+            return bisect_right(times, time, start, capacity) - start
+        return capacity - start + bisect_right(times, time, 0, end - capacity)
+
+    def stateAt(self, time):
+        """ Returns node state at the moment *time* or None. O(log n). """
+        i = self.bisect(time)
+        if not i:
+            return None
+        return self._states[(self._start + i - 1) % len(self._times)]
+
+    def at(self, time):
+        """ Returns the latest record (time, state, message) at the moment *time* or None. O(log n). """
+        i = self.bisect(time) - 1
+        if i < 0:
+            return None
+        return self.item(i)
+
+    def append(self, time, state, message=''):
+        """ Add new record. Record with the same time as existing one replaces it. """
+        size = self._size
+        if size:
+            lastTime = self._times[self._index(-1)]
+            if time <= lastTime:
+                self.__insert(time, state, message)
+                return
+
+        capacity = len(self._times)
+        if size < capacity:
+            k = (self._start + size) % capacity
+            self._size = size + 1
+        else:
+            k = self._start
+            self._start = (k + 1) % capacity
+        self.__set(k, time, state, message)
+
+    def __set(self, k, time, state, message):
+        self._times[k] = time
+        self._states[k] = state
+        if message:
+            if self._messages is None:
+                self._messages = [''] * len(self._times)
+            self._messages[k] = message
+        elif self._messages is not None:
+            self._messages[k] = ''
+
+    def __insert(self, time, state, message):
+        i = self.bisect(time)
+        if i > 0 and self._times[self._index(i - 1)] == time:
+            self.__set(self._index(i - 1), time, state, message)
+            return
+
+        capacity = len(self._times)
+        if self._size == capacity:
+            if i == 0:
+                return  # the record is older than all records of full timeline
+            # drop the oldest record
+            self._start = (self._start + 1) % capacity
+            self._size -= 1
+            i -= 1
+
+        # shift newer records to free space for the record
+        self._size += 1
+        for j in xrange(self._size - 1, i, -1):
+            k, prev = self._index(j), self._index(j - 1)
+            self._times[k] = self._times[prev]
+            self._states[k] = self._states[prev]
+            if self._messages is not None:
+                self._messages[k] = self._messages[prev]
+        self.__set(self._index(i), time, state, message)
+
+#######################################################################################################################
+
+
+class ObjectTimeline(object):
+    """ Debug information of one object (entity) received from remote debugger client:
+    timelines of all tree nodes states and common text messages. """
+
+    def __init__(self, capacity):
+        self._capacity = capacity
+        self._nodes = dict()  # {node uid: NodeTimeline}
+        self._messages = deque(maxlen=max(int(capacity), 1))  # common messages, tuples (time, text)
+        self._lastTime = -1.0
+
+    def insert(self, time, packet_data):
+        """ Add data of one packet (dict with 'bt' and 'cmn' messages, see debugger_server.ClientThread). """
+        nodes = self._nodes
+        for m in packet_data.get('bt', ()):
+            if not m.valid():
+                continue
+            uid = m.uid()
+            if uid in nodes:
+                nodes[uid].append(time, m.state(), m.message())
+            else:
+                timeline = NodeTimeline(self._capacity)
+                timeline.append(time, m.state(), m.message())
+                nodes[uid] = timeline
+        for m in packet_data.get('cmn', ()):
+            self._messages.append((time, m.text()))
+        if time > self._lastTime:
+            self._lastTime = time
+
+    def lastTime(self):
+        return self._lastTime
+
+    def nodes(self):
+        """ Returns dict {node uid: NodeTimeline}. """
+        return self._nodes
+
+    def node(self, uid):
+        return self._nodes.get(uid)
+
+    def messages(self):
+        return self._messages
+
+    def state(self, uid, time=None):
+        """ Returns state of node with *uid* at the moment *time* (latest state if time is None) or None. """
+        timeline = self._nodes.get(uid)
+        if timeline is None or not timeline:
+            return None
+        if time is None:
+            return timeline.state(-1)
+        return timeline.stateAt(time)
+
+    def statesAt(self, time=None):
+        """ Returns dict {node uid: state} of all nodes at the moment *time* (latest states if time is None).
+        Nodes having no records before *time* are not included. """
+        states = dict()
+        if time is None:
+            for uid, timeline in self._nodes.items():
+                if timeline:
+                    states[uid] = timeline.state(-1)
+        else:
+            for uid, timeline in self._nodes.items():
+                state = timeline.stateAt(time)
+                if state is not None:
+                    states[uid] = state
+        return states
+
+    def currentStatesAt(self, time=None):
+        """ Returns dict {node uid: state} of nodes which have been updated by the latest packet at the moment *time*
+        (the last packet if time is None). It is used for DebuggerMode.CurrentState. """
+        records = []
+        packetTime = None
+        for uid, timeline in self._nodes.items():
+            record = timeline.current() if time is None else timeline.at(time)
+            if record is not None:
+                records.append((uid, record[0], record[1]))
+                if packetTime is None or record[0] > packetTime:
+                    packetTime = record[0]
+        return dict([(uid, state) for uid, t, state in records if t == packetTime])
+
+#######################################################################################################################
+
+
+class DebugTimelines(object):
+    """ Debug information of all objects received from remote debugger clients. """
+
+    def __init__(self, capacity):
+        self._capacity = capacity  # max number of records for each node of each object
+        self._objects = dict()  # {object uid: ObjectTimeline}
+
+    def __len__(self):
+        return len(self._objects)
+
+    def __contains__(self, objectUid):
+        return objectUid in self._objects
+
+    def setCapacity(self, capacity):
+        """ Set max number of records for each node. It is applied to objects received after this call. """
+        self._capacity = capacity
+
+    def clear(self):
+        self._objects.clear()
+
+    def objects(self):
+        return list(self._objects.keys())
+
+    def get(self, objectUid):
+        return self._objects.get(objectUid)
+
+    def insert(self, packets_by_object):
+        """ Add received packets (see debugger_server.ClientThread._parsePackets).
+        Returns list of updated objects uids. """
+        for objectUid in packets_by_object:
+            timeline = self._objects.get(objectUid)
+            if timeline is None:
+                timeline = ObjectTimeline(self._capacity)
+                self._objects[objectUid] = timeline
+            for current_time, packet_data in packets_by_object[objectUid]:
+                timeline.insert(current_time, packet_data)
+        return list(packets_by_object.keys())
+
+    def state(self, objectUid, nodeUid, time=None):
+        """ Returns state of node *nodeUid* of object *objectUid* at the moment *time*
+        (latest state if time is None) or None. """
+        timeline = self._objects.get(objectUid)
+        if timeline is None:
+            return None
+        return timeline.state(nodeUid, time)
+
+    def statesAt(self, objectUid, time=None, currentOnly=False):
+        """ Returns dict {node uid: state} of all nodes of object *objectUid* (see ObjectTimeline.statesAt).
+        If *currentOnly* is True, then only nodes updated by the latest packet are returned
+        (see ObjectTimeline.currentStatesAt). """
+        timeline = self._objects.get(objectUid)
+        if timeline is None:
+            return dict()
+        if currentOnly:
+            return timeline.currentStatesAt(time)
+        return timeline.statesAt(time)
 
 #######################################################################################################################
 #######################################################################################################################
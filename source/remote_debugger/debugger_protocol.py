@@ -0,0 +1,134 @@
+# coding=utf-8
+# -----------------
+# file      : debugger_protocol.py
+# date      : 2026/10/18
+# author    : Victor Zarubkin
+# contact   : victor.zarubkin@gmail.com
+# copyright : Copyright (C) 2026  Victor Zarubkin
+# license   : This file is part of BehaviorStudio.
+#           :
+#           : BehaviorStudio is free software: you can redistribute it and/or modify
+#           : it under the terms of the GNU General Public License as published by
+#           : the Free Software Foundation, either version 3 of the License, or
+#           : (at your option) any later version.
+#           :
+#           : BehaviorStudio is distributed in the hope that it will be useful,
+#           : but WITHOUT ANY WARRANTY; without even the implied warranty of
+#           : MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#           : GNU General Public License for more details.
+#           :
+#           : You should have received a copy of the GNU General Public License
+#           : along with BehaviorStudio. If not, see <http://www.gnu.org/licenses/>.
+#           :
+#           : A copy of the GNU General Public License can be found in file COPYING.
+############################################################################
+
+""" Binary protocol of remote debugger.
+
+Client data (after zlib decompression) starts with protocol signature and protocol version.
+If there is no signature then data is treated as text packets with '[pkt]', '[id]', '[t]', '[m]' and '[ts]' markers.
+
+Binary data is a sequence of records. Each record starts with a header: size of record data in bytes (uint32)
+and record type (uint8, see RecordType). All numbers are little-endian.
+
+Records:
+RecordType.Packet - object id (int64) and time (float64); all next records belong to this packet.
+RecordType.States - array of node states, each state is node uid (uint32) and node state (int32).
+RecordType.StateMessage - node uid (uint32), node state (int32) and utf-8 text.
+RecordType.Message - utf-8 text.
+"""
+
+from __future__ import unicode_literals
+
+__author__ = 'Victor Zarubkin'
+__copyright__ = 'Copyright (C) 2026  Victor Zarubkin'
+__credits__ = ['Victor Zarubkin']
+__license__ = ['GPLv3']
+__version__ = '1.3.0'  # this is last application version when this script file was changed
+__email__ = 'victor.zarubkin@gmail.com'
+############################################################################
+
+import struct
+
+from compat_2to3 import *
+
+#######################################################################################################################
+
+signature = b'BSDP'
+version = 1  # must be increased on every change of records format
+
+streamHeader = struct.Struct(str('<4sB'))  # signature, version
+recordHeader = struct.Struct(str('<IB'))  # record data size, record type
+packetRecord = struct.Struct(str('<qd'))  # object id, time
+nodeState = struct.Struct(str('<Ii'))  # node uid, node state
+
+
+class RecordType:
+    Packet = 1
+    States = 2
+    StateMessage = 3
+    Message = 4
+
+    def __init__(self):
+        pass
+
+#######################################################################################################################
+
+
+def isBinary(data):
+    """ Returns True if data has been sent using binary protocol. """
+    return data[:len(signature)] == signature
+
+
+def readVersion(data):
+    """ Returns protocol version of binary data or None if data is too short. """
+    if len(data) < streamHeader.size:
+        return None
+    return streamHeader.unpack_from(data, 0)[1]
+
+
+if hasattr(nodeState, 'iter_unpack'):
+    def readStates(data):
+        """ Returns iterator over (node uid, node state) tuples of RecordType.States record data. """
+        return nodeState.iter_unpack(data)
+else:
+    def readStates(data):
+        """ Returns list of (node uid, node state) tuples of RecordType.States record data. """
+        unpack = nodeState.unpack_from
+        return [unpack(data, offset) for offset in xrange(0, len(data), nodeState.size)]
+
+
+def readText(data):
+    """ Returns text of RecordType.Message record data (data is a memoryview). """
+    return data.tobytes().decode('utf-8', 'replace')
+
+#######################################################################################################################
+
+
+def header():
+    return streamHeader.pack(signature, version)
+
+
+def record(recordType, data):
+    return recordHeader.pack(len(data), recordType) + data
+
+
+def packet(objectUid, time):
+    return record(RecordType.Packet, packetRecord.pack(objectUid, time))
+
+
+def states(nodeStates):
+    """ Returns RecordType.States record for list of (node uid, node state) tuples. """
+    pack = nodeState.pack
+    return record(RecordType.States, b''.join([pack(uid, state) for uid, state in nodeStates]))
+
+
+def stateMessage(uid, state, text):
+    return record(RecordType.StateMessage, nodeState.pack(uid, state) + text.encode('utf-8'))
+
+
+def message(text):
+    return record(RecordType.Message, text.encode('utf-8'))
+
+#######################################################################################################################
+#######################################################################################################################
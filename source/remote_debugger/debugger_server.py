@@ -51,11 +51,13 @@ if isPython2:
 else:
     import queue
 
-import sys
+import codecs
 import zlib
 
 import globals
 from remote_debugger import debugger_globals
+from remote_debugger import debugger_protocol
+from remote_debugger.debugger_protocol import RecordType
 
 #######################################################################################################################
 
@@ -65,18 +67,19 @@ _timeMarker = '[t]'
 _messageMarker = '[m]'
 _treeStateMarker = '[ts]'
 
-_packetHeaderLen = len(_packetHeader)
 _treeStateMarkerLen = len(_treeStateMarker)
 _timeMarkerLen = len(_timeMarker)
 _idMarkerLen = len(_idMarker)
 
-_portionSize = 32  # clients receive buffer size in bytes
+_receiveBufferSize = 65536  # clients receive buffer size in bytes
 _refreshRate = 40  # how often handle clients connections and receive data, milliseconds
 
 #######################################################################################################################
 
 
 class DebugMessage(object):
+    __slots__ = ('_text', '_type')
+
     def __init__(self, text):
         self._text = text
         self._type = str
@@ -94,7 +97,21 @@ class DebugMessage(object):
 
 
 class TreeDebugMessage(DebugMessage):
-    def __init__(self, text):
+    __slots__ = ('_uid', '_state', '_message', '_valid')
+
+    def __init__(self, text, values=None):
+        """
+        *text* is message text 'uid,state[,message]' received with text protocol
+        *values* is tuple (uid, state, message) received with binary protocol (text must be None then)
+        """
+        if values is not None:
+            # binary protocol messages are created by thousands, so there is no extra calls here
+            self._text = None
+            self._type = TreeDebugMessage
+            self._uid, self._state, self._message = values
+            self._valid = True
+            return
+
         DebugMessage.__init__(self, text)
         self._setType(TreeDebugMessage)
         self._uid = 0
@@ -125,6 +142,14 @@ class TreeDebugMessage(DebugMessage):
 
             self._valid = validUid and validState
 
+    def text(self):
+        if self._text is None:
+            if self._message:
+                self._text = '{0},{1},{2}'.format(self._uid, self._state, self._message)
+            else:
+                self._text = '{0},{1}'.format(self._uid, self._state)
+        return self._text
+
     def valid(self):
         return self._valid
 
@@ -140,79 +165,246 @@ class TreeDebugMessage(DebugMessage):
 #######################################################################################################################
 
 
+class PacketsReader(object):
+    """Incremental reader of data received from client.
+
+    Compressed data is fed by portions as it is received from socket and all packets received completely
+    to this moment are returned at once. So client can keep connection open and send packets continuously
+    (client must flush compressor with zlib.Z_SYNC_FLUSH after each portion of packets then,
+    see debugger_client.DebugClient.flush).
+
+    Text packets are returned when next packet header is received (or when connection is closed).
+    Binary packets are returned record by record: if the rest of the packet will be received later,
+    it will be returned as another packet with the same object id and time.
+    """
+
+    def __init__(self):
+        self.__decompressor = zlib.decompressobj()
+        self.__broken = False
+        self.__binary = None  # protocol type is unknown until first bytes will be received
+        self.__headerRead = False
+        self.__data = b''  # received binary data which has not been handled yet
+        self.__text = ''  # received text which has not been handled yet
+        self.__decoder = codecs.getincrementaldecoder('utf-8')('replace')
+        self.__packet = None  # (object id, time, packet data) of current binary packet
+
+    def feed(self, data):
+        """Handle next portion of received data.
+
+        Returns packets received completely (the same data as ClientThread._parsePackets).
+        """
+        if self.__broken:
+            return dict()
+        try:
+            data = self.__decompressor.decompress(data)
+        except zlib.error as e:
+            print('error: Debug server: can\'t decompress received data: {0}'.format(e))
+            self.__broken = True
+            return dict()
+        return self.__read(data, False)
+
+    def finish(self):
+        """Handle the rest of received data after client has closed connection."""
+        if self.__broken:
+            return dict()
+        try:
+            data = self.__decompressor.flush()
+        except zlib.error:
+            data = b''
+        return self.__read(data, True)
+
+    def __read(self, data, final):
+        if self.__binary is None:
+            data = self.__data + data
+            self.__data = b''
+            if len(data) < len(debugger_protocol.signature) and not final:
+                self.__data = data  # protocol is still unknown
+                return dict()
+            self.__binary = debugger_protocol.isBinary(data)
+        if self.__binary:
+            return self.__readBinary(data, final)
+        return self.__readText(data, final)
+
+    def __readText(self, data, final):
+        global _packetHeader
+
+        self.__text += self.__decoder.decode(data, final)
+        if final:
+            text, self.__text = self.__text, ''
+        else:
+            # the last packet could be received partially, so it will be handled after next packet header
+            i = self.__text.rfind(_packetHeader)
+            if i <= 0:
+                return dict()
+            text, self.__text = self.__text[:i], self.__text[i:]
+
+        # All data before first packet header is skipped
+        return ClientThread._parsePackets(text.split(_packetHeader)[1:])
+
+    def __readBinary(self, data, final):
+        packets_by_object = dict()
+
+        if self.__data:
+            data = self.__data + data
+
+        offset = 0
+        if not self.__headerRead:
+            if len(data) < debugger_protocol.streamHeader.size:
+                self.__data = data
+                return packets_by_object
+            protocolVersion = debugger_protocol.readVersion(data)
+            if protocolVersion != debugger_protocol.version:
+                print('error: Debug server: unsupported protocol version {0} (supported version is {1})'
+                      .format(protocolVersion, debugger_protocol.version))
+                self.__broken = True
+                return packets_by_object
+            offset = debugger_protocol.streamHeader.size
+            self.__headerRead = True
+
+        offset = self.__readRecords(memoryview(data), offset, packets_by_object)
+        self.__data = data[offset:]
+        if final and self.__data:
+            print('warning: Debug server: received data is truncated')
+
+        # Store records of current packet received to this moment
+        self.__storePacket(packets_by_object)
+        if self.__packet is not None and self.__packet[2]:
+            self.__packet = (self.__packet[0], self.__packet[1], dict())
+
+        return packets_by_object
+
+    def __readRecords(self, view, offset, packets_by_object):
+        """Handle all complete records (see debugger_protocol). Returns offset of first unhandled record."""
+
+        size = len(view)
+        headerSize = debugger_protocol.recordHeader.size
+        readHeader = debugger_protocol.recordHeader.unpack_from
+        nodeStateSize = debugger_protocol.nodeState.size
+        packetSize = debugger_protocol.packetRecord.size
+
+        while offset + headerSize <= size:
+            length, recordType = readHeader(view, offset)
+            start = offset + headerSize
+            end = start + length
+            if end > size:
+                # the record has not been received completely yet
+                break
+            offset = end
+
+            if recordType == RecordType.Packet:
+                self.__storePacket(packets_by_object)
+                if length < packetSize:
+                    print('warning: Debug server: broken packet record')
+                    self.__packet = None
+                    continue
+                object_uid, current_time = debugger_protocol.packetRecord.unpack_from(view, start)
+                self.__packet = (object_uid, current_time, dict())
+                continue
+
+            if self.__packet is None:
+                # This record is not a part of any packet, so it is broken
+                continue
+
+            packet_data = self.__packet[2]
+            if recordType == RecordType.States and length % nodeStateSize == 0:
+                if 'bt' not in packet_data:
+                    packet_data['bt'] = []
+                packet_data['bt'].extend([TreeDebugMessage(None, (uid, state, ''))
+                                          for uid, state in debugger_protocol.readStates(view[start:end])])
+            elif recordType == RecordType.StateMessage and length >= nodeStateSize:
+                uid, state = debugger_protocol.nodeState.unpack_from(view, start)
+                text = debugger_protocol.readText(view[start + nodeStateSize:end])
+                if 'bt' not in packet_data:
+                    packet_data['bt'] = []
+                packet_data['bt'].append(TreeDebugMessage(None, (uid, state, text)))
+            elif recordType == RecordType.Message:
+                common_message = DebugMessage(debugger_protocol.readText(view[start:end]))
+                if 'cmn' in packet_data:
+                    packet_data['cmn'].append(common_message)
+                else:
+                    packet_data['cmn'] = [common_message]
+            # records of unknown types and broken records are skipped
+
+        return offset
+
+    def __storePacket(self, packets_by_object):
+        if self.__packet is None or not self.__packet[2]:
+            return
+        object_uid, current_time, packet_data = self.__packet
+        if object_uid not in packets_by_object:
+            packets_by_object[object_uid] = [(current_time, packet_data)]
+        else:
+            packets_by_object[object_uid].append((current_time, packet_data))
+
+#######################################################################################################################
+
+
 # Separate thread working with client connection, receive and handle all data from client
 class ClientThread(threading.Thread):
     def __init__(self, clientSocket):
         threading.Thread.__init__(self)
         self._socket = clientSocket
+        self._connection = None
+        self._stopped = False
         self.received_data = queue.Queue()
         self.addr = queue.Queue()
 
+    def stop(self):
+        """Close client connection. This method is called from main thread to stop receiving data."""
+        self._stopped = True
+        connection = self._connection
+        if connection is not None:
+            try:
+                connection.shutdown(socket.SHUT_RDWR)
+            except socket.error:
+                pass
+
     def run(self):
         """Main client thread loop.
 
         First, the thread accepts client connection.
-        After connection is accepted, the thread will receive data from client with small portions
-        (_portionSize bytes).
-        After all data will be received, the thread will handle it, divide it into different packets and so on.
+        After connection is accepted, the thread will receive data from client by big portions
+        (up to _receiveBufferSize bytes) into preallocated buffer.
+        Each portion is decompressed and divided into packets at once (see PacketsReader), and all completely
+        received packets are put into output queue, so they are available while client is still sending data.
+        The thread finishes when client closes connection.
         """
 
-        global _portionSize, _packetHeader, _packetHeaderLen
+        global _receiveBufferSize
 
         # 1) Accept client connection
         client_connection, client_address = self._socket.accept()
+        self._connection = client_connection
         self.addr.put(client_address, True)
+        if self._stopped:
+            self.stop()
 
-        # 2) Receive data from client
-        received_data = ''
+        # 2) Receive data from client and handle it
+        reader = PacketsReader()
+        buffer = bytearray(_receiveBufferSize)
+        view = memoryview(buffer)
         bytes_count = 0
         while True:
-            data = client_connection.recv(_portionSize)
-            if data:
-                received_data += data
-                bytes_count += sys.getsizeof(data, 0) - sys.getsizeof(type(data)(), 0)  # real bytes count
-            else:
-                client_connection.close()
+            try:
+                size = client_connection.recv_into(buffer)
+            except socket.error as e:
+                if not self._stopped:
+                    print('warning: Debug server: connection with \'%s\' port %s is broken: ' % client_address +
+                          '{0}'.format(e))
+                size = 0
+            if not size:
                 break
+            bytes_count += size
+            packets_by_object = reader.feed(view[:size].tobytes())
+            if packets_by_object:
+                self.received_data.put((packets_by_object, bytes_count, client_address), True)
+                bytes_count = 0
 
-        # 3) Divide received data into packets
-        packets = []  # the packets list
-        if received_data:
-            received_data = zlib.decompress(received_data)
-            while received_data:
-                # Search for packet header...
-                # 'i' is the index of first character of packet header
-                i = received_data.find(_packetHeader)
-                if i < 0:
-                    break
-                # 'k' is the index of first character of data itself (a data without packet header in it)
-                k = i + _packetHeaderLen
-                if k < len(received_data):
-                    # If there is some data in packet after the header, try to find next packet header
-                    # if it is exist (if there are several packets in client data)
-                    j = received_data.find(_packetHeader, k)
-                else:
-                    # The packet is empty and there could not be any other packets
-                    j = -1
-                if j < 0:
-                    # There is only one packet in client data, store it in packets list
-                    packets.append(received_data[k:])
-                    break
-                else:
-                    # There are several packets in client data.
-                    # Store
-                    packets.append(received_data[k:j])
-                    k = j + _packetHeaderLen
-                    if k < len(received_data):
-                        # excluding handled packet from data
-                        received_data = received_data[k:]
-                    else:
-                        # actually there is only one packet in client data
-                        # (there are several packet headers, but the last packet is empty)
-                        break
+        self._connection = None
+        client_connection.close()
 
-        # 4) Handle all packets and put handled data into output queue
-        self.received_data.put((ClientThread._parsePackets(packets), bytes_count, client_address), True)
+        # 3) Handle the rest of data and put it into output queue
+        self.received_data.put((reader.finish(), bytes_count, client_address), True)
 
     @staticmethod
     def _parsePackets(packets):
@@ -357,6 +549,38 @@ class ClientThread(threading.Thread):
 #######################################################################################################################
 
 
+def handleReceivedData(packets_by_object, bytes_count, client_address):
+    """Handle data received from client (packets_by_object is the data returned by ClientThread._parsePackets)."""
+
+    # Print debug information
+    if globals.debugMode and packets_by_object:
+        msg = 'debug: Debug server: received '
+        if bytes_count >= 1024:
+            kbytes_count = bytes_count / 1024
+            if kbytes_count >= 1024:
+                msg += '{0} Mb from '.format(kbytes_count / 1024)
+            else:
+                msg += '{0} Kb from '.format(kbytes_count)
+        else:
+            msg += '{0} Bytes from '.format(bytes_count)
+        print(msg + '\'%s\' port %s' % client_address[:2])
+        for object_uid in packets_by_object:
+            for data in packets_by_object[object_uid]:
+                current_time, messages = data
+                text = 'object: {0}, time: {1}, data: '.format(object_uid, current_time)
+                for d in messages:
+                    for m in messages[d]:
+                        text += m.text() + '; '
+                print('debug: Debug server: received {0}'.format(text))
+        print('debug: ')
+
+    if packets_by_object:
+        updated = debugger_globals.timelines.insert(packets_by_object)
+        debugger_globals.debuggerSignals.timelinesUpdated.emit(updated)
+
+#######################################################################################################################
+
+
 # Separate thread which goal is to stop client threads
 class StopperThread(threading.Thread):
     def __init__(self, threads):
@@ -414,6 +638,7 @@ class DebugServer(QObject):
         self.stop(True)
         if port is not None and port != self.__address[1]:
             self.__address = (socket.gethostname(), port)
+        debugger_globals.timelines.clear()
         self.__openSocket()
 
     def stop(self, wait):
@@ -423,6 +648,9 @@ class DebugServer(QObject):
             self.__launched = False
             self.__sock.close()
             if self.__threads:
+                # client connections are persistent, so they must be closed to stop client threads
+                for c in self.__threads:
+                    c.stop()
                 if wait:
                     for c in self.__threads:
                         c.join()
@@ -479,9 +707,14 @@ class DebugServer(QObject):
                 client_address = c.addr.get_nowait()
                 print('info: Debug server: new connection from \'%s\' port %s' % client_address)
 
-            # Check if thread have finished client's data handling
+            # Check if client has closed connection (it must be checked before reading data
+            # because the thread puts the rest of data into the queue right before finishing)
+            finished = not c.is_alive()
             if c.received_data.empty():
-                break
+                if finished:
+                    c.join()
+                    endlist.append(c)
+                continue
 
             # Receive data from thread
             packets_by_object = dict()
@@ -499,33 +732,12 @@ class DebugServer(QObject):
                 except queue.Empty:
                     break
 
-            # Stop idle client thread
-            c.join()
-            endlist.append(c)
-
-            # Print debug information
-            if globals.debugMode:
-                msg = 'debug: Debug server: received '
-                if bytes_count >= 1024:
-                    kbytes_count = bytes_count / 1024
-                    if kbytes_count >= 1024:
-                        msg += '{0} Mb from '.format(kbytes_count / 1024)
-                    else:
-                        msg += '{0} Kb from '.format(kbytes_count)
-                else:
-                    msg += '{0} Bytes from '.format(bytes_count)
-                print(msg + '\'%s\' port %s' % client_address)
-                for object_uid in packets_by_object:
-                    for data in packets_by_object[object_uid]:
-                        current_time, messages = data
-                        text = 'object: {0}, time: {1}, data: '.format(object_uid, current_time)
-                        for d in messages:
-                            for m in messages[d]:
-                                text += m.text() + '; '
-                        print('debug: Debug server: received {0}'.format(text))
-                print('debug: ')
-
-            # TODO: do something with received data 'packets_by_object'
+            # Join finished client thread
+            if finished:
+                c.join()
+                endlist.append(c)
+
+            handleReceivedData(packets_by_object, bytes_count, client_address)
 
         # Remove stopped threads from client threads list
         if endlist:
@@ -131,8 +131,8 @@ class TL_CreateDialog(QDialog):
 
             if desc is not None:
                 newTree = treenode.TreeNode(self.project, None, desc.nodeClass, desc.nodeType, desc.debugByDefault, None)
-                newTree.libname = desc.libname
-                newTree.nodeName = desc.name
+                newTree.setLibName(desc.libname)
+                newTree.setNodeName(desc.name)
                 newTree.setPath(self.filename)
                 newTree.setRefName(self.__enterNameEdit.text())
                 newTree.reparseAttributes()
@@ -463,6 +463,7 @@ class TL_Tree(QTreeWidget):
                     reftxt = 'ссылается'
                 text += '<br/>{0} на \"<b>{1}</b>\".'.format(reftxt, shortname)
                 title = 'Список зависимых деревьев'
+            text += self.__cycleText(treename)
 
             item.setColor(Qt.yellow)
             item.setBold(True)
@@ -523,6 +524,7 @@ class TL_Tree(QTreeWidget):
                     text += '<br/>- \"<i><font color=\"YellowGreen\">{0}</font></i>\",'.format(strings[-1])
                 text = text.rstrip(',')
             text += '.'
+            text += self.__cycleText(treename)
 
             title = 'Dependencies list'
             if globalLanguage.language == Language.Russian:
@@ -558,6 +560,15 @@ class TL_Tree(QTreeWidget):
             self.mb.finished.connect(self.onMBClose)
             self.mb.show()
 
+    def __cycleText(self, treename):
+        cycle = self.__project.trees.getDependencyCycle(treename, self.__project.nodes)
+        if not cycle:
+            return ''
+        names = ' &rarr; '.join(['\"<i>{0}</i>\"'.format(d.split('/')[-1]) for d in cycle])
+        if globalLanguage.language == Language.Russian:
+            return '<br/><br/><font color=\"red\"><b>Циклическая зависимость</b></font>:<br/>{0}.'.format(names)
+        return '<br/><br/><font color=\"red\"><b>Cyclic dependency</b></font>:<br/>{0}.'.format(names)
+
     @QtCore.Slot(int)
     def onMBClose(self, result):
         for item in self.highlighted:
@@ -68,9 +68,12 @@ from treeview.dispregime import DisplayRegime
 from uuid import uuid1
 from zlib import crc32
 from random import randrange
+from collections import deque
+from operator import methodcaller
 
 from compat_2to3 import *
 import globals
+from indexedlist import IndexedList
 
 #######################################################################################################################
 #######################################################################################################################
@@ -101,9 +104,55 @@ else:
     print('')
 
 
+def _xmlElementsByTagName(xmlNode, tag):
+    """ Returns list of descendant xml-elements with specified tag.
+    Works both for xml.dom.minidom nodes and xml.etree.ElementTree elements. """
+    if hasattr(xmlNode, 'getElementsByTagName'):
+        return xmlNode.getElementsByTagName(tag)
+    return [element for element in xmlNode.iter(tag) if element is not xmlNode]
+
+
+def _xmlAttribute(xmlNode, name):
+    """ Returns value of xml-element attribute or None if there is no such attribute.
+    Works both for xml.dom.minidom nodes and xml.etree.ElementTree elements. """
+    if hasattr(xmlNode, 'hasAttribute'):
+        if xmlNode.hasAttribute(name):
+            return xmlNode.getAttribute(name)
+        return None
+    return xmlNode.get(name)
+
+
 def _createUid():
     return _crc32(str(uuid1(clock_seq=_randomInt())))
 
+
+# Children of TreeNode are kept in IndexedList by their uids (uid of node never changes)
+_childKey = methodcaller('uid')
+
+
+# Last revision number. It is increased on every change of any library contents and on every change of links
+# between tree nodes (parent-child relations, link targets, branch names), so cached data that depends
+# on them can be validated by comparing revision numbers.
+_lastRevision = [0]
+
+
+def _nextRevision():
+    _lastRevision[0] += 1
+    return _lastRevision[0]
+
+
+# Generation of libraries. It is increased on every change of any library contents and on every change of set of
+# project libraries, so descriptors cached by TreeNode and NodeAttr are validated by one comparison
+# (see TreeNode.nodeDesc and NodeAttr.nodeDesc).
+_librariesGeneration = [0]
+
+
+def librariesChanged():
+    """ Invalidates descriptors cached by all tree nodes and attributes.
+    Must be called after adding, removing or replacing libraries of a project (changes of library contents are
+    tracked by NodeLibrary.updateRevision). """
+    _librariesGeneration[0] += 1
+
 #######################################################################################################################
 
 
@@ -113,6 +162,7 @@ class NodeLibrary(object):
         self.libname = name
         self.libpath = ''
         self.list = {}
+        self.revision = _nextRevision()  # unique number of library contents; copies share it with the original
 
     # operator 'in':
     def __contains__(self, item):
@@ -142,6 +192,11 @@ class NodeLibrary(object):
     def name(self):
         return self.libname
 
+    def updateRevision(self):
+        """ Must be called after each modification of library contents (used by history to share unchanged copies). """
+        self.revision = _nextRevision()
+        librariesChanged()
+
     def insert(self, node, name=''):
         the_name = name
         if not the_name:
@@ -171,6 +226,7 @@ class NodeLibrary(object):
         lib.setPath(copy.deepcopy(self.libpath))
         for n in self.list:
             lib.list[n] = self.list[n].deepcopy()
+        lib.revision = self.revision
         return lib
 
 #######################################################################################################################
@@ -371,68 +427,105 @@ def uint2hex16(val):
 #######################################################################################################################
 
 
-def str2int(val):
+def _parseInt(val):
+    """ Converts text into int. Returns None if text can't be converted. """
     if not val:
         return 0
-    if 'x' in val:
-        try:
+    try:
+        if 'x' in val:
             return int(val, 16)
-        except ValueError:
-            print(u'error: can\'t convert \'{0}\' to int, return 0'.format(val))
-            return 0
-    if '.' in val or 'e' in val:
-        try:
+        if '.' in val or 'e' in val:
             return int(float(val))
-        except ValueError:
-            print(u'error: can\'t convert \'{0}\' to float, return 0'.format(val))
-            return 0
-    try:
         return int(val)
     except ValueError:
+        return None
+
+
+def str2int(val):
+    res = _parseInt(val)
+    if res is None:
         print(u'error: can\'t convert \'{0}\' to int, return 0'.format(val))
         return 0
+    return res
 
 #######################################################################################################################
 
 
-def str2long(val):
+def _parseLong(val):
+    """ Converts text into long. Returns None if text can't be converted. """
     if not val:
         return long(0)
-    if 'x' in val:
-        try:
+    try:
+        if 'x' in val:
             return long(val, 16)
-        except ValueError:
-            print(u'error: can\'t convert \'{0}\' to long, return 0'.format(val))
-            return long(0)
-    if '.' in val or 'e' in val:
-        try:
+        if '.' in val or 'e' in val:
             return long(float(val))
-        except ValueError:
-            print(u'error: can\'t convert \'{0}\' to float, return 0'.format(val))
-            return long(0)
-    try:
         return long(val)
     except ValueError:
+        return None
+
+
+def str2long(val):
+    res = _parseLong(val)
+    if res is None:
         print(u'error: can\'t convert \'{0}\' to long, return 0'.format(val))
         return long(0)
+    return res
 
 #######################################################################################################################
 
 
-def str2float(val):
+def _parseFloat(val):
+    """ Converts text into float. Returns None if text can't be converted. """
     if not val:
         return 0.0
-    if 'x' in val:
-        try:
-            return float(long(val, 16))
-        except ValueError:
-            print(u'error: can\'t convert \'{0}\' to long, return 0'.format(val))
-            return 0.0
     try:
+        if 'x' in val:
+            return float(long(val, 16))
         return float(val)
     except ValueError:
+        return None
+
+
+def str2float(val):
+    res = _parseFloat(val)
+    if res is None:
         print(u'error: can\'t convert \'{0}\' to float, return 0.0'.format(val))
         return 0.0
+    return res
+
+#######################################################################################################################
+
+
+def _arrayConverter(fastConv, parse, typename, default):
+    """ Returns function for conversion of list of texts into list of numbers.
+
+    Whole list is converted by *fastConv* (int, long or float) at once. If it fails (empty strings, hex or
+    exponential notation, wrong values in the list), values are converted one by one by *parse*,
+    wrong values are replaced by *default* and error is printed once for the whole list.
+    """
+    def convert(texts):
+        try:
+            return list(map(fastConv, texts))
+        except ValueError:
+            pass
+        values = []
+        errors = []
+        for text in texts:
+            val = parse(text)
+            if val is None:
+                errors.append(text)
+                val = default
+            values.append(val)
+        if errors:
+            print(u'error: can\'t convert {0} of {1} array values to {2} (first one is \'{3}\'), {4} is used instead'
+                  .format(len(errors), len(texts), typename, errors[0], default))
+        return values
+    return convert
+
+strs2int = _arrayConverter(int, _parseInt, 'int', 0)
+strs2long = _arrayConverter(long, _parseLong, 'long', long(0))
+strs2float = _arrayConverter(float, _parseFloat, 'float', 0.0)
 
 #######################################################################################################################
 
@@ -458,15 +551,20 @@ class AttrTypeData:
 
 
 class _TypeInfoEntry(object):
-    def __init__(self, classType, name, conv, rev1, rev2, default, enums, hints, minValue, maxValue):
+    def __init__(self, classType, name, conv, rev1, rev2, default, enums, hints, minValue, maxValue, arrayConv=None):
         self.classType = classType
         self.name = name
         self.converter = conv
+        if arrayConv is None:
+            self.arrayConverter = lambda texts: list(map(conv, texts))
+        else:
+            self.arrayConverter = arrayConv  # conversion of list of texts (see _arrayConverter)
         self.revConverter1 = rev1
         self.revConverter2 = rev2
         self.default = default
-        self.enums = enums
-        self.hints = hints
+        self.enums = enums  # shared by all descriptors of this type, must not be modified
+        self.enumsSet = frozenset(enums)
+        self.hints = hints  # shared by all descriptors of this type, must not be modified
         self.minValue = minValue
         self.maxValue = maxValue
 
@@ -485,24 +583,27 @@ TYPE_INFO = {
     'bool': _TypeInfoEntry(AttrTypeData.BOOL, 'bool', str2bool, bool2str, bool2str2, False, [True, False],
                            {'0': _hint('False'), '1': _hint('True')}, None, None),
     'char': _TypeInfoEntry(AttrTypeData.INT, 'char', str2int, unicode, unicode, int(0), [], {},
-                           int(-0x80), int(0x7f)),
+                           int(-0x80), int(0x7f), strs2int),
     'uchar': _TypeInfoEntry(AttrTypeData.INT, 'uchar', str2int, unicode, unicode, int(0), [], {},
-                            int(0), int(0xff)),
+                            int(0), int(0xff), strs2int),
     'short': _TypeInfoEntry(AttrTypeData.INT, 'short', str2int, unicode, unicode, int(0), [], {},
-                            int(-0x8000), int(0x7fff)),
+                            int(-0x8000), int(0x7fff), strs2int),
     'ushort': _TypeInfoEntry(AttrTypeData.INT, 'ushort', str2int, unicode, unicode, int(0), [], {},
-                             int(0), int(0xffff)),
+                             int(0), int(0xffff), strs2int),
     'int': _TypeInfoEntry(AttrTypeData.INT, 'int', str2int, unicode, unicode, int(0), [], {},
-                          int(-0x80000000), int(0x7fffffff)),
+                          int(-0x80000000), int(0x7fffffff), strs2int),
     'uint': _TypeInfoEntry(AttrTypeData.EXT, 'uint', str2long, unicode, unicode, long(0), [], {},
-                           long(0), long(0xffffffff)),
+                           long(0), long(0xffffffff), strs2long),
     'int64': _TypeInfoEntry(AttrTypeData.LONG, 'int64', str2long, unicode, unicode, long(0), [], {},
-                            long(-0x8000000000000000), long(0x7fffffffffffffff)),
+                            long(-0x8000000000000000), long(0x7fffffffffffffff), strs2long),
     'uint64': _TypeInfoEntry(AttrTypeData.CINT64, 'uint64', str2long, uint2hex16, uint2hex16, long(0), [],
-                             {}, long(0), long(0xffffffffffffffff)),
-    'long': _TypeInfoEntry(AttrTypeData.LONG, 'long', str2long, unicode, unicode, long(0), [], {}, None, None),
-    'float': _TypeInfoEntry(AttrTypeData.REAL, 'float', str2float, unicode, unicode, float(0.0), [], {}, None, None),
-    'double': _TypeInfoEntry(AttrTypeData.REAL, 'double', str2float, unicode, unicode, float(0.0), [], {}, None, None),
+                             {}, long(0), long(0xffffffffffffffff), strs2long),
+    'long': _TypeInfoEntry(AttrTypeData.LONG, 'long', str2long, unicode, unicode, long(0), [], {}, None, None,
+                           strs2long),
+    'float': _TypeInfoEntry(AttrTypeData.REAL, 'float', str2float, unicode, unicode, float(0.0), [], {}, None, None,
+                            strs2float),
+    'double': _TypeInfoEntry(AttrTypeData.REAL, 'double', str2float, unicode, unicode, float(0.0), [], {}, None, None,
+                             strs2float),
     'string': _TypeInfoEntry(AttrTypeData.STR, 'string', unicode, one2one, one2one, u'', [], {}, None, None),
     'text': _TypeInfoEntry(AttrTypeData.STR, 'text', unicode, one2one, one2one, u'', [], {}, None, None)
 }
@@ -594,6 +695,13 @@ ATTRIBUTE_TYPES = tuple(sorted(TYPE_INFO.keys()))
 
 
 class NodeAttrDesc(object):
+    """ Attribute descriptor.
+
+    Available values (enums) are kept as list (to keep their order) and as set (for fast validation of values).
+    Enums and hints tables are shared with type info (TYPE_INFO) and with copies of descriptor until they are
+    modified for the first time (see __ownEnums).
+    """
+
     __default_type_name = 'int'
 
     def __init__(self, name, valtype='', isArray=False):
@@ -604,8 +712,7 @@ class NodeAttrDesc(object):
         self.subtags = list(filter(bool, parts))
         self.__typedata = TYPE_INFO[self.__default_type_name]
         self.__defaultValue = self.__typedata.default
-        self.__enums = copy.deepcopy(self.__typedata.enums)
-        self.__hints = copy.deepcopy(self.__typedata.hints)
+        self.__resetEnums()
         self.__minValue = self.__typedata.minValue
         self.__maxValue = self.__typedata.maxValue
         self.__isArray = isArray
@@ -636,7 +743,9 @@ class NodeAttrDesc(object):
     def deepcopy(self):
         theCopy = NodeAttrDesc(copy.deepcopy(self.fullname), self.typeName(), bool(self.__isArray))
         theCopy.description = copy.deepcopy(self.description)
-        theCopy.setAvailableValues(self.__enums, self.__hints)
+        # enums tables are shared until one of descriptors modifies them
+        theCopy.__enums, theCopy.__enumsSet, theCopy.__hints = self.__enums, self.__enumsSet, self.__hints
+        theCopy.__sharedEnums = self.__sharedEnums = True
         theCopy.setMinActual(copy.deepcopy(self.__minValue))
         theCopy.setMaxActual(copy.deepcopy(self.__maxValue))
         theCopy.setActualDefaultValue(copy.deepcopy(self.__defaultValue))
@@ -680,10 +789,23 @@ class NodeAttrDesc(object):
             self.__minValue = self.__typedata.minValue
             self.__maxValue = self.__typedata.maxValue
             self.__defaultValue = self.__typedata.default
-            self.__enums = copy.deepcopy(self.__typedata.enums)
-            self.__hints = copy.deepcopy(self.__typedata.hints)
+            self.__resetEnums()
         return True
 
+    def __resetEnums(self):
+        self.__enums = self.__typedata.enums
+        self.__enumsSet = self.__typedata.enumsSet
+        self.__hints = self.__typedata.hints
+        self.__sharedEnums = True
+
+    def __ownEnums(self):
+        """ Must be called before every modification of enums or hints. """
+        if self.__sharedEnums:
+            self.__enums = list(self.__enums)
+            self.__enumsSet = set(self.__enumsSet)
+            self.__hints = dict(self.__hints)
+            self.__sharedEnums = False
+
     def isArray(self):
         return self.__isArray
 
@@ -730,7 +852,8 @@ class NodeAttrDesc(object):
         return True, displayText, hint, userText, isDefault
 
     def setHint(self, value, hint):
-        if value in self.__enums:
+        if value in self.__enumsSet:
+            self.__ownEnums()
             if value not in self.__hints:
                 userText = editorText = self.value2str2(value)
             else:
@@ -740,7 +863,8 @@ class NodeAttrDesc(object):
         return False
 
     def setText(self, value, displayText):
-        if value in self.__enums:
+        if value in self.__enumsSet:
+            self.__ownEnums()
             if value not in self.__hints:
                 hint = ''
             else:
@@ -756,8 +880,10 @@ class NodeAttrDesc(object):
 
     def appendAvailableValueText(self, text, displayText='', hint=''):
         val = self.str2value(text)
-        if val not in self.__enums:
+        self.__ownEnums()
+        if val not in self.__enumsSet:
             self.__enums.append(val)
+            self.__enumsSet.add(val)
             strValue2 = self.value2str2(val)
             if displayText:
                 editorText = u'{0} [{1}]'.format(displayText, strValue2)
@@ -773,8 +899,10 @@ class NodeAttrDesc(object):
         return False
 
     def appendAvailableValue(self, val, displayText='', hint=''):
-        if val not in self.__enums:
+        if val not in self.__enumsSet:
+            self.__ownEnums()
             self.__enums.append(val)
+            self.__enumsSet.add(val)
             strValue2 = self.value2str2(val)
             if displayText:
                 editorText = u'{0} [{1}]'.format(displayText, strValue2)
@@ -785,9 +913,13 @@ class NodeAttrDesc(object):
         return False
 
     def changeAvailableValue(self, oldOne, newOne):
-        if oldOne != newOne and oldOne in self.__enums and newOne not in self.__enums and oldOne not in self.__typedata.enums:
+        if oldOne != newOne and oldOne in self.__enumsSet and newOne not in self.__enumsSet and \
+                oldOne not in self.__typedata.enumsSet:
+            self.__ownEnums()
             index = self.__enums.index(oldOne)
             self.__enums[index] = newOne
+            self.__enumsSet.discard(oldOne)
+            self.__enumsSet.add(newOne)
             if oldOne in self.__hints:
                 self.__hints[newOne] = self.__hints[oldOne]
                 del self.__hints[oldOne]
@@ -798,9 +930,11 @@ class NodeAttrDesc(object):
         return False
 
     def removeAvailableValue(self, value):
-        if value not in self.__enums or value in self.__typedata.enums:
+        if value not in self.__enumsSet or value in self.__typedata.enumsSet:
             return False
+        self.__ownEnums()
         self.__enums.remove(value)
+        self.__enumsSet.discard(value)
         if value is self.__hints:
             del self.__hints[value]
         if value == self.__defaultValue:
@@ -808,8 +942,7 @@ class NodeAttrDesc(object):
         return True
 
     def clearAvailableValues(self):
-        self.__enums = copy.deepcopy(self.__typedata.enums)
-        self.__hints = copy.deepcopy(self.__typedata.hints)
+        self.__resetEnums()
 
     def setAvailableValuesByText(self, textVals):
         self.clearAvailableValues()
@@ -817,8 +950,10 @@ class NodeAttrDesc(object):
             self.appendAvailableValueText(val, text, hint)
 
     def setAvailableValues(self, vals, texts):
-        self.__enums = copy.deepcopy(vals)
-        self.__hints = copy.deepcopy(texts)
+        self.__enums = list(vals)
+        self.__enumsSet = set(vals)
+        self.__hints = dict(texts)
+        self.__sharedEnums = False
 
     def minValue(self):
         return self.__minValue
@@ -885,9 +1020,9 @@ class NodeAttrDesc(object):
         if val is None:
             return False
         if self.__enums:
-            return val in self.__enums
+            return val in self.__enumsSet
         if self.__typedata.enums:
-            return val in self.__typedata.enums
+            return val in self.__typedata.enumsSet
         if self.__minValue is not None:
             if val < self.__minValue:
                 return False
@@ -898,11 +1033,11 @@ class NodeAttrDesc(object):
 
     def validate(self, val):
         if self.__enums:
-            if val in self.__enums:
+            if val in self.__enumsSet:
                 return val
             return self.__defaultValue
         if self.__typedata.enums:
-            if val in self.__typedata.enums:
+            if val in self.__typedata.enumsSet:
                 return val
             return self.__defaultValue
         if self.__minValue is not None:
@@ -929,7 +1064,7 @@ class NodeAttrDesc(object):
 
     def str2value(self, text):
         if isinstance(text, list):
-            return list(map(self.__typedata.converter, text))
+            return self.__typedata.arrayConverter(text)
         return self.__typedata.converter(text)
 
     def update(self, attributes, currentKey):
@@ -1101,7 +1236,18 @@ class DynamicAttrDesc(object):
 
 
 class NodeAttr(object):
+    """ Attribute instance of TreeNode: attribute name, node's library name and node name (to find descriptor)
+    and value.
+
+    There are a lot of attributes (for every node of every tree and for every copy of node in undo history),
+    so NodeAttr has no __dict__ and it is not connected to any signals. If library node is renamed, new node name
+    is resolved through the project (see Project.renamedNodes) when descriptor is requested.
+    """
+
+    __slots__ = ('__project', '__nodename', '__libname', '__name', '__dynamicKey', '__value', '__descCache')
+
     def __init__(self, attrname, nodename, libname, project, key=None):
+        self.__descCache = None  # (libraries generation, TreeNodeDesc, DynamicAttrDesc), see __descriptors
         self.__project = project
         self.__nodename = nodename
         self.__libname = libname
@@ -1114,40 +1260,44 @@ class NodeAttr(object):
         else:
             self.__dynamicKey = key
         self.__value = self.__defVal()
-        globals.librarySignals.nodeRenamed.connect(self.__onNodeRename)
 
     def deepcopy(self):
-        theCopy = NodeAttr(copy.copy(self.__name), copy.copy(self.__nodename),\
-                           copy.copy(self.__libname), self.__project, copy.copy(self.__dynamicKey))
-        theCopy.setActualValueNoCheck(copy.deepcopy(self.__value))
+        # __init__ is not called: default value of a copy is not required
+        theCopy = NodeAttr.__new__(NodeAttr)
+        theCopy.__project = self.__project
+        theCopy.__nodename = self.__nodename
+        theCopy.__libname = self.__libname
+        theCopy.__name = self.__name
+        theCopy.__dynamicKey = self.__dynamicKey
+        theCopy.__descCache = self.__descCache
+        if isinstance(self.__value, list):
+            theCopy.__value = copy.deepcopy(self.__value)
+        else:
+            theCopy.__value = self.__value  # values of single attributes are immutable (numbers and strings)
         return theCopy
 
     def setName(self, name):
         self.__name = name
+        self.__descCache = None
 
-    def __onNodeRename(self, libname, oldname, newname):
-        if self.__libname == libname and self.__nodename == oldname:
-            self.__nodename = newname
+    def setNodeName(self, nodename):
+        self.__nodename = nodename
+        self.__descCache = None
 
     def isArray(self):
-        desc = self.nodeDesc()
+        desc = self.__descriptors()[2]
         if desc is not None:
-            return desc[self.__name].isArray()
+            return desc.isArray()
         return False
 
     def attrDesc(self):
-        desc = self.nodeDesc()
+        desc = self.__descriptors()[2]
         if desc is not None:
-            d = desc[self.__name]
-            if d is not None:
-                return d.get(self.__dynamicKey)
+            return desc.get(self.__dynamicKey)
         return None
 
     def attrDescActual(self):
-        desc = self.nodeDesc()
-        if desc is not None:
-            return desc[self.__name]
-        return None
+        return self.__descriptors()[2]
 
     def attrname(self):
         desc = self.attrDesc()
@@ -1156,10 +1306,31 @@ class NodeAttr(object):
         return ''
 
     def nodeDesc(self):
-        if self.__project is not None and self.__libname in self.__project.libraries and \
-                self.__nodename in self.__project.libraries[self.__libname]:
-            return self.__project.libraries[self.__libname][self.__nodename]
-        return None
+        return self.__descriptors()[1]
+
+    def __descriptors(self):
+        cache = self.__descCache
+        if cache is not None and cache[0] == _librariesGeneration[0]:
+            return cache
+        desc = self.__findNodeDesc()
+        if desc is not None:
+            cache = (_librariesGeneration[0], desc, desc[self.__name])
+        else:
+            cache = (_librariesGeneration[0], None, None)
+        self.__descCache = cache
+        return cache
+
+    def __findNodeDesc(self):
+        if self.__project is None or self.__libname not in self.__project.libraries:
+            return None
+        library = self.__project.libraries[self.__libname]
+        if self.__nodename not in library:
+            # library node could be renamed after this attribute had been created
+            nodename = self.__project.renamedNodes.get((self.__libname, self.__nodename))
+            if nodename is None or nodename not in library:
+                return None
+            self.__nodename = nodename
+        return library[self.__nodename]
 
     def setKey(self, key):
         self.__dynamicKey = key
@@ -1342,10 +1513,7 @@ class NodeAttr(object):
         return desc.defaultValue()
 
     def update(self, otherAttributes):
-        desc = self.nodeDesc()
-        if desc is None:
-            return
-        d = desc[self.__name]
+        d = self.__descriptors()[2]
         if d is None:
             return
         old = d.get(self.__dynamicKey)
@@ -1377,6 +1545,12 @@ class AutoposData(object):
         self.autopos = True  # flag of automatic calculating "shift"
         self.shift = QPointF()  # shift relative to parent node on visual diagram
 
+    def deepcopy(self):
+        theCopy = AutoposData.__new__(AutoposData)
+        theCopy.autopos = bool(self.autopos)
+        theCopy.shift = QPointF(self.shift)
+        return theCopy
+
 
 class DiagramInfo(object):
     def __init__(self):
@@ -1385,12 +1559,11 @@ class DiagramInfo(object):
         self.scenePos = QPointF()
 
     def deepcopy(self):
-        theCopy = DiagramInfo()
+        # __init__ is not called: default values would be replaced anyway
+        theCopy = DiagramInfo.__new__(DiagramInfo)
         theCopy.expanded = bool(self.expanded)
-        theCopy.autopositioning[DisplayRegime.Horizontal].autopos = bool(self.autopositioning[DisplayRegime.Horizontal].autopos)
-        theCopy.autopositioning[DisplayRegime.Horizontal].shift = QPointF(self.autopositioning[DisplayRegime.Horizontal].shift)
-        theCopy.autopositioning[DisplayRegime.Vertical].autopos = bool(self.autopositioning[DisplayRegime.Vertical].autopos)
-        theCopy.autopositioning[DisplayRegime.Vertical].shift = QPointF(self.autopositioning[DisplayRegime.Vertical].shift)
+        theCopy.autopositioning = {DisplayRegime.Horizontal: self.autopositioning[DisplayRegime.Horizontal].deepcopy(),
+                                   DisplayRegime.Vertical: self.autopositioning[DisplayRegime.Vertical].deepcopy()}
         theCopy.scenePos = QPointF(self.scenePos)
         return theCopy
 
@@ -1410,15 +1583,17 @@ class TreeNode(object):
         self.xml = xml_node     # reference to xml-node for repeat reading node attributes
 
         self.__attributes = dict()  # list of attributes
+        self.__sharedAttributes = False  # attributes are shared with copy (or original) of this node
         self.__children = dict()    # children list by classes. It's dict({'Task':[], 'Condition':[]})
         self.__inverse = False
 
         self.libname = ''   # the name of target node library ('ai_behavior_general' and so on...)
         self.nodeName = ''  # 'Sequence', 'Selector', 'Repeater', 'VoidTask', 'IF', ... (it is nodes from specified library)
-        self.nodeClass = nodeClass  # 'Task' or 'Condition' (or another class specified in current alphabet)
-        self.nodeType = nodeType    # 'Leaf', 'Decorator', 'Composite', 'Reference', ... (each class has some sub-types)
+        self.__nodeClass = nodeClass  # 'Task' or 'Condition' (or another class specified in current alphabet)
+        self.__nodeType = nodeType    # 'Leaf', 'Decorator', 'Composite', 'Reference', ... (each class has some sub-types)
 
-        self.target = ''  # if current nodeType is link, then 'target' points to another node in current tree
+        self.__target = ''  # if current nodeType is link, then 'target' points to another node in current tree
+        self.__descCache = None  # (libraries generation, TreeNodeDesc or None), see nodeDesc
 
         self.parentNode = None  # reference to parent TreeNode
 
@@ -1446,6 +1621,41 @@ class TreeNode(object):
     def uid(self):
         return self.__uid
 
+    # nodeClass, nodeType and target are properties because changing them changes links between branches
+    # (see BehaviorTree.getDependantsOf)
+
+    @property
+    def nodeClass(self):
+        return self.__nodeClass
+
+    @nodeClass.setter
+    def nodeClass(self, className):
+        if className != self.__nodeClass:
+            self.__nodeClass = className
+            self.__descCache = None
+            _nextRevision()
+
+    @property
+    def nodeType(self):
+        return self.__nodeType
+
+    @nodeType.setter
+    def nodeType(self, typeName):
+        if typeName != self.__nodeType:
+            self.__nodeType = typeName
+            self.__descCache = None
+            _nextRevision()
+
+    @property
+    def target(self):
+        return self.__target
+
+    @target.setter
+    def target(self, target):
+        if target != self.__target:
+            self.__target = target
+            _nextRevision()
+
     def parent(self):
         """ Returns parent node of this node. """
         return self.parentNode
@@ -1460,7 +1670,9 @@ class TreeNode(object):
         return parent
 
     def setParent(self, parent):
-        self.parentNode = parent
+        if parent is not self.parentNode:
+            self.parentNode = parent
+            _nextRevision()
 
     def cls(self):
         if self.Project is not None:
@@ -1494,25 +1706,39 @@ class TreeNode(object):
         return self.__path
 
     def setPath(self, path):
-        self.__path = path
+        if path != self.__path:
+            self.__path = path
+            _nextRevision()
 
     def refname(self):
         return self.__refname
 
     def setRefName(self, ref):
-        self.__refname = ref
+        if ref != self.__refname:
+            self.__refname = ref
+            _nextRevision()
 
     def setXmlSource(self, xml_node):
         self.xml = xml_node
 
     def setProject(self, project):
         self.Project = project
+        self.__descCache = None
 
     def setLibName(self, libname):
-        self.libname = libname
+        if libname != self.libname:
+            self.libname = libname
+            self.__updateIndex()
 
     def setNodeName(self, name):
-        self.nodeName = name
+        if name != self.nodeName:
+            self.nodeName = name
+            self.__updateIndex()
+
+    def __updateIndex(self):
+        self.__descCache = None
+        if self.Project is not None:
+            self.Project.nodes.updateIndex(self)
 
     def setNodeClass(self, className):
         self.nodeClass = className
@@ -1525,7 +1751,10 @@ class TreeNode(object):
 
     def rename(self, libname, oldname, newname, recursive):
         if self.libname == libname and self.nodeName == oldname:
-            self.nodeName = newname
+            self.setNodeName(newname)
+            self.__ownAttributes()
+            for attr in self.__attributes.values():
+                attr.setNodeName(newname)
         if recursive:
             for cls in self.__children:
                 for child in self.__children[cls]:
@@ -1533,6 +1762,7 @@ class TreeNode(object):
 
     def renameAttribute(self, libname, nodename, oldname, newname, recursive):
         if self.libname == libname and nodename == self.nodeName and oldname in self.__attributes:
+            self.__ownAttributes()
             attr = self.__attributes[oldname]
             del self.__attributes[oldname]
             attr.setName(newname)
@@ -1545,6 +1775,7 @@ class TreeNode(object):
     def addAttribute(self, libname, nodename, attributeName, recursive):
         if libname == self.libname and nodename == self.nodeName:
             if attributeName not in self.__attributes:
+                self.__ownAttributes()
                 self.__attributes[attributeName] = NodeAttr(attributeName, self.nodeName, self.libname, self.Project)
         if recursive:
             for cls in self.__children:
@@ -1554,6 +1785,7 @@ class TreeNode(object):
     def deleteAttribute(self, libname, nodename, attributeName, recursive):
         if libname == self.libname and nodename == self.nodeName:
             if attributeName in self.__attributes:
+                self.__ownAttributes()
                 del self.__attributes[attributeName]
         if recursive:
             for cls in self.__children:
@@ -1563,6 +1795,7 @@ class TreeNode(object):
     def validateAttribute(self, libname, nodename, attributeName, attributeOldDescriptor, recursive):
         if libname == self.libname and nodename == self.nodeName:
             if attributeName in self.__attributes:
+                self.__ownAttributes()
                 old_value_text = attributeOldDescriptor.value2str(self.__attributes[attributeName].value())
                 self.__attributes[attributeName].setValue(old_value_text)
         if recursive:
@@ -1585,6 +1818,14 @@ class TreeNode(object):
         self.__inverse = bool(inv)
 
     def nodeDesc(self):
+        cache = self.__descCache
+        if cache is not None and cache[0] == _librariesGeneration[0]:
+            return cache[1]
+        desc = self.__findNodeDesc()
+        self.__descCache = (_librariesGeneration[0], desc)
+        return desc
+
+    def __findNodeDesc(self):
         desc = None
         if self.Project is not None and self.libname in self.Project.libraries:
             desc = self.Project.libraries[self.libname][self.nodeName]
@@ -1596,14 +1837,26 @@ class TreeNode(object):
         return self.type() is None
 
     def attributes(self):
+        """ Returns dict of attributes {name: NodeAttr}. It must not be modified: attributes can be shared with copies
+        of this node (see deepcopy). Use setAttributes to change attributes. """
         return self.__attributes
 
+    def __ownAttributes(self):
+        """ Must be called before every modification of attributes. """
+        if self.__sharedAttributes:
+            self.__attributes = self.getAttributesCopy()
+            self.__sharedAttributes = False
+
     def getAttributesCopy(self):
         attr = dict()
         for a in self.__attributes:
             attr[a] = self.__attributes[a].deepcopy()
         return attr
 
+    def _setAttributes(self, attr):
+        self.__attributes = attr
+        self.__sharedAttributes = False
+
     def setAttributes(self, attr):
         ok = False
         if attr:
@@ -1612,7 +1865,8 @@ class TreeNode(object):
                     ok = True
                 break
         if ok:
-            self.__attributes.clear()
+            self.__attributes = dict()
+            self.__sharedAttributes = False
             for a in attr:
                 self.__attributes[a] = attr[a].deepcopy()
 
@@ -1629,7 +1883,7 @@ class TreeNode(object):
     def addChild(self, child, before=None, silent=False):
         classname = child.cls().name
         if classname not in self.__children:
-            self.__children[classname] = []
+            self.__children[classname] = IndexedList(key=_childKey)
             permit = True
         elif child not in self.__children[classname]:
             permit = True
@@ -1653,6 +1907,7 @@ class TreeNode(object):
                 self.__children[classname].append(child)
             else:
                 self.__children[classname].insert(before, child)
+            _nextRevision()
             if not silent and globals.project is not None:
                 globals.project.modified = True
                 globals.project.trees.removeDisconnectedNodes(None, child.uid())
@@ -1667,6 +1922,7 @@ class TreeNode(object):
                     globals.historySignals.pushState.emit(u'Remove {0}'.format(child.getMessage()))
                 child.setParent(None)
                 self.__children[classname].remove(child)
+                _nextRevision()
                 if not permanent:
                     root = self.root()
                     treeName = root.fullRefName()
@@ -1703,12 +1959,17 @@ class TreeNode(object):
                 if not silent:
                     globals.historySignals.pushState.emit(u'Swap {0} WITH {1}'.format(children[i].getMessage(),
                                                                                       children[j].getMessage()))
-                children[i], children[j] = children[j], children[i]
+                children.swap(i, j)
+                _nextRevision()
                 globals.project.modified = True
 
     def allChildren(self):
         return self.__children
 
+    def _setChildren(self, children):
+        self.__children = dict([(cls, IndexedList(children[cls], _childKey)) for cls in children])
+        _nextRevision()
+
     def getUsedLibraries(self):
         libraries = []
         if self.libname:
@@ -1722,7 +1983,8 @@ class TreeNode(object):
         return libraries
 
     def reparseAttributes(self, xml_required=False):
-        self.__attributes.clear()
+        self.__attributes = dict()
+        self.__sharedAttributes = False
         desc = self.nodeDesc()
         if desc is None:
             self_type = self.type()
@@ -1750,7 +2012,7 @@ class TreeNode(object):
             print(u'WARNING: class \"{0}\" have no attributes.'.format(self.nodeClass))
             return True
 
-        attributesTags = self.xml.getElementsByTagName(self.cls().attributes.tag)
+        attributesTags = _xmlElementsByTagName(self.xml, self.cls().attributes.tag)
         if not attributesTags:
             if self.cls().attributes.obligatory:
                 print(u'ERROR: Attributes tag <{0}> is missing for node \"{1}\"!'
@@ -1792,23 +2054,24 @@ class TreeNode(object):
                 data = []
                 # поиск тэгов в xml, последний тэг - это и есть массив
                 for subtag in attrDesc.subtags:
-                    data = cur.getElementsByTagName(subtag)
+                    data = _xmlElementsByTagName(cur, subtag)
                     if not data:
                         return True  # данные не заданы
                     cur = data[0]
-                for d in data:
-                    if d.hasAttribute(attrDesc.attrname):
-                        val = d.getAttribute(attrDesc.attrname)
-                        attr.appendValue(val)
+                # all values of array are converted at once
+                values = [_xmlAttribute(d, attrDesc.attrname) for d in data]
+                values = [val for val in values if val is not None]
+                if values:
+                    attr.setValue(values)
             else:
                 # поиск тэгов в xml, последний тэг должен содержать необходимые атрибуты
                 for subtag in attrDesc.subtags:
-                    data = cur.getElementsByTagName(subtag)
+                    data = _xmlElementsByTagName(cur, subtag)
                     if not data:
                         return True  # данные не заданы
                     cur = data[0]  # не массив, поэтому запоминаем только первый инстанс тэга в списке
-                if cur.hasAttribute(attrDesc.attrname):
-                    val = cur.getAttribute(attrDesc.attrname)
+                val = _xmlAttribute(cur, attrDesc.attrname)
+                if val is not None:
                     attr.setValue(val)
 
         for atr in dynamicAttributes:
@@ -1828,23 +2091,24 @@ class TreeNode(object):
                 data = []
                 # поиск тэгов в xml, последний тэг - это и есть массив
                 for subtag in attrDesc.subtags:
-                    data = cur.getElementsByTagName(subtag)
+                    data = _xmlElementsByTagName(cur, subtag)
                     if not data:
                         return True  # данные не заданы
                     cur = data[0]
-                for d in data:
-                    if d.hasAttribute(attrDesc.attrname):
-                        val = d.getAttribute(attrDesc.attrname)
-                        attr.appendValue(val)
+                # all values of array are converted at once
+                values = [_xmlAttribute(d, attrDesc.attrname) for d in data]
+                values = [val for val in values if val is not None]
+                if values:
+                    attr.setValue(values)
             else:
                 # поиск тэгов в xml, последний тэг должен содержать необходимые атрибуты
                 for subtag in attrDesc.subtags:
-                    data = cur.getElementsByTagName(subtag)
+                    data = _xmlElementsByTagName(cur, subtag)
                     if not data:
                         return True  # данные не заданы
                     cur = data[0]  # не массив, поэтому запоминаем только первый инстанс тэга в списке
-                if cur.hasAttribute(attrDesc.attrname):
-                    val = cur.getAttribute(attrDesc.attrname)
+                val = _xmlAttribute(cur, attrDesc.attrname)
+                if val is not None:
                     attr.setValue(val)
 
         return True
@@ -1880,35 +2144,48 @@ class TreeNode(object):
         """ Make deep copy of the tree-node.
         _undoRedo - points if deepcopy method was called by undo-redo system
         _removeRefnames - points if you need to remove tree reference (TreeNode.refname)
-        """
-
-        if _undoRedo:
-            uid = copy.copy(self.__uid)
-            xmlnode = self.xml
-        else:
-            xmlnode = None
-            uid = None
-
-        theCopy = TreeNode(self.Project, xmlnode, copy.copy(self.nodeClass), copy.copy(self.nodeType), bool(self.debug), uid)
-        theCopy.setSingleblock(self.singleblock)
-        theCopy.setLibName(copy.copy(self.libname))
-        theCopy.setNodeName(copy.copy(self.nodeName))
-        theCopy.setPath(copy.copy(self.__path))
-        theCopy.setRefName(copy.copy(self.__refname))
-        theCopy.target = copy.copy(self.target)
-        theCopy.setInverse(self.__inverse)
-        theCopy.diagramInfo = self.diagramInfo.deepcopy()
 
-        theCopy.__attributes = self.getAttributesCopy()
+        Copied nodes share attributes with original nodes until attributes of any of them are modified
+        (copy-on-write, see __ownAttributes). Children are copied iteratively, without recursion.
+        """
 
-        for cls in self.__children:
-            children = self.__children[cls]
-            for child in children:
-                theCopy.addChild(child.deepcopy(_undoRedo, _removeRefnames), silent=True)
+        theCopy = self.__copyNode(_undoRedo, _removeRefnames)
+        stack = [(self, theCopy)]
+        while stack:
+            node, nodeCopy = stack.pop()
+            for cls in node.__children:
+                children = node.__children[cls]
+                if not children:
+                    continue
+                childrenCopy = IndexedList(key=_childKey)
+                for child in children:
+                    childCopy = child.__copyNode(_undoRedo, _removeRefnames)
+                    childCopy.parentNode = nodeCopy
+                    childrenCopy.append(childCopy)
+                    stack.append((child, childCopy))
+                nodeCopy.__children[cls] = childrenCopy
 
-        if _removeRefnames:
-            theCopy.setRefName('')
+        _nextRevision()
+        return theCopy
 
+    def __copyNode(self, undoRedo, removeRefname):
+        """ Returns copy of this node without children. """
+        if undoRedo:
+            theCopy = TreeNode(self.Project, self.xml, self.__nodeClass, self.__nodeType, bool(self.debug), self.__uid)
+        else:
+            theCopy = TreeNode(self.Project, None, self.__nodeClass, self.__nodeType, bool(self.debug), None)
+        theCopy.singleblock = self.singleblock
+        theCopy.libname = self.libname
+        theCopy.nodeName = self.nodeName
+        theCopy.__path = self.__path
+        if not removeRefname:
+            theCopy.__refname = self.__refname
+        theCopy.__target = self.__target
+        theCopy.__inverse = self.__inverse
+        theCopy.__descCache = self.__descCache
+        theCopy.diagramInfo = self.diagramInfo.deepcopy()
+        theCopy.__attributes = self.__attributes
+        theCopy.__sharedAttributes = self.__sharedAttributes = True
         return theCopy
 
 #######################################################################################################################
@@ -1918,6 +2195,9 @@ class TreeNode(object):
 class TreeNodes(object):
     def __init__(self):
         self.__nodes = dict()
+        self.__keys = dict()  # {uid: (libname, nodename)} - key under which node is stored in self.__usages
+        self.__usages = dict()  # {(libname, nodename): set of uids} - nodes using each library node
+        self.__libraries = dict()  # {libname: set of uids} - nodes using each library
 
     def __contains__(self, item):
         if item is None:
@@ -1943,6 +2223,9 @@ class TreeNodes(object):
 
     def clear(self):
         self.__nodes.clear()
+        self.__keys.clear()
+        self.__usages.clear()
+        self.__libraries.clear()
 
     def get(self, item):
         """ Returns node by it's uid. If there is no node with specified uid, returns 'None'. """
@@ -1950,19 +2233,24 @@ class TreeNodes(object):
 
     def add(self, node, recursive=False):
         """ Stores node's uid in list. If 'recursive' is True then also stores all node's children. """
-        if globals.debugMode and node.uid() in self.__nodes:
-            print(u'warning: node with uid = {0} already exist and will be replaced!'.format(node.uid()))
-        self.__nodes[node.uid()] = node
-        if recursive:
-            classes = node.allChildren()
-            for c in classes:
-                children = classes[c]
-                for child in children:
-                    self.add(child, recursive=True)
+        nodes = [node]
+        while nodes:
+            node = nodes.pop()
+            uid = node.uid()
+            if globals.debugMode and uid in self.__nodes:
+                print(u'warning: node with uid = {0} already exist and will be replaced!'.format(uid))
+            self.__nodes[uid] = node
+            self.__unindex(uid)
+            self.__index(node)
+            if recursive:
+                classes = node.allChildren()
+                for c in classes:
+                    nodes.extend(classes[c])
 
     def remove(self, node, recursive=False):
         """ Pops node from list. If 'recursive' is True then also pops all node's children. """
         self.__nodes.pop(node.uid(), node)
+        self.__unindex(node.uid())
         if recursive:
             classes = node.allChildren()
             for c in classes:
@@ -1982,14 +2270,63 @@ class TreeNodes(object):
         self.add(node, recursive=True)
         return node
 
+    def updateIndex(self, node):
+        """ Must be called after library name or node name of the node has been changed. """
+        uid = node.uid()
+        if self.__nodes.get(uid) is node:
+            self.__unindex(uid)
+            self.__index(node)
+
+    def uidsOf(self, libname, nodename):
+        """ Returns list of uids of nodes using node 'nodename' from library 'libname'. """
+        return list(self.__usages.get((libname, nodename), ()))
+
+    def uidsOfLibrary(self, libname):
+        """ Returns list of uids of nodes using library 'libname'. """
+        return list(self.__libraries.get(libname, ()))
+
+    def __index(self, node):
+        uid = node.uid()
+        key = (node.libname, node.nodeName)
+        self.__keys[uid] = key
+        if key in self.__usages:
+            self.__usages[key].add(uid)
+        else:
+            self.__usages[key] = set([uid])
+        if key[0] in self.__libraries:
+            self.__libraries[key[0]].add(uid)
+        else:
+            self.__libraries[key[0]] = set([uid])
+
+    def __unindex(self, uid):
+        key = self.__keys.pop(uid, None)
+        if key is None:
+            return
+        uids = self.__usages[key]
+        uids.discard(uid)
+        if not uids:
+            del self.__usages[key]
+        uids = self.__libraries[key[0]]
+        uids.discard(uid)
+        if not uids:
+            del self.__libraries[key[0]]
+
 #######################################################################################################################
 #######################################################################################################################
 
 
+def _librariesRevision():
+    if globals.project is None:
+        return None
+    libraries = globals.project.libraries
+    return tuple(sorted(libraries[libname].revision for libname in libraries))
+
+
 class BehaviorTree(object):
     def __init__(self):
         self.__branches = dict()
         self.__disconnectedNodes = dict()
+        self.__graph = None  # cached links between branches (see BehaviorTree.__linksGraph)
 
     def __contains__(self, item):
         return self.__branches.__contains__(item)
@@ -2027,6 +2364,7 @@ class BehaviorTree(object):
                 globals.historySignals.pushState.emit(u'Add/replace behavior tree \'{0}\''.format(branch.refname()))
             self.__branches[fullname] = branch.uid()
             self.__disconnectedNodes[fullname] = []
+            self.__graph = None
             if not silent and globals.project is not None:
                 globals.project.modified = True
             return True
@@ -2047,6 +2385,7 @@ class BehaviorTree(object):
             self.removeDisconnectedNodes(fullname, self.__branches[fullname])
             del self.__branches[fullname]
             del self.__disconnectedNodes[fullname]
+            self.__graph = None
             if not silent:
                 globals.project.modified = True
             globals.behaviorTreeSignals.treeDeleted.emit(fullname)
@@ -2080,6 +2419,7 @@ class BehaviorTree(object):
 
         del self.__branches[oldname]
         del self.__disconnectedNodes[oldname]
+        self.__graph = None
 
         for b in self.__branches:
             branch_uid = self.__branches[b]
@@ -2104,9 +2444,12 @@ class BehaviorTree(object):
 
     def _setBranches(self, branches):
         self.__branches = dict(branches)
+        self.__graph = None
 
     def _setDisconnectedNodes(self, nodesUids):
-        self.__disconnectedNodes = dict(nodesUids)
+        self.__disconnectedNodes = dict()
+        for k, v in dict_items(nodesUids.items()):
+            self.__disconnectedNodes[k] = list(v)
 
     def removeDisconnectedNodes(self, fullname, nodesUids):
         if fullname is not None:
@@ -2210,48 +2553,144 @@ class BehaviorTree(object):
 
     # Returns branches who are using node with name == 'nodeName'
     def getBranchesByNode(self, libraryName, nodeName, projectNodes):
-        branches = dict()
-        for t in self.__branches:
-            uid = self.__branches[t]
-            if uid in projectNodes:
-                node = projectNodes[uid]
-                if (libraryName, nodeName) in node:
-                    branches[t] = node
-        return branches
+        return self.__getBranchesByUids(projectNodes.uidsOf(libraryName, nodeName), projectNodes)
 
     # Returns branches who are using library with name == 'libraryName'
     def getBranchesByLibrary(self, libraryName, projectNodes):
+        return self.__getBranchesByUids(projectNodes.uidsOfLibrary(libraryName), projectNodes)
+
+    def __getBranchesByUids(self, uids, projectNodes):
+        """ Returns dict {fullname: branch} of branches containing any of nodes with specified uids. """
         branches = dict()
-        for t in self.__branches:
-            uid = self.__branches[t]
-            if uid in projectNodes:
-                node = projectNodes[uid]
-                libs = node.getUsedLibraries()
-                if libraryName in libs:
-                    branches[t] = node
+        visited = set()
+        for uid in uids:
+            node = projectNodes.get(uid)
+            while node is not None and node.uid() not in visited:
+                visited.add(node.uid())
+                if node.refname():
+                    fullname = node.fullRefName()
+                    if self.__branches.get(fullname) == node.uid():
+                        branches[fullname] = node
+                node = node.parent()
         return branches
 
     # Get branch dependancies
     def getDependantsOf(self, fullname, projectNodes):
         uid = self.get(fullname)
         if uid is not None and uid in projectNodes:
-            return self.__getDependantsOf(projectNodes[uid])
+            return list(self.__linksGraph(projectNodes)[0].get(fullname, []))
         return []
 
     # Get list of branches who depends on this branch
     def whoDependsOn(self, fullname, projectNodes):
-        dependands = []
         uid = self.get(fullname)
         if uid is not None and uid in projectNodes:
-            for br in self.__branches:
-                if br == fullname:
-                    continue
-                curr_uid = self.__branches[br]
-                if curr_uid in projectNodes:
-                    curr = projectNodes[curr_uid]
-                    if curr.dependsOn(fullname):
-                        dependands.append(br)
-        return dependands
+            return list(self.__linksGraph(projectNodes)[1].get(fullname, []))
+        return []
+
+    def getDependencyCycle(self, fullname, projectNodes):
+        """ Returns shortest list of branches [fullname, ..., fullname] where each branch depends on the next one,
+        or empty list if branch 'fullname' does not depend on itself. """
+        dependencies = self.__linksGraph(projectNodes)[0]
+        previous = {fullname: None}
+        queue = deque([fullname])
+        while queue:
+            current = queue.popleft()
+            for d in dependencies.get(current, []):
+                if d == fullname:
+                    cycle = [fullname]
+                    while current is not None:
+                        cycle.append(current)
+                        current = previous[current]
+                    cycle.reverse()
+                    return cycle
+                if d not in previous:
+                    previous[d] = current
+                    queue.append(d)
+        return []
+
+    def sortByDependencies(self, fullnames, projectNodes):
+        """ Returns list of branches 'fullnames' sorted in order of saving: each branch goes after branches from
+        'fullnames' it depends on, and branches are sorted by name where it's possible.
+        Branches with cyclic dependencies are placed at the end of the list. """
+        dependencies = self.__linksGraph(projectNodes)[0]
+        names = set(fullnames)
+        levels = dict()
+        for fullname in names:
+            self.__dependencyLevel(fullname, names, dependencies, levels)
+        ordered = sorted((levels[fullname], fullname) for fullname in names if levels[fullname] is not None)
+        result = [fullname for _, fullname in ordered]
+        cyclic = sorted(fullname for fullname in names if levels[fullname] is None)
+        if cyclic:
+            print('warning: Branches {0} have cyclic dependencies.'.format(', '.join(cyclic)))
+            result.extend(cyclic)
+        return result
+
+    @staticmethod
+    def __dependencyLevel(fullname, names, dependencies, levels):
+        """ Returns number of sorting pass when branch 'fullname' can be added to the sorted list
+        (branches are checked by name on each pass) or None if branch depends on a cycle. """
+        if fullname in levels:
+            level = levels[fullname]
+            if level is not None and level < 0:
+                return None  # branch is being visited now, so there is a cycle
+            return level
+        levels[fullname] = -1
+        level = 0
+        for d in dependencies.get(fullname, []):
+            if d == fullname or d not in names:
+                continue
+            dependencyLevel = BehaviorTree.__dependencyLevel(d, names, dependencies, levels)
+            if dependencyLevel is None:
+                level = None
+                break
+            if d > fullname:
+                dependencyLevel += 1  # dependency would be added after this branch on the same pass
+            level = max(level, dependencyLevel)
+        levels[fullname] = level
+        return level
+
+    def __linksGraph(self, projectNodes):
+        """ Returns tuple of dicts (dependencies, dependants):
+        dependencies - {fullname: list of branches referenced by this branch (see BehaviorTree.__getDependantsOf)},
+        dependants - {fullname: list of branches having links to this branch (see TreeNode.dependsOn)}.
+        Graph is cached and rebuilt only after changes of tree nodes links or libraries. """
+        revision = (_lastRevision[0], _librariesRevision())
+        if self.__graph is not None and self.__graph[0] is projectNodes and self.__graph[1] == revision:
+            return self.__graph[2]
+
+        dependencies = dict()
+        dependants = dict()
+        for br in self.__branches:
+            branch = projectNodes.get(self.__branches[br])
+            if branch is None:
+                continue
+            dependencies[br] = self.__getDependantsOf(branch)
+            for target in self.__getLinkTargets(branch):
+                if target != br:
+                    if target not in dependants:
+                        dependants[target] = [br]
+                    else:
+                        dependants[target].append(br)
+
+        graph = (dependencies, dependants)
+        self.__graph = (projectNodes, revision, graph)
+        return graph
+
+    @staticmethod
+    def __getLinkTargets(branch):
+        targets = set()
+        nodes = [branch]
+        while nodes:
+            node = nodes.pop()
+            nodeType = node.type()
+            if nodeType is not None and nodeType.isLink():
+                targets.add(node.target)
+                continue
+            children = node.allChildren()
+            for c in children:
+                nodes.extend(children[c])
+        return targets
 
     def empty(self):
         return not self.__branches
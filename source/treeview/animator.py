@@ -0,0 +1,88 @@
+# coding=utf-8
+# -----------------
+# file      : animator.py
+# date      : 2026/10/18
+# author    : Victor Zarubkin
+# contact   : victor.zarubkin@gmail.com
+# copyright : Copyright (C) 2026  Victor Zarubkin
+# license   : This file is part of BehaviorStudio.
+#           :
+#           : BehaviorStudio is free software: you can redistribute it and/or modify
+#           : it under the terms of the GNU General Public License as published by
+#           : the Free Software Foundation, either version 3 of the License, or
+#           : (at your option) any later version.
+#           :
+#           : BehaviorStudio is distributed in the hope that it will be useful,
+#           : but WITHOUT ANY WARRANTY; without even the implied warranty of
+#           : MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#           : GNU General Public License for more details.
+#           :
+#           : You should have received a copy of the GNU General Public License
+#           : along with BehaviorStudio. If not, see <http://www.gnu.org/licenses/>.
+#           :
+#           : A copy of the GNU General Public License can be found in file COPYING.
+############################################################################
+
+""" Animation of diagram items movement.
+
+All moving items of one scene are moved by one timer (instead of one timer for each item).
+"""
+
+from __future__ import unicode_literals
+
+__author__ = 'Victor Zarubkin'
+__copyright__ = 'Copyright (C) 2026  Victor Zarubkin'
+__credits__ = ['Victor Zarubkin']
+__license__ = ['GPLv3']
+__version__ = '1.3.0'  # this is last application version when this script file was changed
+__email__ = 'victor.zarubkin@gmail.com'
+############################################################################
+
+from PySide import QtCore
+from PySide.QtCore import *
+
+#######################################################################################################################
+#######################################################################################################################
+
+
+class ItemsAnimator(QObject):
+    """ Calls method updatePosition() of every animated item on each timer tick.
+    updatePosition() must return False when item has reached it's required position. """
+
+    def __init__(self, interval):
+        QObject.__init__(self)
+        self.__interval = interval  # milliseconds
+        self.__items = dict()  # {id(item): item}
+        self.__timer = QTimer()
+        self.__timer.timeout.connect(self.__onTimeout)
+
+    def __len__(self):
+        return len(self.__items)
+
+    def start(self, item):
+        """ Start moving *item*. It is moved until it reaches required position or until stop() is called. """
+        self.__items[id(item)] = item
+        if not self.__timer.isActive():
+            self.__timer.start(self.__interval)
+
+    def stop(self, item):
+        self.__items.pop(id(item), None)
+
+    def isMoving(self, item):
+        return id(item) in self.__items
+
+    def clear(self):
+        self.__items.clear()
+        self.__timer.stop()
+
+    @QtCore.Slot()
+    def __onTimeout(self):
+        # items can be added or removed by updatePosition(), so list of items is copied
+        for key, item in list(self.__items.items()):
+            if key in self.__items and not item.updatePosition():
+                self.__items.pop(key, None)
+        if not self.__items:
+            self.__timer.stop()
+
+#######################################################################################################################
+#######################################################################################################################
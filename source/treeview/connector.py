@@ -40,6 +40,7 @@ from PySide.QtGui import *
 from PySide.QtCore import *
 
 from .dispregime import DisplayRegime
+from .detail import DetailLevel, detailLevel
 from .colors import DiagramColor
 
 import globals
@@ -94,8 +95,16 @@ class ConnectorType(object):
         return not self.__eq__(other)
 
 
+class _HighlightEffect(QGraphicsDropShadowEffect):
+    def draw(self, painter):
+        if detailLevel(painter) == DetailLevel.Full:
+            QGraphicsDropShadowEffect.draw(self, painter)
+        else:
+            self.drawSource(painter)
+
+
 def _createHighlight(color):
-    effect = QGraphicsDropShadowEffect()
+    effect = _HighlightEffect()
     effect.setColor(color)
     effect.setOffset(0, 0)
     effect.setBlurRadius(15)
@@ -215,6 +224,11 @@ class Connector(QGraphicsLineItem):
     def paint(self, painter, option, widget):
         if self.isVisible() and not self.startItem.collidesWithItem(
                 self.endItem) and self.startItem.isVisible() and self.endItem.isVisible():
+            if detailLevel(painter) != DetailLevel.Full:
+                # straight line without antialiasing is enough for small scale
+                painter.setPen(self.pen())
+                painter.drawLine(self.__beginPoint, self.__endPoint)
+                return
             if self.lineType == ConnectorType.Curve or self.lineType == ConnectorType.Line:
                 painter.setRenderHint(QPainter.Antialiasing)
             painter.setPen(self.pen())
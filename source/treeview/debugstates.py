@@ -0,0 +1,141 @@
+# coding=utf-8
+# -----------------
+# file      : debugstates.py
+# date      : 2026/10/18
+# author    : Victor Zarubkin
+# contact   : victor.zarubkin@gmail.com
+# copyright : Copyright (C) 2026  Victor Zarubkin
+# license   : This file is part of BehaviorStudio.
+#           :
+#           : BehaviorStudio is free software: you can redistribute it and/or modify
+#           : it under the terms of the GNU General Public License as published by
+#           : the Free Software Foundation, either version 3 of the License, or
+#           : (at your option) any later version.
+#           :
+#           : BehaviorStudio is distributed in the hope that it will be useful,
+#           : but WITHOUT ANY WARRANTY; without even the implied warranty of
+#           : MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#           : GNU General Public License for more details.
+#           :
+#           : You should have received a copy of the GNU General Public License
+#           : along with BehaviorStudio. If not, see <http://www.gnu.org/licenses/>.
+#           :
+#           : A copy of the GNU General Public License can be found in file COPYING.
+############################################################################
+
+""" Displaying of nodes states received from remote debugger on diagrams.
+
+Debug server may receive thousands of states per second, so diagrams are not updated on each received packet.
+DebugStatesUpdater collects notifications from remote debugger and not more often than once per frame
+calculates states of all nodes of debugged object and sends them to all diagrams at once
+(see TreeGraphicsScene.applyDebugStates).
+"""
+
+from __future__ import unicode_literals
+
+__author__ = 'Victor Zarubkin'
+__copyright__ = 'Copyright (C) 2026  Victor Zarubkin'
+__credits__ = ['Victor Zarubkin']
+__license__ = ['GPLv3']
+__version__ = '1.3.0'  # this is last application version when this script file was changed
+__email__ = 'victor.zarubkin@gmail.com'
+############################################################################
+
+from PySide import QtCore
+from PySide.QtCore import *
+
+from remote_debugger import debugger_globals
+from remote_debugger.debugger_mode import DebuggerMode
+
+#######################################################################################################################
+#######################################################################################################################
+
+_frameInterval = 40  # min interval between two updates of diagrams, milliseconds
+
+
+class DebugStatesUpdater(QObject):
+    def __init__(self):
+        QObject.__init__(self)
+        self.__scenes = []  # list of TreeGraphicsScene
+        self.__enabled = False
+        self.__lastObject = None  # uid of the last updated object
+        self.__timer = None  # created on first use
+        debugger_globals.debuggerSignals.debuggerOnOff.connect(self.__onDebuggerOnOff)
+        debugger_globals.debuggerSignals.modeChanged.connect(self.__onModeChange)
+        debugger_globals.debuggerSignals.timeSliceChanged.connect(self.__onTimeSliceChange)
+        debugger_globals.debuggerSignals.timelinesUpdated.connect(self.__onTimelinesUpdate)
+
+    def register(self, scene):
+        if scene not in self.__scenes:
+            self.__scenes.append(scene)
+            if self.__enabled:
+                self.scheduleUpdate()
+
+    def unregister(self, scene):
+        if scene in self.__scenes:
+            self.__scenes.remove(scene)
+
+    def objectUid(self):
+        """ Returns uid of object which states are shown on diagrams. """
+        if debugger_globals.debugObject is not None:
+            return debugger_globals.debugObject
+        return self.__lastObject
+
+    def scheduleUpdate(self):
+        """ Request update of diagrams. All requests made during one frame are merged into one update. """
+        if self.__timer is None:
+            self.__timer = QTimer()
+            self.__timer.setSingleShot(True)
+            self.__timer.timeout.connect(self.__update)
+        if not self.__timer.isActive():
+            self.__timer.start(_frameInterval)
+
+    def states(self):
+        """ Returns dict {node uid: state} which should be shown on diagrams now. """
+        objectUid = self.objectUid()
+        if not self.__enabled or objectUid is None:
+            return dict()
+        time = debugger_globals.timeMark if debugger_globals.timeMark >= 0.0 else None
+        currentOnly = debugger_globals.mode == DebuggerMode.CurrentState
+        return debugger_globals.timelines.statesAt(objectUid, time, currentOnly)
+
+    @QtCore.Slot()
+    def __update(self):
+        if not self.__scenes:
+            return
+        states = self.states()
+        for scene in self.__scenes:
+            scene.applyDebugStates(states)
+
+    @QtCore.Slot(bool)
+    def __onDebuggerOnOff(self, on):
+        self.__enabled = on
+        self.__lastObject = None
+        self.scheduleUpdate()
+
+    @QtCore.Slot(int)
+    def __onModeChange(self, mode):
+        if self.__enabled:
+            self.scheduleUpdate()
+
+    @QtCore.Slot(float)
+    def __onTimeSliceChange(self, timeMark):
+        if self.__enabled:
+            self.scheduleUpdate()
+
+    @QtCore.Slot(list)
+    def __onTimelinesUpdate(self, objectsUids):
+        if not self.__enabled or not objectsUids:
+            return
+        if debugger_globals.debugObject is None:
+            self.__lastObject = objectsUids[-1]
+            self.scheduleUpdate()
+        elif debugger_globals.debugObject in objectsUids:
+            self.scheduleUpdate()
+
+#######################################################################################################################
+
+debugStatesUpdater = DebugStatesUpdater()
+
+#######################################################################################################################
+#######################################################################################################################
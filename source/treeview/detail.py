@@ -0,0 +1,70 @@
+# coding=utf-8
+# -----------------
+# file      : detail.py
+# date      : 2026/10/18
+# author    : Victor Zarubkin
+# contact   : victor.zarubkin@gmail.com
+# copyright : Copyright (C) 2026  Victor Zarubkin
+# license   : This file is part of BehaviorStudio.
+#           :
+#           : BehaviorStudio is free software: you can redistribute it and/or modify
+#           : it under the terms of the GNU General Public License as published by
+#           : the Free Software Foundation, either version 3 of the License, or
+#           : (at your option) any later version.
+#           :
+#           : BehaviorStudio is distributed in the hope that it will be useful,
+#           : but WITHOUT ANY WARRANTY; without even the implied warranty of
+#           : MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#           : GNU General Public License for more details.
+#           :
+#           : You should have received a copy of the GNU General Public License
+#           : along with BehaviorStudio. If not, see <http://www.gnu.org/licenses/>.
+#           :
+#           : A copy of the GNU General Public License can be found in file COPYING.
+############################################################################
+
+""" Level of detail of diagram drawing.
+
+Level of detail is calculated from painter's transform while painting, so it is the same for all items of one view
+and it does not require any updates of items when scale of view is changed.
+See globals.lodSimplifiedScale and globals.lodRectsScale.
+"""
+
+from __future__ import unicode_literals
+
+__author__ = 'Victor Zarubkin'
+__copyright__ = 'Copyright (C) 2026  Victor Zarubkin'
+__credits__ = ['Victor Zarubkin']
+__license__ = ['GPLv3']
+__version__ = '1.3.0'  # this is last application version when this script file was changed
+__email__ = 'victor.zarubkin@gmail.com'
+############################################################################
+
+from PySide.QtGui import QStyleOptionGraphicsItem
+
+import globals
+
+#######################################################################################################################
+#######################################################################################################################
+
+
+class DetailLevel(object):
+    Full = 0
+    Simplified = 1  # no text and effects, simplified shapes, straight connectors
+    Rects = 2  # items are drawn as rectangles
+
+    def __init__(self):
+        pass
+
+
+def detailLevel(painter):
+    """ Returns DetailLevel for drawing by *painter* with it's current transform. """
+    scale = QStyleOptionGraphicsItem.levelOfDetailFromTransform(painter.worldTransform()) * 100.0
+    if scale >= globals.lodSimplifiedScale:
+        return DetailLevel.Full
+    if scale >= globals.lodRectsScale:
+        return DetailLevel.Simplified
+    return DetailLevel.Rects
+
+#######################################################################################################################
+#######################################################################################################################
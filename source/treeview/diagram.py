@@ -31,6 +31,7 @@ __version__ = '1.3.0'  # this is last application version when this script file
 __email__ = 'victor.zarubkin@gmail.com'
 ############################################################################
 
+import time
 from os import path
 from math import fabs
 from inspect import currentframe, getframeinfo
@@ -45,6 +46,9 @@ from .itemgroup import ItemGroup, DEFAULT_INTERVAL, DEFAULT_GROUP_INTERVAL
 from .polyitem import PolyItem
 from .connector import ConnectorArrow, ConnectorType
 from .dispregime import DisplayRegime, GroupType, AlignType
+from .debugstates import debugStatesUpdater
+from .animator import ItemsAnimator
+from .sceneitems import SceneItems
 from treelist.tlinfo import TaskInfoWidget
 from language import trStr
 from auxtypes import joinPath
@@ -92,8 +96,11 @@ class TreeGraphicsScene(QGraphicsScene):
 
         self.updateCounter = int(0)
         self.__removedItems = []
-        self.polyItems = []
+        self.animator = ItemsAnimator(PolyItem.animationInterval)  # moves all animated items of the scene
+        self.__signalsConnected = False
+        self.polyItems = SceneItems()  # all PolyItems of the scene
         self.polyItemsByUid = dict()
+        self.__debugStates = dict()  # node states received from remote debugger shown now {node uid: state}
         if displayMode:
             self.regime = DisplayRegime.Horizontal
         else:
@@ -155,12 +162,17 @@ class TreeGraphicsScene(QGraphicsScene):
         self.__removerTimer.setSingleShot(True)
         self.__removerTimer.timeout.connect(self.__onRemoveItemsTimeout)
 
+        # regime and intervals changes are dispatched to groups of items by the scene (see itemsGroups)
+        self.regimeChanged.connect(self.__onRegimeChange)
+        self.intervalChanged.connect(self.__onIntervalChange)
+
         self.mousePos = QPointF()
 
         if self.rootNode is not None:
             # отключение анимации при обновлении окна
             animation, globals.itemsAnimation = bool(globals.itemsAnimation), False
 
+            startTime = time.time()
             self.fillItemsChildrenTree(self.rootNode)
             self.rootItem.setRoot(True)
             self.topItem = self.rootItem
@@ -190,6 +202,11 @@ class TreeGraphicsScene(QGraphicsScene):
                 QTimer().singleShot(timeWait + 40, self.__centerOnRoot)
             globals.itemsAnimation = animation
 
+            if globals.debugMode:
+                deferred = len([item for item in self.polyItems if item.childrenDeferred()])
+                print('debug: Diagram \'{0}\' has been built in {1:.3f} s: {2} items, {3} collapsed subtrees deferred'
+                      .format(self.branchname, time.time() - startTime, len(self.polyItems), deferred))
+
             self.__updateTimer = QTimer()
             self.__updateTimer.setSingleShot(True)
             self.__updateTimer.timeout.connect(self.update)
@@ -202,6 +219,96 @@ class TreeGraphicsScene(QGraphicsScene):
             globals.behaviorTreeSignals.nodeConnected.connect(self.__onTreeNodeConnect)
             globals.behaviorTreeSignals.treeRootChanged.connect(self.__onTreeRootChange)
 
+            self.__connectSignals(True)
+            debugStatesUpdater.register(self)
+
+    def __connectSignals(self, connect):
+        """ Connect (or disconnect) signals which are dispatched to items.
+        Library signals are sent only to items which nodes use changed library node (instead of connecting
+        each item to each signal). """
+        signals = ((globals.librarySignals.nodeRenamed, self.__onNodeRename),
+                   (globals.librarySignals.nodeRemoved, self.__onNodeRemove),
+                   (globals.librarySignals.nodeTypeChanged, self.__onNodeTypeChange),
+                   (globals.librarySignals.libraryExcluded, self.__onLibraryExcludeOrAdd),
+                   (globals.librarySignals.libraryAdded, self.__onLibraryExcludeOrAdd),
+                   (globals.librarySignals.nodeEventsCountChanged, self.__onNodeEventsCountChange),
+                   (globals.librarySignals.nodeChildrenChanged, self.__onNodeChildrenListChange),
+                   (globals.librarySignals.nodeShapeChanged, self.__onNodeShapeChange),
+                   (globals.optionsSignals.shadowsChanged, self.__onShadowsChange),
+                   (globals.generalSignals.preSave, self.__onPreSave))
+        if connect == self.__signalsConnected:
+            return
+        self.__signalsConnected = connect
+        for signal, slot in signals:
+            if connect:
+                signal.connect(slot)
+            else:
+                signal.disconnect(slot)
+
+    def __itemsOf(self, uids):
+        """ Returns list of items for nodes with specified uids. """
+        items = []
+        for uid in uids:
+            if uid in self.polyItemsByUid:
+                items.extend(self.polyItemsByUid[uid])
+        return items
+
+    def __itemsOfNode(self, libname, nodename):
+        return self.__itemsOf(self.project.nodes.uidsOf(libname, nodename))
+
+    @QtCore.Slot(str, str, str)
+    def __onNodeRename(self, libname, oldname, newname):
+        # nodes have been renamed already
+        for item in self.__itemsOfNode(libname, newname):
+            if item.node is not None:
+                item.onNodeRename(libname, oldname, newname)
+
+    @QtCore.Slot(str, str, str)
+    def __onNodeRemove(self, libname, nodename, nodeClass):
+        for item in self.__itemsOfNode(libname, nodename):
+            if item.node is not None:
+                item.onNodeRemove(libname, nodename, nodeClass)
+
+    @QtCore.Slot(str, str, str, str)
+    def __onNodeTypeChange(self, libname, nodename, typeOld, typeNew):
+        for item in self.__itemsOfNode(libname, nodename):
+            if item.node is not None:
+                item.onNodeTypeChange(libname, nodename, typeOld, typeNew)
+
+    @QtCore.Slot(str)
+    def __onLibraryExcludeOrAdd(self, libname):
+        for item in self.__itemsOf(self.project.nodes.uidsOfLibrary(libname)):
+            if item.node is not None:
+                item.onLibraryExcludeOrAdd(libname)
+
+    @QtCore.Slot(str, str)
+    def __onNodeEventsCountChange(self, libname, nodename):
+        for item in self.__itemsOfNode(libname, nodename):
+            if item.node is not None:
+                item.onNodeEventsCountChange(libname, nodename)
+
+    @QtCore.Slot(str, str)
+    def __onNodeChildrenListChange(self, libname, nodename):
+        for item in self.__itemsOfNode(libname, nodename):
+            if item.node is not None:
+                item.onNodeChildrenListChange(libname, nodename)
+
+    @QtCore.Slot(str, str, str)
+    def __onNodeShapeChange(self, libname, nodename, shapeName):
+        for item in self.__itemsOfNode(libname, nodename):
+            if item.node is not None:
+                item.onNodeShapeChange(libname, nodename, shapeName)
+
+    @QtCore.Slot(bool)
+    def __onShadowsChange(self, enabled):
+        for item in self.polyItems:
+            item.toggleShadow(enabled)
+
+    @QtCore.Slot()
+    def __onPreSave(self):
+        for item in self.polyItems:
+            item.savePosition()
+
     @QtCore.Slot(Uid, Uid)
     def __onTreeNodeDisconnect(self, nodeUid, parentUid):
         if not self.__focused and parentUid.value in self.polyItemsByUid:
@@ -238,10 +345,31 @@ class TreeGraphicsScene(QGraphicsScene):
 
     @QtCore.Slot()
     def __onRemoveItemsTimeout(self):
-        if self.__removedItems:
-            QGraphicsScene.removeItem(self, self.__removedItems.pop())
-            if self.__removedItems:
-                self.__removerTimer.start(40)
+        # all removed items are removed from QGraphicsScene at once
+        removedItems, self.__removedItems = self.__removedItems, []
+        for item in removedItems:
+            if item.scene() is self:
+                QGraphicsScene.removeItem(self, item)
+
+    def itemsGroups(self):
+        """ Returns list of all ItemGroups of scene items. """
+        groups = []
+        for item in self.polyItems:
+            if item.childItemGroup is not None:
+                groups.append(item.childItemGroup)
+            if item.parentNode() is None and item.itemGroup() is not None:
+                groups.append(item.itemGroup())  # group of top-level item is not a children group of any item
+        return groups
+
+    @QtCore.Slot(int)
+    def __onRegimeChange(self, regime):
+        for group in self.itemsGroups():
+            group.onRegimeChange(regime)
+
+    @QtCore.Slot(int, int)
+    def __onIntervalChange(self, itemInterval, groupInterval):
+        for group in self.itemsGroups():
+            group.setInterval(itemInterval, groupInterval)
 
     def scheduleUpdate(self):
         if not self.__updateTimer.isActive():
@@ -251,20 +379,43 @@ class TreeGraphicsScene(QGraphicsScene):
         if not self.__updateRectTimer.isActive():
             self.__updateRectTimer.start(10)
 
+    def applyDebugStates(self, states):
+        """ Show nodes states received from remote debugger (dict {node uid: state}).
+        Only items which state differs from the shown one are changed and all of them are repainted at once. """
+        shown = self.__debugStates
+        changed = []  # list of (node uid, state)
+        for uid in shown:
+            if uid not in states:
+                changed.append((uid, None))
+        for uid, state in states.items():
+            if shown.get(uid) != state:
+                changed.append((uid, state))
+        self.__debugStates = dict(states)
+
+        dirtyRect = QRectF()
+        for uid, state in changed:
+            if uid in self.polyItemsByUid:
+                for item in self.polyItemsByUid[uid]:
+                    if item.setDebugState(state) and item.isVisible():
+                        dirtyRect = dirtyRect.united(item.sceneBoundingRect())
+        if not dirtyRect.isNull():
+            self.update(dirtyRect)
+
     def flush(self):
         self.__flushing = True
+        debugStatesUpdater.unregister(self)
+        self.__connectSignals(False)
+        self.animator.clear()
+        self.__debugStates = dict()
         self.queryTab.disconnect()
-        if self.rootItem in self.disconnectedItems:
-            self.disconnectedItems.remove(self.rootItem)
-        for item in self.disconnectedItems:
-            item.removeFromScene()
-        if self.rootItem is not None:
-            self.rootItem.removeFromScene()
-            self.rootItem = None
-        # if self.__removedItems:
-        #     for item in self.__removedItems:
-        #         QGraphicsScene.removeItem(self, item)
-        self.__removedItems = []
+        self.regimeChanged.disconnect(self.__onRegimeChange)
+        self.intervalChanged.disconnect(self.__onIntervalChange)
+        # Items are not removed one by one: all of them are deleted at once by clear() below.
+        # Only positions of items are saved (as PolyItem.removeFromScene does).
+        for item in self.polyItems:
+            item.savePosition()
+        del self.disconnectedItems[:]
+        self.rootItem = None
         self.rootNode = None
         self.selected = None
         self.widestItem = None
@@ -277,11 +428,13 @@ class TreeGraphicsScene(QGraphicsScene):
         if self.connectorArrow is not None:
             self.removeItem(self.connectorArrow)
             self.connectorArrow = None
+        # removed items which are still in scene are deleted by clear() too
+        self.__removerTimer.stop()
+        self.__removedItems = []
         self.clear()
         self.polyItemsByUid.clear()
         if self.polyItems is not None:
-            del self.polyItems[:]
-            del self.polyItems
+            self.polyItems.clear()
             self.polyItems = None
         if self.scalingTimer is not None:
             self.scalingTimer.stop()
@@ -472,15 +625,17 @@ class TreeGraphicsScene(QGraphicsScene):
             if parentItem is None:
                 self.rootItem = newItem
                 self.rootItem.setItemGroup(ItemGroup(self, None, self.itemInterval, self.groupInterval))
-                self.regimeChanged.connect(self.rootItem.itemGroup().onRegimeChange)
-                self.intervalChanged.connect(self.rootItem.itemGroup().setInterval)
             else:
                 parentItem.addChild(newItem, before)
 
             uid = self.project.trees.get(currentNode.target)
             found = self.project.nodes.get(uid)
             if found is not None:
-                self.fillItemsChildrenTree(found, newItem)
+                if currentNode.diagramInfo.expanded:
+                    self.fillItemsChildrenTree(found, newItem)
+                else:
+                    # items for subtree of collapsed link will be created on first expand
+                    newItem.deferChildren()
             # newItem.expandCollapseToggle()
             if currentNode.diagramInfo.expanded:
                 newItem.expand()
@@ -500,33 +655,74 @@ class TreeGraphicsScene(QGraphicsScene):
             if parentItem is None:
                 self.rootItem = newItem
                 self.rootItem.setItemGroup(ItemGroup(self, None, self.itemInterval, self.groupInterval))
-                self.regimeChanged.connect(self.rootItem.itemGroup().onRegimeChange)
-                self.intervalChanged.connect(self.rootItem.itemGroup().setInterval)
             else:
                 newItem.setPos(parentItem.pos().x(), parentItem.pos().y(), True)
                 parentItem.addChild(newItem, before)
 
-            ccc = []
-            for cls in currentNode.allChildren():
-                ccc.append(cls)
-            ccc.sort()
-            for cls in ccc:  # currentNode.allChildren():
-                if cls not in desc.childClasses or cls not in currentNode.type():
-                    continue
-                children = currentNode.children(cls)
-                max_children = currentNode.type().child(cls).max
-                num_children = 0
-                for child in children:
-                    self.fillItemsChildrenTree(child, newItem)
-                    num_children += 1
-                    if num_children >= max_children:
-                        break
+            if not currentNode.diagramInfo.expanded and not editable and any(currentNode.allChildren().values()):
+                # items for collapsed non-editable subtree (part of link) will be created on first expand
+                newItem.deferChildren()
+            else:
+                self.__fillChildren(currentNode, newItem)
 
             if currentNode.diagramInfo.expanded:
                 newItem.expand()
             else:
                 newItem.collapse()
 
+    def __fillChildren(self, currentNode, parentItem):
+        desc = currentNode.nodeDesc()
+        if desc is None:
+            return
+        ccc = []
+        for cls in currentNode.allChildren():
+            ccc.append(cls)
+        ccc.sort()
+        for cls in ccc:  # currentNode.allChildren():
+            if cls not in desc.childClasses or cls not in currentNode.type():
+                continue
+            children = currentNode.children(cls)
+            max_children = currentNode.type().child(cls).max
+            num_children = 0
+            for child in children:
+                self.fillItemsChildrenTree(child, parentItem)
+                num_children += 1
+                if num_children >= max_children:
+                    break
+
+    def fillDeferredChildren(self, item):
+        """ Create children items for item which children creation has been deferred (see PolyItem.deferChildren).
+        Children items are created hidden. """
+        if item.node is None:
+            return
+        # отключение анимации при создании элементов
+        animation, globals.itemsAnimation = bool(globals.itemsAnimation), False
+        startTime = time.time()
+        itemsCount = len(self.polyItems)
+        if item.node.type().isLink():
+            uid = self.project.trees.get(item.node.target)
+            found = self.project.nodes.get(uid)
+            if found is not None:
+                self.fillItemsChildrenTree(found, item)
+        else:
+            self.__fillChildren(item.node, item)
+        globals.itemsAnimation = animation
+        if globals.debugMode:
+            print('debug: {0} items have been created for \'{1}\' in {2:.3f} s'
+                  .format(len(self.polyItems) - itemsCount, item.node.refname() or item.node.nodeType,
+                          time.time() - startTime))
+
+    def releaseChildren(self, item):
+        """ Remove children items of collapsed item. They will be created again on next expand. """
+        if not item.childrenHide or not item.children:
+            return
+        itemsCount = len(self.polyItems)
+        for child in list(item.children):
+            child.removeFromScene(full=False)
+        item.deferChildren()
+        if globals.debugMode:
+            print('debug: {0} items of collapsed subtree have been released'.format(itemsCount - len(self.polyItems)))
+
     def setDisplayMode(self, mode):
         changeMade = False
         if mode:
@@ -882,6 +1078,8 @@ class TreeGraphicsScene(QGraphicsScene):
             self.polyItemsByUid[treenode.uid()] = [newItem]
         else:
             self.polyItemsByUid[treenode.uid()].append(newItem)
+        if treenode.uid() in self.__debugStates:
+            newItem.setDebugState(self.__debugStates[treenode.uid()])
         return newItem
 
     def addNewRandomItem(self, parentItem, nodeClass, nodeType=''):
@@ -943,8 +1141,6 @@ class TreeGraphicsScene(QGraphicsScene):
             text = desc.name
         item.setText(text, '')
         item.setItemGroup(ItemGroup(self, None, self.itemInterval, self.groupInterval))
-        self.regimeChanged.connect(item.itemGroup().onRegimeChange)
-        self.intervalChanged.connect(item.itemGroup().setInterval)
         item.setPos(x, y, True)
         item.verify(True, True)
         self.topItem = self.__findTopItem([])
@@ -975,67 +1171,62 @@ class TreeGraphicsScene(QGraphicsScene):
         newItem.setText(text, '')
 
         newItem.setItemGroup(ItemGroup(self, None, self.itemInterval, self.groupInterval))
-        self.regimeChanged.connect(newItem.itemGroup().onRegimeChange)
-        self.intervalChanged.connect(newItem.itemGroup().setInterval)
 
         self.project.trees.addDisconnectedNodes(self.branchname, newTreeNode.uid())
 
         return newItem
 
     def removeItem(self, item):
-        isPolyItem = item in self.polyItems
-        if isPolyItem:
-            # if item.textItem is not None:
-            #     QGraphicsScene.removeItem(self, item.textItem)
+        if item in self.polyItems:
+            self.removeItems([item])
+        else:
+            self.removeItems([], [item])
+
+    def removeItems(self, items, others=None):
+        """ Remove PolyItems *items* (whole subtree, for example) and other graphics items *others* (connectors, for
+        example) from scene at once. Selected, widest, top and root items are checked once for all removed items.
+        Items are hidden immediately and they are removed from QGraphicsScene later. """
+        removed = SceneItems()
+        for item in items:
+            if item in self.polyItems:
+                removed.append(item)
 
-            if item == self.selected:
+        verify = False
+        if len(removed) > 0:
+            if self.selected in removed:
                 if self.dragItem is not None:
                     self.dragItem = None
                     self.endMoveItemInList.emit()
                 self.selected = None
                 self.selectedItemChange.emit(None)
 
-            if item == self.widestItem and not self.__flushing:
-                self.findWidest([item])
+            if self.widestItem in removed and not self.__flushing:
+                self.findWidest(removed)
                 verify = True
-            else:
-                verify = False
 
             if not self.__flushing:
-                if item == self.topItem:
-                    self.topItem = self.__findTopItem([item])
-                if item == self.rootItem and self.topItem is not None:
+                if self.topItem in removed:
+                    self.topItem = self.__findTopItem(removed)
+                if self.rootItem in removed and self.topItem is not None:
                     self.__changeRootItem(self.topItem)
 
-            if item in self.disconnectedItems:
-                self.disconnectedItems.remove(item)
+            self.disconnectedItems[:] = [item for item in self.disconnectedItems if item not in removed]
 
-            bruteforce = True
-            if item.node is not None:
-                item_node_uid = item.node.uid()
-                if item_node_uid in self.polyItemsByUid:
-                    bruteforce = False
-                    if item in self.polyItemsByUid[item_node_uid]:
-                        self.polyItemsByUid[item_node_uid].remove(item)
-                        if not self.polyItemsByUid[item_node_uid]:
-                            del self.polyItemsByUid[item_node_uid]
-            if bruteforce:
-                for uid in self.polyItemsByUid:
-                    if item in self.polyItemsByUid[uid]:
-                        self.polyItemsByUid[uid].remove(item)
-                        if not self.polyItemsByUid[uid]:
-                            del self.polyItemsByUid[uid]
-                        break
-
-            self.polyItems.remove(item)
-            item.flush()
-        else:
-            verify = False
+            for item in removed:
+                self.__removeFromUidsMap(item)
+                self.polyItems.remove(item)
+                item.flush()
 
-        # QGraphicsScene.removeItem(self, item)
-        item.setVisible(False)
-        self.__removedItems.append(item)
-        # self.__removerTimer.start(40)
+        hidden = list(removed)
+        if others:
+            hidden.extend(others)
+        for item in hidden:
+            item.setVisible(False)
+        # QGraphicsScene.removeItem is not called here: items may be removed while scene handles their events,
+        # so they are removed later all at once (see __onRemoveItemsTimeout)
+        self.__removedItems.extend(hidden)
+        if self.__removedItems and not self.__removerTimer.isActive():
+            self.__removerTimer.start(40)
 
         if verify and self.justifyItems and not self.verifying:
             self.rootItem.recalcBoundaries(True)
@@ -1043,6 +1234,24 @@ class TreeGraphicsScene(QGraphicsScene):
             self.updateSceneRect()
             self.update()
 
+    def __removeFromUidsMap(self, item):
+        if item.node is not None:
+            uid = item.node.uid()
+            if uid in self.polyItemsByUid:
+                items = self.polyItemsByUid[uid]
+                if item in items:
+                    items.remove(item)
+                    if not items:
+                        del self.polyItemsByUid[uid]
+                return
+        for uid in self.polyItemsByUid:
+            items = self.polyItemsByUid[uid]
+            if item in items:
+                items.remove(item)
+                if not items:
+                    del self.polyItemsByUid[uid]
+                break
+
     def updateItems(self, full):
         for item in self.disconnectedItems:
             self.verifying = True
@@ -1119,7 +1328,8 @@ class TreeGraphicsScene(QGraphicsScene):
         top = self.topLeft.y()
         right = self.bottomRight.x()
         bottom = self.bottomRight.y()
-        for item in self.polyItems:
+        # scene rect is never reduced, so only items moved since previous update can extend it
+        for item in self.polyItems.takeMoved():
             pos = item.posRequired()
             if pos.x() < left:
                 left = pos.x()
@@ -35,6 +35,7 @@ __email__ = 'victor.zarubkin@gmail.com'
 
 from .diagram import *
 from .dispregime import DisplayRegime, GroupType, AlignType
+from indexedlist import IndexedList
 
 ######################################################################################################################
 ######################################################################################################################
@@ -44,16 +45,28 @@ DEFAULT_GROUP_INTERVAL = 35
 
 
 class ItemGroup(object):
+    """ Group of children items of one item (or group of top-level items).
+
+    Layout is incremental: sizes of group (see calcMargins) and positions of it's items (see moveTo) are cached.
+    Any change of group (adding/removing items, changing visibility or size of items) must call invalidate(),
+    which marks this group and all groups up to the root as changed. Then fullUpdate() recalculates sizes only for
+    changed groups and moves only items of changed groups and groups which position has been changed.
+    """
+
     __displayTypes = [GroupType.VerticalGroup, GroupType.HorizontalGroup]
 
     def __init__(self, scene, parentItem, itemInterval, groupInterval):
         self.__scene = scene
         self.__parentItem = parentItem
-        self.__items = []
+        self.__items = IndexedList()
         self.__type = GroupType.VerticalGroup
         if scene.regime == DisplayRegime.Vertical:
             self.__type = GroupType.HorizontalGroup
 
+        self.__sizeChanged = True  # if True, then sizes must be recalculated by calcMargins
+        self.__layoutChanged = True  # if True, then items must be moved by moveTo
+        self.__lastPos = None  # position of group on last moveTo
+
         self.itemInterval = DEFAULT_INTERVAL
         self.groupInterval = DEFAULT_GROUP_INTERVAL
         self.setInterval(itemInterval, groupInterval)
@@ -64,6 +77,17 @@ class ItemGroup(object):
 
         self.__iter = int(0)
 
+    def invalidate(self):
+        """ Mark this group and all parent groups as changed.
+        If group is marked as changed then all parent groups are marked too, so going up is stopped on first
+        already changed group. """
+        group = self
+        while group is not None and not (group.__sizeChanged and group.__layoutChanged):
+            group.__sizeChanged = True
+            group.__layoutChanged = True
+            parentItem = group.__parentItem
+            group = parentItem.itemGroup() if parentItem is not None else None
+
     def items(self):
         return self.__items
 
@@ -116,6 +140,7 @@ class ItemGroup(object):
     def setType(self, displayType):
         if self.__type != displayType and displayType in ItemGroup.__displayTypes:
             self.__type = displayType
+            self.invalidate()
 
     @QtCore.Slot(int)
     def onRegimeChange(self, regime):
@@ -130,8 +155,10 @@ class ItemGroup(object):
             itemInterval = DEFAULT_INTERVAL
         if groupInterval <= 0:
             groupInterval = DEFAULT_GROUP_INTERVAL
-        self.itemInterval = itemInterval
-        self.groupInterval = groupInterval
+        if itemInterval != self.itemInterval or groupInterval != self.groupInterval:
+            self.itemInterval = itemInterval
+            self.groupInterval = groupInterval
+            self.invalidate()
 
     def margin(self):
         return self.__margin
@@ -143,6 +170,11 @@ class ItemGroup(object):
         return self.__width
 
     def calcMargins(self):
+        """ Calculate sizes of group. Sizes of unchanged groups are not recalculated (see invalidate). """
+        if not self.__sizeChanged:
+            return
+        self.__sizeChanged = False
+
         theMargin = 0.0
         maxH = -999999.0
         maxW = -999999.0
@@ -269,8 +301,13 @@ class ItemGroup(object):
         return theSize
 
     def moveTo(self, x, y):
-        if not self.isVisible():
+        """ Move items of group to position (x, y). Group is not moved if it is unchanged and it is
+        at the same position already (see invalidate). """
+        if not self.__layoutChanged and self.__lastPos is not None \
+                and self.__lastPos.x() == x and self.__lastPos.y() == y:
             return
+        self.__layoutChanged = False
+        self.__lastPos = QPointF(x, y)
 
         item = self.__firstVisible()
 
@@ -286,14 +323,8 @@ class ItemGroup(object):
             pos.setX(x - minSize * 0.5)
 
         first = True
-        dpth = item.depth()
         while item is not None:
             nextItem = self.__nextVisible()
-            if nextItem is not None:
-                dpth_n = nextItem.depth()
-                d, dpth = min(dpth, dpth_n), dpth_n
-            else:
-                d = dpth
 
             if first:
                 if self.__type == GroupType.VerticalGroup:
@@ -373,6 +404,7 @@ class ItemGroup(object):
         self.moveTo(pos.x(), pos.y())
 
     def fullUpdate(self):
+        self.invalidate()
         p = self.__parentItem
         while p is not None and p.parentNode() is not None:
             p = p.parentNode()
@@ -395,6 +427,7 @@ class ItemGroup(object):
                 item.setItemGroup(self)
                 item.setAutoPositioningMode(True, DisplayRegime.Horizontal)
                 item.setAutoPositioningMode(True, DisplayRegime.Vertical)
+            self.invalidate()
             if item.isVisible() and len(self.__items) > 1:
                 self.fullUpdate()
 
@@ -404,28 +437,27 @@ class ItemGroup(object):
             self.__items.remove(item)
             if item.itemGroup() == self:
                 item.setItemGroup(None)
+            self.invalidate()
             if wasVisible and len(self.__items) > 0:
                 self.fullUpdate()
 
     def moveItemBack(self, item):
-        if item in self.__items:
-            i = self.__items.index(item)
-            if i > 0:
-                prevItem = self.__items[i - 1]
-                self.__items[i - 1] = item
-                self.__items[i] = prevItem
-                if item.isVisible() and prevItem.isVisible():
-                    self.fullUpdate()
+        i = self.__items.find(item)
+        if i > 0:
+            prevItem = self.__items[i - 1]
+            self.__items.swap(i - 1, i)
+            self.invalidate()
+            if item.isVisible() and prevItem.isVisible():
+                self.fullUpdate()
 
     def moveItemForward(self, item):
-        if item in self.__items:
-            i = self.__items.index(item)
-            if i < (len(self.__items) - 1):
-                nextItem = self.__items[i + 1]
-                self.__items[i + 1] = item
-                self.__items[i] = nextItem
-                if item.isVisible() and nextItem.isVisible():
-                    self.fullUpdate()
+        i = self.__items.find(item)
+        if 0 <= i < (len(self.__items) - 1):
+            nextItem = self.__items[i + 1]
+            self.__items.swap(i, i + 1)
+            self.invalidate()
+            if item.isVisible() and nextItem.isVisible():
+                self.fullUpdate()
 
 #######################################################################################################################
 #######################################################################################################################
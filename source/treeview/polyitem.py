@@ -49,14 +49,20 @@ from .itemgroup import ItemGroup
 from .connector import Connector
 from .textitem import TextItem, NodeTextItem
 from .dispregime import DisplayRegime
+from .detail import DetailLevel, detailLevel
 from .colors import *
 
 from language import trStr
 import globals
+from indexedlist import IndexedList
 
 from inspect import currentframe, getframeinfo
 
 
+def _nodeUidOf(item):
+    return item.node.uid()
+
+
 def createDebugTextItem():
     ti = TextItem(False, u'!')
     ti.setDefaultTextColor(DiagramColor.debugColor)
@@ -117,6 +123,9 @@ class GlowShadowEffect(QGraphicsDropShadowEffect):
             self.setBlurRadius(radius)
 
     def draw(self, painter):
+        if detailLevel(painter) != DetailLevel.Full:
+            self.drawSource(painter)
+            return
         QGraphicsDropShadowEffect.draw(self, painter)
         if self._shadow and self._glow:
             self._toggle()
@@ -133,6 +142,43 @@ class GlowShadowEffect(QGraphicsDropShadowEffect):
         self.setColor(self._shadowColor)
         self.setBlurRadius(self._shadowRadius)
 
+#######################################################################################################################
+
+_shadowOffset = QPointF(-9.0, 9.0)  # the same as default offset of GlowShadowEffect
+_shadowMargin = 8.0
+_shadowsCache = dict()  # {VecShape: (QPixmap, QPointF)} - cached shadows of shapes (see globals.cachedShadows)
+
+
+def _shapeShadow(shape):
+    """ Returns tuple (pixmap, offset) with blurred shadow of *shape*. Shadow is created once for each shape. """
+    if shape in _shadowsCache:
+        return _shadowsCache[shape]
+    rect = shape.shape(0.0, 0.0).boundingRect().adjusted(-_shadowMargin, -_shadowMargin, _shadowMargin, _shadowMargin)
+    size = rect.size().toSize()
+    image = QImage(size, QImage.Format_ARGB32_Premultiplied)
+    image.fill(0)
+    painter = QPainter(image)
+    painter.translate(-rect.topLeft())
+    shape.paint(painter)
+    painter.setCompositionMode(QPainter.CompositionMode_SourceIn)
+    painter.fillRect(rect, QColor(0, 0, 0, 192))
+    painter.end()
+    # cheap blur: scale image down and back up with smooth transformation
+    small = image.scaled(max(size.width() // 4, 1), max(size.height() // 4, 1),
+                         Qt.IgnoreAspectRatio, Qt.SmoothTransformation)
+    image = small.scaled(size, Qt.IgnoreAspectRatio, Qt.SmoothTransformation)
+    shadow = (QPixmap.fromImage(image), rect.topLeft() + _shadowOffset)
+    _shadowsCache[shape] = shadow
+    return shadow
+
+
+class _ShadowItem(QGraphicsPixmapItem):
+    """ Cached shadow of item (see globals.cachedShadows). It is not drawn with reduced level of detail. """
+
+    def paint(self, painter, option, widget=None):
+        if detailLevel(painter) == DetailLevel.Full:
+            QGraphicsPixmapItem.paint(self, painter, option, widget)
+
 #######################################################################################################################
 #######################################################################################################################
 
@@ -155,25 +201,35 @@ class PolyItem(QGraphicsPolygonItem, QObject):
     showed = QtCore.Signal(QGraphicsPolygonItem)
     parentChanged = QtCore.Signal(QGraphicsPolygonItem)
 
-    __time = 30
+    animationInterval = 30  # interval of movement animation steps, milliseconds
     __moveSpeed = 2.0 / 5.0
 
     def __init__(self, parentScene, nodeRef, draggable=True, editable=True, parent=None, scene=None):
         QGraphicsPolygonItem.__init__(self, parent, scene)
         QObject.__init__(self)
 
-        self._effect = GlowShadowEffect()
-        self.setGraphicsEffect(self._effect)
-        self.toggleShadow(globals.itemsShadow)
+        self.__shadowItem = None
+        if globals.cachedShadows:
+            # shadow is drawn by pixmap shared by all items with the same shape,
+            # graphics effect is created on first highlight (see setHighlight)
+            self._effect = None
+            self.__shadowItem = _ShadowItem(self)
+            self.__shadowItem.setFlag(QGraphicsItem.ItemStacksBehindParent, True)
+            self.__shadowItem.setVisible(globals.itemsShadow)
+        else:
+            self._effect = GlowShadowEffect()
+            self.setGraphicsEffect(self._effect)
+            self.toggleShadow(globals.itemsShadow)
 
-        self.__positionTimer = QTimer()
-        self.__positionTimer.timeout.connect(self.updatePosition)
+        self.__animator = parentScene.animator  # all moving items of the scene are moved by one timer
+        self.__sceneItems = parentScene.polyItems  # notified about position changes (see SceneItems.itemMoved)
 
         self.node = nodeRef
         if self.node is not None and self.node.nodeDesc() is not None:
             self.__shape = self.node.nodeDesc().shape
         else:
             self.__shape = globals.project.shapelib.defaultShape()
+        self.__updateShadow()
 
         if self.node is not None and self.node.uid() not in globals.project.nodes:
             print(u'warning: Node {0} \'{1}\' is not in project\'s nodes list! Adding it into list.'
@@ -200,6 +256,8 @@ class PolyItem(QGraphicsPolygonItem, QObject):
 
         self.__debugIndicator = None
         self.__eventIndicator = None
+        self.__debugState = None  # node state received from remote debugger
+        self.__childrenDeferred = False  # if True, then children items have not been created yet (see deferChildren)
         self.backgroundColor = QcolorA(Qt.blue, 32)
         if self.node is not None:
             if self.node.cls().debuggable and self.node.debug is True:
@@ -231,10 +289,10 @@ class PolyItem(QGraphicsPolygonItem, QObject):
         self.__connector = None
         self.igroup = None
 
-        self.children = []
+        self.children = IndexedList()
+        self.__classChildren = dict()  # {nodeClass: IndexedList of children items of this class by node uids}
+        # regime and intervals changes are dispatched to groups by the scene (see TreeGraphicsScene.itemsGroups)
         self.childItemGroup = ItemGroup(parentScene, self, parentScene.itemInterval, parentScene.groupInterval)
-        parentScene.regimeChanged.connect(self.childItemGroup.onRegimeChange)
-        parentScene.intervalChanged.connect(self.childItemGroup.setInterval)
 
         self.childrenHide = False
 
@@ -261,26 +319,32 @@ class PolyItem(QGraphicsPolygonItem, QObject):
         self.__posHideShow = self.pos()
         self.__doneCounter = int(0)
 
-        globals.librarySignals.nodeRenamed.connect(self.__onNodeRename)
-        globals.librarySignals.nodeRemoved.connect(self.__onNodeRemove)
-        globals.librarySignals.nodeTypeChanged.connect(self.__onNodeTypeChange)
-        globals.librarySignals.libraryExcluded.connect(self.__onLibraryExcludeOrAdd)
-        globals.librarySignals.libraryAdded.connect(self.__onLibraryExcludeOrAdd)
-        globals.librarySignals.nodeEventsCountChanged.connect(self.__onNodeEventsCountChange)
-        globals.librarySignals.nodeChildrenChanged.connect(self.__onNodeChildrenListChange)
-        globals.librarySignals.nodeShapeChanged.connect(self.__onNodeShapeChange)
-        globals.optionsSignals.shadowsChanged.connect(self.toggleShadow)
-        globals.generalSignals.preSave.connect(self.__savePosition)
-
-    @QtCore.Slot(bool)
+        # library signals, shadowsChanged and preSave signals are dispatched to items by the scene
+        # (see TreeGraphicsScene.__connectSignals)
+
     def toggleShadow(self, enabled):
-        self._effect.setShadowEnabled(enabled)
+        if self.__shadowItem is not None:
+            self.__shadowItem.setVisible(enabled)
+        else:
+            self._effect.setShadowEnabled(enabled)
 
     def setHighlight(self, enabled, color=None):
+        if self._effect is None:
+            if not enabled:
+                return
+            self._effect = GlowShadowEffect()
+            self._effect.setShadowEnabled(False)
+            self.setGraphicsEffect(self._effect)
         self._effect.setGlowEnabled(enabled)
         if enabled and color is not None:
             self._effect.setGlowColor(color)
 
+    def __updateShadow(self):
+        if self.__shadowItem is not None:
+            pixmap, offset = _shapeShadow(self.__shape)
+            self.__shadowItem.setPixmap(pixmap)
+            self.__shadowItem.setOffset(offset)
+
     def editable(self):
         return self.__isEditable
 
@@ -302,6 +366,7 @@ class PolyItem(QGraphicsPolygonItem, QObject):
                 self.node.diagramInfo.autopositioning[displayRegime].autopos = bool(mode)
             else:
                 self.node.diagramInfo.autopositioning[self.scene().regime].autopos = bool(mode)
+            self.__invalidateLayout()
 
     def deltaPos(self, displayRegime=None):
         if self.node is not None:
@@ -327,6 +392,7 @@ class PolyItem(QGraphicsPolygonItem, QObject):
             self.node.diagramInfo.autopositioning[displayRegime].shift = QPointF(deltaPos)
         else:
             self.node.diagramInfo.autopositioning[self.scene().regime].shift = QPointF(deltaPos)
+        self.__invalidateLayout()
 
     def setEditable(self, editable):
         self.__isEditable = editable
@@ -343,6 +409,7 @@ class PolyItem(QGraphicsPolygonItem, QObject):
             if not self.draggingPos:
                 delta = self.pos() - self.__beginDragPos
                 self.__posRequired = self.pos()
+                self.__sceneItems.itemMoved(self)
                 if not self.autoPositioningMode() and self.__keyPressed == PolyItem.KeyManualMoving:
                     self.calculateDeltaPos()
                     QGraphicsPolygonItem.setPos(self, self.__beginDragPos.x(), self.__beginDragPos.y())
@@ -363,6 +430,7 @@ class PolyItem(QGraphicsPolygonItem, QObject):
                     QGraphicsPolygonItem.setPos(self, self.__posRequired.x(), self.__posRequired.y())
                     self.scene().scheduleUpdateSceneRect()
                 # self.scene().scheduleUpdate()  # for correct connectors drawing
+                self.__invalidateLayout()
             self.__beginDragPos = self.pos()
 
     def isMoving(self):
@@ -401,6 +469,28 @@ class PolyItem(QGraphicsPolygonItem, QObject):
         if color is not None:
             self.backgroundColor = QcolorA(color, alpha)
 
+    def debugState(self):
+        return self.__debugState
+
+    def setDebugState(self, state):
+        """ Set node state received from remote debugger (None means no state).
+        Item is not repainted here: scene repaints all changed items at once (see TreeGraphicsScene.applyDebugStates).
+        Returns True if item's color has been changed. """
+        if state == self.__debugState or self.node is None:
+            return False
+        self.__debugState = state
+        self.backgroundColor = self.__stateColor(state)
+        return True
+
+    def __stateColor(self, state):
+        cls = self.node.cls()
+        stateElement = cls.states.get(state) if state is not None else None
+        if stateElement is None:
+            stateElement = cls.defaultState()
+        if not self.__isEditable:
+            return stateElement.colorDisabled
+        return stateElement.colorEnabled
+
     def hide(self, initiator=None):
         self.__showing = False
         self.__hiding = True
@@ -427,7 +517,7 @@ class PolyItem(QGraphicsPolygonItem, QObject):
         else:
             self.__posHideShow = QPointF(self.__posRequired)
         if animate:
-            self.__positionTimer.start(PolyItem.__time)
+            self.__animator.start(self)
         else:
             self.__finishHide()
         # QGraphicsPolygonItem.hide(self)
@@ -457,8 +547,9 @@ class PolyItem(QGraphicsPolygonItem, QObject):
         # if self.__debugIndicator is not None:
         #    self.__debugIndicator.show()
         QGraphicsPolygonItem.show(self)
+        self.__invalidateLayout()
         # if animate:
-        #    self.__positionTimer.start(PolyItem.__time)
+        #    self.__animator.start(self)
         # else:
         self.__finishShow()
 
@@ -470,6 +561,7 @@ class PolyItem(QGraphicsPolygonItem, QObject):
         self.__setPosition(self.__posRequired.x(), self.__posRequired.y())
         self.setMovable(False)
         QGraphicsPolygonItem.hide(self)
+        self.__invalidateLayout()
         if self.__doneCounter >= len(self.children):
             self.__hiding = False
             self.hidden.emit(self)
@@ -506,6 +598,8 @@ class PolyItem(QGraphicsPolygonItem, QObject):
                     self.linePen.setStyle(Qt.DotLine)
                     self.setPen(self.linePen)
                     self.igroup.fullUpdate()
+                    if globals.releaseCollapsedLinks and self.node is not None and self.node.type().isLink():
+                        QTimer.singleShot(0, self.__releaseChildren)
 
     @QtCore.Slot(QGraphicsPolygonItem)
     def __onChildShow(self, child):
@@ -569,13 +663,21 @@ class PolyItem(QGraphicsPolygonItem, QObject):
         if child in self.children:
             return
 
+        classChildren = None
         if child.node is not None:
-            if child.node.uid() in self.childrenUids():
-                return
-            children = self.childrenByClass(child.node.nodeClass)
+            uid = child.node.uid()
+            for children in self.__classChildren.values():
+                if children.hasKey(uid):
+                    return
+            classChildren = self.__classChildren.get(child.node.nodeClass)
+            if classChildren is None:
+                classChildren = IndexedList(key=_nodeUidOf)
+                self.__classChildren[child.node.nodeClass] = classChildren
+            children = classChildren
         else:
             children = self.children
         num_children = len(children)
+        classIndex = num_children
 
         if before >= num_children:
             if num_children < 1 or child.node is None:
@@ -590,6 +692,7 @@ class PolyItem(QGraphicsPolygonItem, QObject):
                 else:
                     before = 999999
         elif child.node is not None:
+            classIndex = children.index(children[before])
             i = self.children.index(children[before])
             if 0 <= i < len(self.children):
                 before = i
@@ -600,6 +703,8 @@ class PolyItem(QGraphicsPolygonItem, QObject):
             self.children.append(child)
         else:
             self.children.insert(before, child)
+        if classChildren is not None:
+            classChildren.insert(classIndex, child)
 
         connector = Connector(self.scene(), self, child)
         self.scene().addItem(connector)
@@ -614,8 +719,8 @@ class PolyItem(QGraphicsPolygonItem, QObject):
             child.hide()
             connector.hide()
 
-        for c in self.children:
-            c.updateIndexText()
+        if classChildren is not None:
+            self.__updateIndexTexts(classChildren, classIndex)
 
         child.hidden.connect(self.__onChildHide)
         child.showed.connect(self.__onChildShow)
@@ -625,6 +730,13 @@ class PolyItem(QGraphicsPolygonItem, QObject):
             # connector = child.connector()
             # self.scene().removeItem(connector)
             self.children.remove(child)
+            classChildren, classIndex = None, -1
+            if child.node is not None:
+                for classChildren in self.__classChildren.values():
+                    classIndex = classChildren.find(child)
+                    if classIndex >= 0:
+                        classChildren.remove(child)
+                        break
             if full and self.node is not None and child.node is not None and firstCall:
                 self.node.removeChild(child.node)
 
@@ -633,14 +745,12 @@ class PolyItem(QGraphicsPolygonItem, QObject):
             child.setParent(None)
 
             itemGr = ItemGroup(self.scene(), None, self.scene().itemInterval, self.scene().groupInterval)
-            self.scene().regimeChanged.connect(itemGr.onRegimeChange)
-            self.scene().intervalChanged.connect(itemGr.setInterval)
             child.setItemGroup(itemGr)
             if not child.isVisible():
                 child.show()
 
-            for c in self.children:
-                c.updateIndexText()
+            if classIndex >= 0:
+                self.__updateIndexTexts(classChildren, classIndex)
 
     def disconnectParent(self):
         if self.__parent is not None:
@@ -650,14 +760,10 @@ class PolyItem(QGraphicsPolygonItem, QObject):
                 parentItem.node.removeChild(self.node, permanent=False)
             if self.igroup is None:
                 self.igroup = ItemGroup(self.scene(), None, self.scene().itemInterval, self.scene().groupInterval)
-                self.scene().regimeChanged.connect(self.igroup.onRegimeChange)
-                self.scene().intervalChanged.connect(self.igroup.setInterval)
                 self.igroup.addItem(self)
 
     def indexOf(self, child):
-        if child in self.children:
-            return self.children.index(child)
-        return -1
+        return self.children.find(child)
 
     def childrenList(self):
         return self.children
@@ -666,11 +772,9 @@ class PolyItem(QGraphicsPolygonItem, QObject):
         return [child.node.uid() for child in self.children if child.node is not None]
 
     def childrenByClass(self, nodeClass):
-        children = []
-        for child in self.children:
-            if child.node is not None and child.node.nodeClass == nodeClass:
-                children.append(child)
-        return children
+        if nodeClass in self.__classChildren:
+            return list(self.__classChildren[nodeClass])
+        return []
 
     def childrenGroup(self):
         return self.childItemGroup
@@ -716,7 +820,7 @@ class PolyItem(QGraphicsPolygonItem, QObject):
             return
 
         if child.node is not None:
-            sameChildren = self.childrenByClass(child.node.nodeClass)
+            sameChildren = self.__classChildren[child.node.nodeClass]
         else:
             sameChildren = self.children
 
@@ -732,7 +836,9 @@ class PolyItem(QGraphicsPolygonItem, QObject):
             prev_index = i - 1
 
         # Swap graphics items:
-        self.children[prev_index], self.children[child_index] = self.children[child_index], self.children[prev_index]
+        self.children.swap(prev_index, child_index)
+        if sameChildren is not self.children:
+            sameChildren.swap(i - 1, i)
         prevItem = self.children[child_index]
         child = self.children[prev_index]
 
@@ -770,7 +876,7 @@ class PolyItem(QGraphicsPolygonItem, QObject):
             return
 
         if child.node is not None:
-            sameChildren = self.childrenByClass(child.node.nodeClass)
+            sameChildren = self.__classChildren[child.node.nodeClass]
         else:
             sameChildren = self.children
 
@@ -786,7 +892,9 @@ class PolyItem(QGraphicsPolygonItem, QObject):
             next_index = i + 1
 
         # Swap graphics items:
-        self.children[next_index], self.children[child_index] = self.children[child_index], self.children[next_index]
+        self.children.swap(next_index, child_index)
+        if sameChildren is not self.children:
+            sameChildren.swap(i, i + 1)
         nextItem = self.children[child_index]
         child = self.children[next_index]
 
@@ -874,10 +982,21 @@ class PolyItem(QGraphicsPolygonItem, QObject):
     def updateIndexText(self):
         i = int(-1)
         if self.node is not None and self.parentNode() is not None:
-            children = self.parentNode().childrenByClass(self.node.nodeClass)
-            if len(children) > 1:
-                i = children.index(self)
+            children = self.parentNode().__classChildren.get(self.node.nodeClass)
+            if children is not None and len(children) > 1:
+                i = children.find(self)
+        self.__setIndexText(i)
+
+    def __updateIndexTexts(self, children, start):
+        """ Updates index texts of children items of one class beginning from index *start*
+        (indexes of previous children have not been changed). """
+        num_children = len(children)
+        if num_children < 3:
+            start = 0  # index text of the first child appears or disappears
+        for i in range(start, num_children):
+            children[i].__setIndexText(i if num_children > 1 else int(-1))
 
+    def __setIndexText(self, i):
         if i < 0:
             if self.indexTextItem is not None:
                 # self.indexTextItem.setParentItem(None)
@@ -902,7 +1021,13 @@ class PolyItem(QGraphicsPolygonItem, QObject):
                     self.indexTextItem.setDefaultTextColor(self.textItem.defaultTextColor())
                 self.updatePos()
 
+    def __invalidateLayout(self):
+        """ Must be called on any change of item which affects layout of diagram (see ItemGroup.invalidate). """
+        if self.igroup is not None:
+            self.igroup.invalidate()
+
     def recalcBoundaries(self, deep=False):
+        self.__invalidateLayout()
         self.__boundingRect = self.__shape.boundingRect(self.textW, self.textH)
         if not deep:
             self.widthChanged.emit(self, self.__boundingRect.width())
@@ -952,6 +1077,7 @@ class PolyItem(QGraphicsPolygonItem, QObject):
 
     def setPos(self, x, y, instant=False):
         self.__posRequired = QPointF(x, y)
+        self.__sceneItems.itemMoved(self)
         if instant or not globals.itemsAnimation:
             QGraphicsPolygonItem.setPos(self, x, y)
 
@@ -966,7 +1092,7 @@ class PolyItem(QGraphicsPolygonItem, QObject):
         if instant:
             self.updatePos()
         else:
-            self.__positionTimer.start(PolyItem.__time)
+            self.__animator.start(self)
         self.moving = False
 
     def move(self, dx, dy, recursive=False, instant=False):
@@ -982,7 +1108,7 @@ class PolyItem(QGraphicsPolygonItem, QObject):
         if instant:
             self.updatePos()
         else:
-            self.__positionTimer.start(PolyItem.__time)
+            self.__animator.start(self)
         self.moving = False
 
     def moveRequired(self, dx, dy, recursive=False, instant=False):
@@ -998,7 +1124,7 @@ class PolyItem(QGraphicsPolygonItem, QObject):
         if instant:
             self.updatePos()
         else:
-            self.__positionTimer.start(PolyItem.__time)
+            self.__animator.start(self)
         self.moving = False
 
     def updatePos(self, force=False):
@@ -1035,8 +1161,7 @@ class PolyItem(QGraphicsPolygonItem, QObject):
         if self.__connector is not None:
             self.__connector.updatePosition()
 
-    @QtCore.Slot()
-    def __savePosition(self):
+    def savePosition(self):
         if self.node is not None:
             self.node.diagramInfo.scenePos = self.pos()
 
@@ -1077,8 +1202,8 @@ class PolyItem(QGraphicsPolygonItem, QObject):
             return self.__shape.connectors(self.textH, VecShape.horizontal)
         return self.__shape.connectors(self.textH, VecShape.vertical)  # self.__cpoints
 
-    @QtCore.Slot()
     def updatePosition(self):
+        """ Make one step of animated movement (see ItemsAnimator). Returns False when movement is finished. """
         if self.__hiding:
             targetPos = self.__posHideShow
             # if self.__doneCounter < len(self.children):
@@ -1105,15 +1230,18 @@ class PolyItem(QGraphicsPolygonItem, QObject):
                     if self.__showing:
                         if not self.__visible:
                             self.__finishShow()
-                self.__positionTimer.stop()
+                return False
             else:
                 dx = line.dx()
                 dy = line.dy()
                 self.__move(dx * PolyItem.__moveSpeed, dy * PolyItem.__moveSpeed)
+        return True
 
     def paint(self, painter, option, widget):
         # painter.setClipRect(option.exposedRect)
-        painter.setRenderHint(QPainter.Antialiasing)
+        level = detailLevel(painter)
+        if level == DetailLevel.Full:
+            painter.setRenderHint(QPainter.Antialiasing)
 
         # draw item's shape
         self.setZValue(500.0)
@@ -1133,7 +1261,12 @@ class PolyItem(QGraphicsPolygonItem, QObject):
             painter.setBrush(br)
 
         # painter.drawPath(self.shape())
-        self.__shape.paint(painter)
+        if level == DetailLevel.Full:
+            self.__shape.paint(painter)
+        elif level == DetailLevel.Simplified:
+            painter.drawPath(self.__shape.simplifiedPath(globals.lodSimplifiedScale * 0.01))
+        else:
+            painter.drawPath(self.__shape.simplifiedPath(0.0))
 
     def makeTextSelected(self, isSelected, isParent=False):
         if self.textItem is not None:
@@ -1204,8 +1337,32 @@ class PolyItem(QGraphicsPolygonItem, QObject):
         else:
             self.collapse()
 
+    def childrenDeferred(self):
+        return self.__childrenDeferred
+
+    def deferChildren(self):
+        """ Make item collapsed without children items. Children items will be created on first expand
+        (see TreeGraphicsScene.fillDeferredChildren). """
+        self.__childrenDeferred = True
+        self.childrenHide = True
+        if self.node is not None:
+            self.node.diagramInfo.expanded = False
+        self.linePen.setStyle(Qt.DotLine)
+        self.setPen(self.linePen)
+
+    def __createDeferredChildren(self):
+        if self.__childrenDeferred:
+            self.__childrenDeferred = False
+            self.scene().fillDeferredChildren(self)
+
+    @QtCore.Slot()
+    def __releaseChildren(self):
+        if self.childrenHide and not self.__childrenDeferred and self.node is not None and self.scene() is not None:
+            self.scene().releaseChildren(self)
+
     @QtCore.Slot()
     def expand(self):
+        self.__createDeferredChildren()
         if not self.childrenHide or not self.children:
             return
         self.__doneCounter = int(0)
@@ -1244,6 +1401,7 @@ class PolyItem(QGraphicsPolygonItem, QObject):
         # self.igroup.fullUpdate()
 
     def recursiveExpand(self, initiator=None):
+        self.__createDeferredChildren()
         if not self.children:
             return False
         self.childrenHide = False
@@ -1459,6 +1617,7 @@ class PolyItem(QGraphicsPolygonItem, QObject):
             self.__shape = self.node.nodeDesc().shape
         else:
             self.__shape = globals.project.shapelib.defaultShape()
+        self.__updateShadow()
 
         textUnknown = u'Unknown'
 
@@ -1497,7 +1656,7 @@ class PolyItem(QGraphicsPolygonItem, QObject):
             else:
                 self.setText(self.node.nodeDesc().name)
 
-        if full:
+        if full and not self.__childrenDeferred:
             if self.node.type().isLink():
                 if refChanged:
                     forRemove = []
@@ -1587,7 +1746,9 @@ class PolyItem(QGraphicsPolygonItem, QObject):
                 if self.__debugIndicator is not None:
                     self.__removeChildItem(self.__debugIndicator)
                     self.__debugIndicator = None
-            if not self.__isEditable:
+            if self.__debugState is not None:
+                self.backgroundColor = self.__stateColor(self.__debugState)
+            elif not self.__isEditable:
                 self.backgroundColor = self.node.cls().colorDisabled
             else:
                 self.backgroundColor = self.node.cls().colorEnabled
@@ -1599,6 +1760,9 @@ class PolyItem(QGraphicsPolygonItem, QObject):
                 child.verify(full, deep)
 
     def verifyChildren(self, deep=False):
+        if self.__childrenDeferred:
+            return  # children items will be created from actual tree nodes on expand
+
         removeList = []
         invalidated = []
 
@@ -1664,30 +1828,30 @@ class PolyItem(QGraphicsPolygonItem, QObject):
         return None
 
     def flush(self):
-        self.__positionTimer.timeout.disconnect(self.updatePosition)
-        globals.librarySignals.nodeRenamed.disconnect(self.__onNodeRename)
-        globals.librarySignals.nodeRemoved.disconnect(self.__onNodeRemove)
-        globals.librarySignals.nodeTypeChanged.disconnect(self.__onNodeTypeChange)
-        globals.librarySignals.libraryExcluded.disconnect(self.__onLibraryExcludeOrAdd)
-        globals.librarySignals.libraryAdded.disconnect(self.__onLibraryExcludeOrAdd)
-        globals.librarySignals.nodeEventsCountChanged.disconnect(self.__onNodeEventsCountChange)
-        globals.librarySignals.nodeChildrenChanged.disconnect(self.__onNodeChildrenListChange)
-        globals.librarySignals.nodeShapeChanged.disconnect(self.__onNodeShapeChange)
-        globals.optionsSignals.shadowsChanged.disconnect(self.toggleShadow)
-        globals.generalSignals.preSave.disconnect(self.__savePosition)
-        self.widthChanged.disconnect()
-        self.childMoved.disconnect()
-        self.expandClicked.disconnect()
-        self.doubleClicked.disconnect()
-        self.parentChanged.disconnect()
+        """ Called by scene when item is removed. All signals of the item are blocked at once
+        instead of disconnecting each of them. """
+        self.__animator.stop(self)
+        self.blockSignals(True)
+
+    def subtreeItems(self):
+        """ Returns list of this item and all it's children items (recursively). """
+        items = [self]
+        i = 0
+        while i < len(items):
+            items.extend(items[i].children)
+            i += 1
+        return items
 
     def removeFromScene(self, full=False, firstCall=True):
-        forRemove = []
-        for child in self.children:
-            forRemove.append(child)
-        self.children = []
-        for loser in forRemove:
-            loser.removeFromScene(full, False)
+        """ Remove item with all it's children items from scene.
+        Only this item is detached from it's parent item. Children items are not detached from each other,
+        they are removed from scene all at once without any intermediate updates of layout.
+        """
+        scene = self.scene()
+        items = self.subtreeItems()
+        self.children = IndexedList()
+        self.__classChildren = dict()
+        self.childItemGroup = ItemGroup(scene, self, scene.itemInterval, scene.groupInterval)
         # if self.textItem is not None:
         #     self.__removeChildItem(self.textItem)
         #     self.textItem = None
@@ -1704,22 +1868,22 @@ class PolyItem(QGraphicsPolygonItem, QObject):
             self.__parent.removeChild(self, full, firstCall)
         elif self.node is not None and self.node.parent() is not None and firstCall:
             self.node.parent().removeChild(self.node)
-        self.__savePosition()
-        self.node = None
         if self.igroup is not None:
             self.igroup.removeItem(self)
-            if self.igroup is not None:
-                del self.igroup
-                self.igroup = None
-        if self.childItemGroup is not None:
-            del self.childItemGroup
-            self.childItemGroup = None
-        if self.__connector is not None:
-            self.__connector.unbind()
-            self.__connector.hide()
-            self.scene().removeItem(self.__connector)
-            self.__connector = None
-        self.scene().removeItem(self)
+
+        connectors = [item.__connector for item in items if item.__connector is not None]
+        scene.removeItems(items, connectors)
+
+        for item in items:
+            item.savePosition()
+            item.node = None
+            item.igroup = None
+            item.childItemGroup = None
+            item.children = IndexedList()
+            item.__classChildren = dict()
+            if item.__connector is not None:
+                item.__connector.unbind()
+                item.__connector = None
 
     def contextMenuEvent(self, event):
         self.scene().selectItem(self)
@@ -1878,33 +2042,29 @@ class PolyItem(QGraphicsPolygonItem, QObject):
         if self != self.scene().rootItem:
             self.removeFromScene(True)
 
-    @QtCore.Slot(str, str, str)
-    def __onNodeRename(self, libname, oldname, newname):
+    # Next methods are called by scene for items using changed library node (see TreeGraphicsScene.__connectSignals)
+
+    def onNodeRename(self, libname, oldname, newname):
         if self.textItem is not None and self.textItem.displayText() in (oldname, newname):
             self.verify(False, False)
 
-    @QtCore.Slot(str, str, str)
-    def __onNodeRemove(self, libname, nodename, nodeClass):
+    def onNodeRemove(self, libname, nodename, nodeClass):
         if self.textItem is not None and self.textItem.displayText() == nodename:
             self.verify(False, False)
 
-    @QtCore.Slot(str)
-    def __onLibraryExcludeOrAdd(self, libname):
+    def onLibraryExcludeOrAdd(self, libname):
         if self.node is not None and self.node.libname == libname:
             self.verify(False, False)
 
-    @QtCore.Slot(str, str, str, str)
-    def __onNodeTypeChange(self, libname, nodename, typeOld, typeNew):
+    def onNodeTypeChange(self, libname, nodename, typeOld, typeNew):
         if self.textItem is not None and self.textItem.displayText() == nodename:
             self.verify(True, False)
 
-    @QtCore.Slot(str, str)
-    def __onNodeChildrenListChange(self, libname, nodename):
+    def onNodeChildrenListChange(self, libname, nodename):
         if self.node is not None and self.node.libname == libname and self.node.nodeName == nodename:
             self.verify(True, False)
 
-    @QtCore.Slot(str, str, str)
-    def __onNodeShapeChange(self, libname, nodename, shapeName):
+    def onNodeShapeChange(self, libname, nodename, shapeName):
         if self.node is not None:
             if self.node.libname == libname and self.node.nodeName == nodename:
                 self.verify(False, False)
@@ -1914,8 +2074,7 @@ class PolyItem(QGraphicsPolygonItem, QObject):
                 self.verify(False, False)
                 self.scene().scheduleUpdate()
 
-    @QtCore.Slot(str, str)
-    def __onNodeEventsCountChange(self, libname, nodename):
+    def onNodeEventsCountChange(self, libname, nodename):
         if self.node is not None and self.node.libname == libname and self.node.nodeName == nodename:
             self.__validateEventIndicator()
             if not self.__hiding and self.__visible and self.__eventIndicator is not None:
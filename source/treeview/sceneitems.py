@@ -0,0 +1,93 @@
+# coding=utf-8
+# -----------------
+# file      : sceneitems.py
+# date      : 2026/10/18
+# author    : Victor Zarubkin
+# contact   : victor.zarubkin@gmail.com
+# copyright : Copyright (C) 2026  Victor Zarubkin
+# license   : This file is part of BehaviorStudio.
+#           :
+#           : BehaviorStudio is free software: you can redistribute it and/or modify
+#           : it under the terms of the GNU General Public License as published by
+#           : the Free Software Foundation, either version 3 of the License, or
+#           : (at your option) any later version.
+#           :
+#           : BehaviorStudio is distributed in the hope that it will be useful,
+#           : but WITHOUT ANY WARRANTY; without even the implied warranty of
+#           : MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#           : GNU General Public License for more details.
+#           :
+#           : You should have received a copy of the GNU General Public License
+#           : along with BehaviorStudio. If not, see <http://www.gnu.org/licenses/>.
+#           :
+#           : A copy of the GNU General Public License can be found in file COPYING.
+############################################################################
+
+""" Collection of diagram items of one scene.
+
+Hit testing itself is made by QGraphicsScene (it's BSP tree index is used by QGraphicsScene.items(pos)), this
+collection makes checks 'is it a diagram item of this scene' O(1) and keeps track of items which have been moved
+since last update of scene rect, so TreeGraphicsScene.updateSceneRect does not iterate over all items.
+"""
+
+from __future__ import unicode_literals
+
+__author__ = 'Victor Zarubkin'
+__copyright__ = 'Copyright (C) 2026  Victor Zarubkin'
+__credits__ = ['Victor Zarubkin']
+__license__ = ['GPLv3']
+__version__ = '1.3.0'  # this is last application version when this script file was changed
+__email__ = 'victor.zarubkin@gmail.com'
+############################################################################
+
+#######################################################################################################################
+#######################################################################################################################
+
+
+class SceneItems(object):
+    """ Unordered collection of PolyItems with O(1) append, remove and membership test. """
+
+    def __init__(self):
+        self.__items = dict()  # {id(item): item}
+        self.__moved = dict()  # items moved since last call of takeMoved() {id(item): item}
+
+    def __len__(self):
+        return len(self.__items)
+
+    def __iter__(self):
+        # copy of items list is returned, so items can be added or removed during iteration
+        return iter(list(self.__items.values()))
+
+    def __contains__(self, item):
+        return item is not None and self.__items.get(id(item)) is item
+
+    def append(self, item):
+        key = id(item)
+        self.__items[key] = item
+        self.__moved[key] = item
+
+    def remove(self, item):
+        key = id(item)
+        if self.__items.get(key) is not item:
+            raise ValueError('SceneItems.remove(item): item is not in collection')
+        del self.__items[key]
+        self.__moved.pop(key, None)
+
+    def clear(self):
+        self.__items.clear()
+        self.__moved.clear()
+
+    def itemMoved(self, item):
+        """ Must be called on every change of item's required position (see PolyItem.posRequired). """
+        key = id(item)
+        if key in self.__items:
+            self.__moved[key] = item
+
+    def takeMoved(self):
+        """ Returns list of items moved since previous call. """
+        moved = list(self.__moved.values())
+        self.__moved.clear()
+        return moved
+
+#######################################################################################################################
+#######################################################################################################################
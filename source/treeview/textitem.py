@@ -38,6 +38,7 @@ from PySide.QtCore import *
 
 from compat_2to3 import *
 from .colors import DiagramColor
+from .detail import DetailLevel, detailLevel
 
 #######################################################################################################################
 #######################################################################################################################
@@ -103,6 +104,8 @@ class TextItem(QGraphicsTextItem):
         self.setFont(f)
 
     def paint(self, painter, option, widget=None):
+        if detailLevel(painter) != DetailLevel.Full:
+            return  # text is not readable with such scale
         # painter.setRenderHint(QPainter.Antialiasing)
         painter.setPen(self.defaultTextColor())
         painter.setFont(self.font())
@@ -0,0 +1,137 @@
+# coding=utf-8
+# -----------------
+# file      : bench_attributes_memory.py
+# date      : 2026/10/18
+# author    : Victor Zarubkin
+# contact   : victor.zarubkin@gmail.com
+# copyright : Copyright (C) 2026  Victor Zarubkin
+# license   : This file is part of BehaviorStudio.
+#           :
+#           : BehaviorStudio is free software: you can redistribute it and/or modify
+#           : it under the terms of the GNU General Public License as published by
+#           : the Free Software Foundation, either version 3 of the License, or
+#           : (at your option) any later version.
+#           :
+#           : BehaviorStudio is distributed in the hope that it will be useful,
+#           : but WITHOUT ANY WARRANTY; without even the implied warranty of
+#           : MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#           : GNU General Public License for more details.
+#           :
+#           : You should have received a copy of the GNU General Public License
+#           : along with BehaviorStudio. If not, see <http://www.gnu.org/licenses/>.
+#           :
+#           : A copy of the GNU General Public License can be found in file COPYING.
+############################################################################
+
+""" Memory benchmark of tree nodes attributes and undo history.
+
+Usage (from 'source' directory):
+    python ../tools/bench/bench_attributes_memory.py [copies of example tree, default: 100] [history pushes, default: 500]
+
+Project generated from example project is loaded, then attributes of nodes are edited the same way as node
+properties panel does it (copy of attributes is modified and set back) with history push before every edit, and all
+edits are undone. The script reports traced python memory (Python 3 only), number of connections to
+librarySignals.nodeRenamed and time of edits and undos.
+"""
+
+from __future__ import unicode_literals
+from __future__ import print_function
+
+__author__ = 'Victor Zarubkin'
+__copyright__ = 'Copyright (C) 2026  Victor Zarubkin'
+__credits__ = ['Victor Zarubkin']
+__license__ = ['GPLv3']
+__version__ = '1.3.0'  # this is last application version when this script file was changed
+__email__ = 'victor.zarubkin@gmail.com'
+############################################################################
+
+import os
+import gc
+import sys
+import shutil
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+from benchutils import generateProject, initGlobals, openProject, timer
+
+import globals
+
+#######################################################################################################################
+
+
+def _renameConnections():
+    """ Returns number of connections to librarySignals.nodeRenamed or None if it can't be determined. """
+    from PySide.QtCore import SIGNAL
+    try:
+        return globals.librarySignals.receivers(SIGNAL('nodeRenamed(QString,QString,QString)'))
+    except (AttributeError, TypeError, RuntimeError):
+        return None
+
+
+def _tracedMemory():
+    if tracemalloc is None or not tracemalloc.is_tracing():
+        return None
+    gc.collect()
+    return tracemalloc.get_traced_memory()[0] / (1024.0 * 1024.0)
+
+
+def _format(value, fmt):
+    return 'n/a' if value is None else fmt.format(value)
+
+
+def _editAttributes(node, k):
+    attributes = node.getAttributesCopy()
+    for attribute in attributes.values():
+        value = attribute.value()
+        if isinstance(value, int) and not isinstance(value, bool):
+            attribute.setActualValueNoCheck(value + k)
+    node.setAttributes(attributes)
+
+
+def main(argv):
+    copies = int(argv[1]) if len(argv) > 1 else 100
+    pushes = int(argv[2]) if len(argv) > 2 else 500
+
+    initGlobals()
+    filename = generateProject(copies)
+    try:
+        if tracemalloc is not None:
+            tracemalloc.start()
+        project = openProject(filename)
+        project.activate()
+        globals.historyEnabled = True
+        memory = _tracedMemory()
+        connections = _renameConnections()
+        print('{0} nodes loaded: traced memory {1} MB, nodeRenamed connections {2}'
+              .format(len(project.nodes), _format(memory, '{0:.1f}'), _format(connections, '{0}')))
+
+        nodes = [project.nodes[uid] for uid in list(project.nodes)[:pushes]]
+        stdout, sys.stdout = sys.stdout, open(os.devnull, 'w')  # history prints every undo
+        try:
+            start = timer()
+            for k in range(pushes):
+                globals.historySignals.pushState.emit('Edit attributes {0}'.format(k))
+                _editAttributes(nodes[k % len(nodes)], k + 1)
+            edits = timer() - start
+            start = timer()
+            for k in range(pushes):
+                globals.historySignals.undo.emit()
+            undos = timer() - start
+        finally:
+            sys.stdout.close()
+            sys.stdout = stdout
+
+        memory = _tracedMemory()
+        connections = _renameConnections()
+        print('{0} history pushes and undos: traced memory {1} MB, nodeRenamed connections {2}, '
+              'edits {3:.2f} s, undos {4:.2f} s'.format(pushes, _format(memory, '{0:.1f}'),
+                                                       _format(connections, '{0}'), edits, undos))
+    finally:
+        shutil.rmtree(os.path.dirname(os.path.dirname(os.path.dirname(filename))), ignore_errors=True)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
@@ -0,0 +1,222 @@
+# coding=utf-8
+# -----------------
+# file      : bench_layout.py
+# date      : 2026/10/18
+# author    : Victor Zarubkin
+# contact   : victor.zarubkin@gmail.com
+# copyright : Copyright (C) 2026  Victor Zarubkin
+# license   : This file is part of BehaviorStudio.
+#           :
+#           : BehaviorStudio is free software: you can redistribute it and/or modify
+#           : it under the terms of the GNU General Public License as published by
+#           : the Free Software Foundation, either version 3 of the License, or
+#           : (at your option) any later version.
+#           :
+#           : BehaviorStudio is distributed in the hope that it will be useful,
+#           : but WITHOUT ANY WARRANTY; without even the implied warranty of
+#           : MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#           : GNU General Public License for more details.
+#           :
+#           : You should have received a copy of the GNU General Public License
+#           : along with BehaviorStudio. If not, see <http://www.gnu.org/licenses/>.
+#           :
+#           : A copy of the GNU General Public License can be found in file COPYING.
+############################################################################
+
+""" Benchmark of incremental diagram layout (ItemGroup).
+
+Usage (from 'source' directory):
+    python ../tools/bench/bench_layout.py [numbers of items, default: 1000 10000 50000]
+
+Random trees of lightweight items implementing the part of PolyItem interface used by ItemGroup are laid out by
+real ItemGroups. For each tree the script measures:
+    - full layout of the whole tree;
+    - one item resize followed by fullUpdate() (incremental layout of changed groups only);
+    - the same change with all groups invalidated (relayout of the whole tree as it was before incremental layout).
+Positions after incremental updates are checked against full relayout.
+"""
+
+from __future__ import unicode_literals
+from __future__ import print_function
+
+__author__ = 'Victor Zarubkin'
+__copyright__ = 'Copyright (C) 2026  Victor Zarubkin'
+__credits__ = ['Victor Zarubkin']
+__license__ = ['GPLv3']
+__version__ = '1.3.0'  # this is last application version when this script file was changed
+__email__ = 'victor.zarubkin@gmail.com'
+############################################################################
+
+import sys
+import random
+
+from benchutils import timer
+
+from PySide.QtCore import QPointF, QRectF
+
+from treeview.dispregime import DisplayRegime
+import treeview.diagram  # itemgroup module imports diagram module
+from treeview.itemgroup import ItemGroup
+
+#######################################################################################################################
+
+
+class _Scene(object):
+    regime = DisplayRegime.Vertical
+    itemInterval = 15
+    groupInterval = 35
+
+    def alignment(self):
+        return 0
+
+
+class _Item(object):
+    """ Part of PolyItem interface used by ItemGroup. """
+
+    def __init__(self, scene, parent, width):
+        self.__parent = parent
+        self.__rect = QRectF(0.0, 0.0, width, 30.0)
+        self.__pos = QPointF()
+        self.igroup = None
+        self.visible = True
+        self.childItemGroup = ItemGroup(scene, self, scene.itemInterval, scene.groupInterval)
+
+    def isVisible(self):
+        return self.visible
+
+    def childrenGroup(self):
+        return self.childItemGroup
+
+    def itemGroup(self):
+        return self.igroup
+
+    def setItemGroup(self, group, before=999999):
+        if self.igroup is not group:
+            self.igroup = group
+            if group is not None:
+                group.addItem(self, before)
+
+    def setAutoPositioningMode(self, mode, regime=None):
+        if self.igroup is not None:
+            self.igroup.invalidate()
+
+    def autoPositioningMode(self, regime=None):
+        return True
+
+    def parentNode(self):
+        return self.__parent
+
+    def pos(self):
+        return QPointF(self.__pos)
+
+    def posRequired(self):
+        return QPointF(self.__pos)
+
+    def deltaPos(self, regime=None):
+        return QPointF()
+
+    def moveTo(self, x, y):
+        self.__pos = QPointF(x, y)
+
+    def calculateDeltaPos(self):
+        pass
+
+    def boundingRect(self):
+        return self.__rect
+
+    def depth(self):
+        if not self.visible:
+            return 0
+        return 1 + self.childItemGroup.depth()
+
+    def width(self, d=999999):
+        if d < 1:
+            return 0.0
+        w = self.__rect.width()
+        if self.childItemGroup.isVisible():
+            cw = self.childItemGroup.itemsWidth() if d > 999990 else self.childItemGroup.width(d - 1)
+            if cw > w:
+                return cw
+        return w
+
+    def height(self, d=999999):
+        return self.__rect.height() if d >= 1 else 0.0
+
+    def setWidth(self, width):
+        self.__rect = QRectF(0.0, 0.0, width, 30.0)
+        if self.igroup is not None:
+            self.igroup.invalidate()
+
+
+def _buildTree(n, seed):
+    rnd = random.Random(seed)
+    scene = _Scene()
+    root = _Item(scene, None, 60.0)
+    # tree is laid out once after building
+    fullUpdate = ItemGroup.fullUpdate
+    ItemGroup.fullUpdate = lambda self: None
+    try:
+        root.setItemGroup(ItemGroup(scene, None, scene.itemInterval, scene.groupInterval))
+        items = [root]
+        while len(items) < n:
+            if rnd.random() < 0.7:
+                parent = items[rnd.randrange(max(0, len(items) - 50), len(items))]
+            else:
+                parent = items[rnd.randrange(len(items))]
+            item = _Item(scene, parent, rnd.choice([40.0, 60.0, 80.0, 120.0]))
+            item.setItemGroup(parent.childItemGroup)
+            items.append(item)
+    finally:
+        ItemGroup.fullUpdate = fullUpdate
+    return items
+
+
+def _invalidateAll(items):
+    for item in items:
+        item.childItemGroup.invalidate()
+    items[0].igroup.invalidate()
+
+
+def _positions(items):
+    return [(item.pos().x(), item.pos().y()) for item in items]
+
+
+def bench(n, changes=50):
+    items = _buildTree(n, n)
+    start = timer()
+    items[0].igroup.fullUpdate()
+    full = timer() - start
+
+    rnd = random.Random(1)
+    changed = [(items[rnd.randrange(1, n)], rnd.choice([40.0, 60.0, 200.0])) for _ in range(changes)]
+    start = timer()
+    for item, width in changed:
+        item.setWidth(width)
+        item.igroup.fullUpdate()
+    incremental = (timer() - start) / changes
+    positions = _positions(items)
+    _invalidateAll(items)
+    items[0].igroup.fullUpdate()
+    equal = positions == _positions(items)
+
+    relayoutChanges = max(1, min(changes, 5000 // max(1, n // 100)))
+    start = timer()
+    for item, width in changed[:relayoutChanges]:
+        item.setWidth(width)
+        _invalidateAll(items)
+        item.igroup.fullUpdate()
+    relayout = (timer() - start) / relayoutChanges
+
+    print('{0:>6} items: full layout {1:.3f} s | one change: {2:.2f} ms, whole tree relayout {3:.2f} ms | '
+          'positions equal: {4}'.format(n, full, incremental * 1e3, relayout * 1e3, equal))
+
+
+def main(argv):
+    sys.setrecursionlimit(100000)
+    sizes = [int(arg) for arg in argv[1:]] or [1000, 10000, 50000]
+    for n in sizes:
+        bench(n)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
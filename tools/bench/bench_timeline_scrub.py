@@ -0,0 +1,157 @@
+# coding=utf-8
+# -----------------
+# file      : bench_timeline_scrub.py
+# date      : 2026/10/18
+# author    : Victor Zarubkin
+# contact   : victor.zarubkin@gmail.com
+# copyright : Copyright (C) 2026  Victor Zarubkin
+# license   : This file is part of BehaviorStudio.
+#           :
+#           : BehaviorStudio is free software: you can redistribute it and/or modify
+#           : it under the terms of the GNU General Public License as published by
+#           : the Free Software Foundation, either version 3 of the License, or
+#           : (at your option) any later version.
+#           :
+#           : BehaviorStudio is distributed in the hope that it will be useful,
+#           : but WITHOUT ANY WARRANTY; without even the implied warranty of
+#           : MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#           : GNU General Public License for more details.
+#           :
+#           : You should have received a copy of the GNU General Public License
+#           : along with BehaviorStudio. If not, see <http://www.gnu.org/licenses/>.
+#           :
+#           : A copy of the GNU General Public License can be found in file COPYING.
+############################################################################
+
+""" Benchmark of debugger timelines scrubbing (moving time slice slider).
+
+Usage (from 'source' directory):
+    python ../tools/bench/bench_timeline_scrub.py [number of nodes, default: 2000] [records, default: 1000]
+
+Previous implementations (list of keys built on every EntityDebugInformation.get and python loop bisect of
+NodeTimeline queried node by node) are kept here for comparison.
+"""
+
+from __future__ import unicode_literals
+from __future__ import print_function
+
+__author__ = 'Victor Zarubkin'
+__copyright__ = 'Copyright (C) 2026  Victor Zarubkin'
+__credits__ = ['Victor Zarubkin']
+__license__ = ['GPLv3']
+__version__ = '1.3.0'  # this is last application version when this script file was changed
+__email__ = 'victor.zarubkin@gmail.com'
+############################################################################
+
+import sys
+import random
+
+from benchutils import timer
+
+from remote_debugger.debugger_node_information import EntityDebugInformation, NodeTimeline, ObjectTimeline
+
+#######################################################################################################################
+
+
+def _previousGet(entity, time=None):
+    """ Previous implementation of EntityDebugInformation.get: O(n) because of list of keys. """
+    timeline = entity._timeline
+    if not timeline:
+        return None
+    if time is None:
+        return timeline[list(timeline.keys())[-1]]
+    if time in timeline:
+        return timeline[time]
+    k = timeline.bisect_left(time) - 1
+    if k < 0:
+        return None
+    return timeline[list(timeline.keys())[k]]
+
+
+def _previousBisect(timeline, time):
+    """ Previous implementation of NodeTimeline.bisect: python loop over ring indexes. """
+    times = timeline._times
+    capacity = len(times)
+    start = timeline._start
+    lo, hi = 0, len(timeline)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if time < times[(start + mid) % capacity]:
+            hi = mid
+        else:
+            lo = mid + 1
+    return lo
+
+
+def _previousStatesAt(objectTimeline, time):
+    """ Previous way to get states of all nodes: one query per node. """
+    states = dict()
+    for uid, timeline in objectTimeline.nodes().items():
+        i = _previousBisect(timeline, time)
+        if i:
+            states[uid] = timeline.state(i - 1)
+    return states
+
+
+def benchEntityGet(records, entities=50, queries=200):
+    rnd = random.Random(1)
+    items = [EntityDebugInformation() for _ in range(entities)]
+    for entity in items:
+        for r in range(records):
+            entity.insert(r, float(r))
+    times = [rnd.uniform(-1.0, records) for _ in range(queries)] + [None]
+    for time in times:
+        assert items[0].get(time) == _previousGet(items[0], time)
+
+    start = timer()
+    for time in times:
+        for entity in items:
+            _previousGet(entity, time)
+    previous = timer() - start
+
+    start = timer()
+    for time in times:
+        for entity in items:
+            entity.get(time)
+    current = timer() - start
+
+    print('EntityDebugInformation.get, {0} lookups on {1} records: {2:.3f} s -> {3:.3f} s'
+          .format(len(times) * entities, records, previous, current))
+
+
+def benchScrubbing(nodes, records, steps=100):
+    objectTimeline = ObjectTimeline(records)
+    for uid in range(nodes):
+        timeline = NodeTimeline(records)
+        for r in range(records + records // 3):  # ring is wrapped
+            timeline.append(float(r), (r + uid) % 4)
+        objectTimeline.nodes()[uid] = timeline
+
+    first = records // 3
+    times = [first + i * (records / float(steps)) for i in range(steps)]
+    for time in times[:5]:
+        assert objectTimeline.statesAt(time) == _previousStatesAt(objectTimeline, time)
+
+    start = timer()
+    for time in times:
+        _previousStatesAt(objectTimeline, time)
+    previous = (timer() - start) / steps
+
+    start = timer()
+    for time in times:
+        objectTimeline.statesAt(time)
+    current = (timer() - start) / steps
+
+    print('One scrub step, {0} nodes x {1} records: {2:.1f} ms -> {3:.1f} ms ({4:.0f} steps/s)'
+          .format(nodes, records, previous * 1e3, current * 1e3, 1.0 / current))
+
+
+def main(argv):
+    nodes = int(argv[1]) if len(argv) > 1 else 2000
+    records = int(argv[2]) if len(argv) > 2 else 1000
+    benchEntityGet(records)
+    benchScrubbing(nodes, records)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
@@ -0,0 +1,105 @@
+# coding=utf-8
+# -----------------
+# file      : bench_tree_loading.py
+# date      : 2026/10/18
+# author    : Victor Zarubkin
+# contact   : victor.zarubkin@gmail.com
+# copyright : Copyright (C) 2026  Victor Zarubkin
+# license   : This file is part of BehaviorStudio.
+#           :
+#           : BehaviorStudio is free software: you can redistribute it and/or modify
+#           : it under the terms of the GNU General Public License as published by
+#           : the Free Software Foundation, either version 3 of the License, or
+#           : (at your option) any later version.
+#           :
+#           : BehaviorStudio is distributed in the hope that it will be useful,
+#           : but WITHOUT ANY WARRANTY; without even the implied warranty of
+#           : MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#           : GNU General Public License for more details.
+#           :
+#           : You should have received a copy of the GNU General Public License
+#           : along with BehaviorStudio. If not, see <http://www.gnu.org/licenses/>.
+#           :
+#           : A copy of the GNU General Public License can be found in file COPYING.
+############################################################################
+
+""" Benchmark of tree files loading: streaming loader (iterparse) vs DOM loader (xml.dom.minidom).
+
+Usage (from 'source' directory):
+    python ../tools/bench/bench_tree_loading.py [number of nodes, default: 100000]
+
+Project with one big tree file is generated from example project. Each loader is run in separate process,
+so peak resident memory (unix only) is measured for each of them independently.
+"""
+
+from __future__ import unicode_literals
+from __future__ import print_function
+
+__author__ = 'Victor Zarubkin'
+__copyright__ = 'Copyright (C) 2026  Victor Zarubkin'
+__credits__ = ['Victor Zarubkin']
+__license__ = ['GPLv3']
+__version__ = '1.3.0'  # this is last application version when this script file was changed
+__email__ = 'victor.zarubkin@gmail.com'
+############################################################################
+
+import os
+import sys
+import shutil
+import subprocess
+
+from benchutils import generateProject, initGlobals, openProject, peakMemory, timer
+
+#######################################################################################################################
+
+
+def _load(mode, filename):
+    """ Load project in current process and print 'nodes seconds peakMB' line. """
+    initGlobals()
+    if mode == 'dom':
+        from project import treeparser
+        # streaming loader returns None for files it can't read, then DOM loader is used
+        treeparser.TreeParser._TreeParser__streamTree = lambda *args: None
+    memory = peakMemory()
+    start = timer()
+    project = openProject(filename)
+    duration = timer() - start
+    peak = peakMemory()
+    print('result: {0} {1:.3f} {2:.1f} {3:.1f}'.format(len(project.nodes), duration, peak or 0.0, memory or 0.0))
+
+
+def _run(mode, filename):
+    output = subprocess.check_output([sys.executable, os.path.abspath(__file__), '--load', mode, filename])
+    for line in output.decode('utf-8', 'replace').splitlines():
+        if line.startswith('result: '):
+            nodes, duration, peak, before = line.split()[1:]
+            return int(nodes), float(duration), float(peak), float(before)
+    raise RuntimeError('{0} loader has not printed result'.format(mode))
+
+
+def main(argv):
+    if len(argv) > 3 and argv[1] == '--load':
+        _load(argv[2], argv[3])
+        return 0
+
+    nodes = int(argv[1]) if len(argv) > 1 else 100000
+
+    filename = generateProject(1)
+    nodesPerCopy = _run('stream', filename)[0]
+    directory = os.path.dirname(os.path.dirname(os.path.dirname(filename)))
+    filename = generateProject(max(1, (nodes + nodesPerCopy - 1) // nodesPerCopy), directory)
+    try:
+        results = dict()
+        for mode in ('dom', 'stream'):
+            results[mode] = _run(mode, filename)
+            print('{0:>6}: {1} nodes loaded in {2:.2f} s, peak RSS {3:.0f} MB (before loading {4:.0f} MB)'
+                  .format(mode, *results[mode]))
+        if results['dom'][0] != results['stream'][0]:
+            print('error: loaders have loaded different number of nodes!')
+            return 1
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
@@ -0,0 +1,142 @@
+# coding=utf-8
+# -----------------
+# file      : benchutils.py
+# date      : 2026/10/18
+# author    : Victor Zarubkin
+# contact   : victor.zarubkin@gmail.com
+# copyright : Copyright (C) 2026  Victor Zarubkin
+# license   : This file is part of BehaviorStudio.
+#           :
+#           : BehaviorStudio is free software: you can redistribute it and/or modify
+#           : it under the terms of the GNU General Public License as published by
+#           : the Free Software Foundation, either version 3 of the License, or
+#           : (at your option) any later version.
+#           :
+#           : BehaviorStudio is distributed in the hope that it will be useful,
+#           : but WITHOUT ANY WARRANTY; without even the implied warranty of
+#           : MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#           : GNU General Public License for more details.
+#           :
+#           : You should have received a copy of the GNU General Public License
+#           : along with BehaviorStudio. If not, see <http://www.gnu.org/licenses/>.
+#           :
+#           : A copy of the GNU General Public License can be found in file COPYING.
+############################################################################
+
+""" Common helpers of benchmark scripts.
+
+Benchmarks are run from 'source' directory, for example:
+    cd source
+    python ../tools/bench/bench_tree_loading.py
+
+Projects for benchmarks are generated from example project (data/examples) by repeating it's tree file contents.
+"""
+
+from __future__ import unicode_literals
+
+__author__ = 'Victor Zarubkin'
+__copyright__ = 'Copyright (C) 2026  Victor Zarubkin'
+__credits__ = ['Victor Zarubkin']
+__license__ = ['GPLv3']
+__version__ = '1.3.0'  # this is last application version when this script file was changed
+__email__ = 'victor.zarubkin@gmail.com'
+############################################################################
+
+import io
+import os
+import re
+import sys
+import time
+import shutil
+import tempfile
+
+rootDirectory = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+sourceDirectory = os.path.join(rootDirectory, 'source')
+if sourceDirectory not in sys.path:
+    sys.path.insert(0, sourceDirectory)
+
+import globals
+
+#######################################################################################################################
+
+_exampleProject = 'projects/human_example.btproj'
+_exampleTree = 'behavior_trees/human_behavior_tree'
+
+if hasattr(time, 'perf_counter'):
+    timer = time.perf_counter
+else:
+    timer = time.time
+
+
+def initGlobals():
+    """ Set paths of application data the same way as main.py does. """
+    globals.rootDirectory = rootDirectory.replace('\\', '/')
+    globals.applicationShapesPath = globals.processVars(globals.applicationShapesPath)
+    globals.applicationAlphabetPath = globals.processVars(globals.applicationAlphabetPath)
+    globals.projectCache = False  # measure parsing of tree files, not loading of cache
+
+
+def _treeBody(text):
+    start = text.index('>', text.index('<BehaviorTree')) + 1
+    end = text.rindex('</BehaviorTree>')
+    return text[:start], text[start:end], text[end:]
+
+
+def generateProject(copies, directory=None):
+    """ Copy example project into *directory* (new temporary directory by default) and repeat contents of it's
+    tree file *copies* times. Copies get unique node uids and tree names.
+    Returns path to project file. """
+    if directory is None:
+        directory = tempfile.mkdtemp(prefix='bs_bench_')
+    destination = os.path.join(directory, 'examples')
+    if os.path.exists(destination):
+        shutil.rmtree(destination)
+    shutil.copytree(os.path.join(rootDirectory, 'data', 'examples'), destination)
+
+    # paths of alphabet and shapes are relative to examples folder of the repository
+    projectFile = os.path.join(destination, _exampleProject)
+    with io.open(projectFile, 'r', encoding='utf-8') as f:
+        text = f.read()
+    config = os.path.join(rootDirectory, 'config').replace('\\', '/')
+    text = re.sub(r'path="(?:\.\./)+config/', lambda m: 'path="{0}/'.format(config), text)
+    with io.open(projectFile, 'w', encoding='utf-8') as f:
+        f.write(text)
+
+    for ext in ('xml', 'dgm'):
+        path = os.path.join(destination, '{0}.{1}'.format(_exampleTree, ext))
+        if not os.path.exists(path):
+            continue  # diagram file is optional
+        with io.open(path, 'r', encoding='utf-8') as f:
+            head, body, tail = _treeBody(f.read())
+        parts = [body]
+        for k in range(1, copies):
+            part = re.sub(r'uid="(\d+)"', lambda m: 'uid="{0}"'.format(k * 2 ** 32 + int(m.group(1))), body)
+            part = re.sub(r'BranchName="([^"]+)"', lambda m: 'BranchName="{0}_{1}"'.format(m.group(1), k), part)
+            part = re.sub(r'<nodeInfo[^>]*>.*?</nodeInfo>', '', part, flags=re.S)
+            parts.append(part)
+        with io.open(path, 'w', encoding='utf-8') as f:
+            f.write(head + ''.join(parts) + tail)
+
+    return projectFile.replace('\\', '/')
+
+
+def openProject(filename):
+    from project import parser
+    project = parser.ProjParser().open(filename)
+    globals.project = project
+    return project
+
+
+def peakMemory():
+    """ Returns peak resident memory of current process in megabytes or None if it is unknown (Windows). """
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        return peak / (1024.0 * 1024.0)  # bytes
+    return peak / 1024.0  # kilobytes
+
+#######################################################################################################################
+#######################################################################################################################